@@ -0,0 +1,344 @@
+"""
+Per-client rate limiting and admission control in front of the LLM call.
+
+Two layers protect the shared upstream quota:
+
+- TokenBucketLimiter: every client (IP address plus extension install ID)
+  gets RATE_LIMIT_PER_MINUTE extractions with bursts of RATE_LIMIT_BURST.
+  Install IDs are chosen by the client, so requests carrying one are also
+  charged to a bucket shared by every install ID on that IP, RATE_LIMIT_IP_FACTOR
+  (4) times the per-client budget: rotating IDs doesn't buy fresh bursts, while
+  a few users behind one NAT still get their own buckets.
+  Requests are charged after the cache lookup, so cache hits are free.
+  Off unless RATE_LIMIT_BACKEND is set: buckets live in process memory
+  (memory, one budget per worker) or in a local SQLite file (sqlite) so all
+  workers on a machine enforce one budget. Enabling it requires an explicit
+  RATE_LIMIT_PROXY_HOPS, since behind a proxy every client would otherwise
+  share the proxy's IP and one bucket.
+- AdmissionController: at most MAX_CONCURRENT_EXTRACTIONS upstream calls per
+  worker, with a bounded FIFO of waiters (ADMISSION_MAX_QUEUE). A request is
+  shed instead of queued when the queue is full, or when the expected wait
+  (its queue position times the recent call latency, spread over the slots)
+  would exceed ADMISSION_MAX_WAIT_SECONDS; one that still hasn't got a slot by
+  then is shed as well.
+
+Shed and rate-limited requests raise AdmissionRejected, which the endpoints
+turn into an immediate RATE_LIMITED fallback.
+"""
+import asyncio
+import collections
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from metrics import Counter, registry
+
+SHED_TOTAL = Counter(registry, 'admission_shed_total', 'Requests refused before the LLM call, by reason',
+                     label='reason')
+SHED_TOTAL.declare('client_rate', 'queue_full', 'deadline', 'timeout')
+
+# Install IDs come from the extension (a UUID); anything else falls back to the IP
+INSTALL_ID = re.compile(r'^[A-Za-z0-9_-]{8,64}$')
+
+
+class AdmissionRejected(Exception):
+    """Raised instead of calling upstream when a request is rate limited or shed"""
+
+    def __init__(self, reason: str):
+        super().__init__(f"Rate limit: request not admitted ({reason})")
+        self.reason = reason
+
+
+def client_key(headers, peer_host: Optional[str], proxy_hops: int = 0) -> str:
+    """Identity to rate limit on: the client IP, plus the X-Install-Id header when valid.
+
+    With proxy_hops > 0 the IP is taken from X-Forwarded-For, counting that
+    many entries from the right (the ones our own proxies appended), so a
+    client can't pick its IP by sending the header itself.
+    """
+    ip = peer_host or 'unknown'
+    if proxy_hops > 0:
+        forwarded = [part.strip() for part in headers.get('x-forwarded-for', '').split(',') if part.strip()]
+        if len(forwarded) >= proxy_hops:
+            ip = forwarded[-proxy_hops]
+    install_id = headers.get('x-install-id', '')
+    if INSTALL_ID.match(install_id):
+        return f"ip:{ip}|install:{install_id}"
+    return f"ip:{ip}"
+
+
+class InMemoryBucketStore:
+    """Per-process buckets; the least recently seen clients are forgotten past max_clients"""
+
+    blocking = False
+
+    def __init__(self, max_clients: int = 100000):
+        self.max_clients = max_clients
+        self._buckets = OrderedDict()  # key -> (tokens, updated_at)
+
+    def take(self, key: str, cost: float, rate: float, burst: float, now: float) -> bool:
+        tokens, updated_at = self._buckets.pop(key, (burst, now))
+        tokens = min(burst, tokens + (now - updated_at) * rate)
+        allowed = tokens >= cost
+        if allowed:
+            tokens -= cost
+        self._buckets[key] = (tokens, now)
+        if len(self._buckets) > self.max_clients:
+            self._buckets.popitem(last=False)
+        return allowed
+
+    def __len__(self):
+        return len(self._buckets)
+
+
+class SQLiteBucketStore:
+    """Buckets in a local SQLite file, updated in one write transaction per take, shared by all workers"""
+
+    # take() can wait up to the busy timeout for another worker's write lock,
+    # so TokenBucketLimiter runs it off the event loop
+    blocking = True
+
+    def __init__(self, path: str, purge_every: int = 1000):
+        self.path = path
+        self.purge_every = purge_every
+        self._takes = 0
+        self._connect()
+
+    def _connect(self):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, timeout=5, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS rate_buckets ("
+            "key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated_at REAL NOT NULL)"
+        )
+
+    def after_fork(self):
+        """SQLite connections must not cross fork(); abandon the parent's and open a new one"""
+        self._connect()
+
+    def take(self, key: str, cost: float, rate: float, burst: float, now: float) -> bool:
+        with self._lock:
+            # IMMEDIATE takes the write lock up front, so no other worker reads a stale bucket in between
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    "SELECT tokens, updated_at FROM rate_buckets WHERE key = ?", (key,)
+                ).fetchone()
+                tokens, updated_at = row if row else (burst, now)
+                tokens = min(burst, tokens + max(0.0, now - updated_at) * rate)
+                allowed = tokens >= cost
+                if allowed:
+                    tokens -= cost
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO rate_buckets (key, tokens, updated_at) VALUES (?, ?, ?)",
+                    (key, tokens, now)
+                )
+                self._takes += 1
+                if self._takes % self.purge_every == 0:
+                    # A bucket idle long enough to refill completely is the same as no bucket
+                    self._conn.execute("DELETE FROM rate_buckets WHERE updated_at < ?", (now - burst / rate,))
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return allowed
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM rate_buckets").fetchone()[0]
+
+
+class TokenBucketLimiter:
+    """Per-client token buckets: rate_per_second refill, up to burst tokens.
+
+    Keys with an install ID ("ip:...|install:...") are also charged to their
+    IP's shared install bucket, which has ip_factor times the rate and burst.
+    """
+
+    def __init__(self, store, rate_per_second: float, burst: float, ip_factor: float = 4.0):
+        self.store = store
+        self.rate_per_second = rate_per_second
+        self.burst = burst
+        self.ip_factor = ip_factor
+        self.allowed = 0
+        self.limited = 0
+
+    def _take(self, key: str, cost: float, now: float) -> bool:
+        ip, _, install = key.partition('|')
+        if install and not self.store.take(f"{ip}|installs", cost, self.rate_per_second * self.ip_factor,
+                                           self.burst * self.ip_factor, now):
+            return False
+        return self.store.take(key, cost, self.rate_per_second, self.burst, now)
+
+    async def allow(self, key: str, cost: float = 1.0) -> bool:
+        args = (key, cost, time.time())
+        allowed = await asyncio.to_thread(self._take, *args) if self.store.blocking else self._take(*args)
+        if allowed:
+            self.allowed += 1
+            return True
+        self.limited += 1
+        SHED_TOTAL.inc('client_rate')
+        return False
+
+    async def check(self, key: str, cost: float = 1.0):
+        """allow(), raising AdmissionRejected when the client is over its rate"""
+        if not await self.allow(key, cost):
+            raise AdmissionRejected('client_rate')
+
+    def after_fork(self):
+        if hasattr(self.store, 'after_fork'):
+            self.store.after_fork()
+
+    def stats(self) -> dict:
+        return {
+            "backend": type(self.store).__name__,
+            "clients": len(self.store),
+            "per_minute": round(self.rate_per_second * 60, 2),
+            "burst": self.burst,
+            "ip_factor": self.ip_factor,
+            "allowed": self.allowed,
+            "limited": self.limited
+        }
+
+
+class AdmissionController:
+    """Caps outstanding upstream calls; waiters queue FIFO up to max_queue and a wait deadline"""
+
+    def __init__(self, max_outstanding: int = 32, max_queue: int = 64, max_wait_seconds: float = 10.0):
+        self.max_outstanding = max_outstanding
+        self.max_queue = max_queue
+        self.max_wait_seconds = max_wait_seconds
+        self.outstanding = 0
+        self._waiters = collections.deque()
+        self._call_seconds = None  # moving average of slot hold time
+        self.counters = {
+            "admitted": 0,
+            "queued": 0,
+            "shed_queue_full": 0,
+            "shed_deadline": 0,
+            "shed_timeout": 0
+        }
+
+    def expected_wait(self, position: int) -> float:
+        """Seconds until the waiter at position (0 = head of the queue) should get a slot"""
+        if self._call_seconds is None:
+            return 0.0
+        return (position + 1) / self.max_outstanding * self._call_seconds
+
+    def _shed(self, reason: str):
+        self.counters[f"shed_{reason}"] += 1
+        SHED_TOTAL.inc(reason)
+        raise AdmissionRejected(reason)
+
+    def try_acquire(self) -> bool:
+        """Take a free slot without queueing; False when none is free or others are waiting"""
+        if self.outstanding < self.max_outstanding and not self._waiters:
+            self.outstanding += 1
+            self.counters["admitted"] += 1
+            return True
+        return False
+
+    async def acquire(self):
+        if self.try_acquire():
+            return
+        if len(self._waiters) >= self.max_queue:
+            self._shed('queue_full')
+        # Shed now rather than hold the client for a slot it won't get in time
+        if self.expected_wait(len(self._waiters)) > self.max_wait_seconds:
+            self._shed('deadline')
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        self.counters["queued"] += 1
+        try:
+            await asyncio.wait([waiter], timeout=self.max_wait_seconds)
+        except asyncio.CancelledError:
+            if waiter.done():
+                # A slot was handed over just as the request went away; pass it on
+                self._hand_over()
+            else:
+                self._waiters.remove(waiter)
+            raise
+        if not waiter.done():
+            self._waiters.remove(waiter)
+            self._shed('timeout')
+        # release() handed its slot straight to this waiter; outstanding is unchanged
+        self.counters["admitted"] += 1
+
+    def release(self, held_seconds: Optional[float] = None):
+        if held_seconds is not None:
+            self._call_seconds = held_seconds if self._call_seconds is None else (
+                0.8 * self._call_seconds + 0.2 * held_seconds)
+        self._hand_over()
+
+    def _hand_over(self):
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.outstanding -= 1
+
+    def slot(self) -> '_Slot':
+        """async with admission.slot(): ... holds one upstream slot for the block"""
+        return _Slot(self)
+
+    def stats(self) -> dict:
+        return {
+            **self.counters,
+            "outstanding": self.outstanding,
+            "queue_depth": len(self._waiters),
+            "max_outstanding": self.max_outstanding,
+            "max_queue": self.max_queue,
+            "max_wait_seconds": self.max_wait_seconds,
+            "avg_call_seconds": round(self._call_seconds, 4) if self._call_seconds is not None else None
+        }
+
+
+class _Slot:
+    def __init__(self, controller: AdmissionController):
+        self.controller = controller
+        self.acquired_at = 0.0
+
+    async def __aenter__(self):
+        await self.controller.acquire()
+        self.acquired_at = time.monotonic()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.controller.release(time.monotonic() - self.acquired_at)
+        return False
+
+
+def create_rate_limiter_from_env() -> Optional[TokenBucketLimiter]:
+    """Build the limiter configured by RATE_LIMIT_* env vars, or None if disabled (the default)"""
+    backend_name = os.getenv('RATE_LIMIT_BACKEND', 'off').lower()
+    per_minute = float(os.getenv('RATE_LIMIT_PER_MINUTE', '30'))
+    burst = float(os.getenv('RATE_LIMIT_BURST', '10'))
+
+    if backend_name in ('off', 'none', ''):
+        return None
+    if os.getenv('RATE_LIMIT_PROXY_HOPS') is None:
+        # Guessing wrong either lets clients spoof X-Forwarded-For or puts everyone behind the proxy in one bucket
+        raise ValueError("RATE_LIMIT_PROXY_HOPS must be set when RATE_LIMIT_BACKEND is enabled "
+                         "(0 when clients connect directly, 1 behind Render's proxy)")
+    if backend_name == 'sqlite':
+        store = SQLiteBucketStore(os.getenv('RATE_LIMIT_PATH', 'rate_limits.sqlite3'))
+    elif backend_name == 'memory':
+        store = InMemoryBucketStore()
+    else:
+        raise ValueError(f"Unknown RATE_LIMIT_BACKEND: {backend_name}")
+    return TokenBucketLimiter(store, per_minute / 60, burst, float(os.getenv('RATE_LIMIT_IP_FACTOR', '4')))
+
+
+def create_admission_from_env(max_outstanding: int) -> AdmissionController:
+    return AdmissionController(
+        max_outstanding=max_outstanding,
+        max_queue=int(os.getenv('ADMISSION_MAX_QUEUE', '64')),
+        max_wait_seconds=float(os.getenv('ADMISSION_MAX_WAIT_SECONDS', '10'))
+    )
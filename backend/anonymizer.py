@@ -0,0 +1,128 @@
+"""
+Single-pass PII redaction for traced runs.
+
+PII_RULES is the original rule list, which langsmith's anonymizer applied one
+regex after another to every string in a run. PII_PATTERN folds the same six
+rules into one alternation so each string is scanned once:
+
+- Alternatives are tried in rule order, so on a shared start position the
+  earlier rule still wins.
+- A later rule used to run on text where earlier matches were already
+  replaced, so it could never straddle one. The lookaheads below keep that
+  behaviour: a match may not run into an email, and addresses and card
+  numbers may not swallow a name or phone number.
+- The card rule's lazy `(?:\\d[ -]*?){13,16}` is written as a greedy digit
+  count, and the address rule's unbounded `[\\w\\s]+` is limited to a few
+  words before a whole-word street suffix, so the work per start position is
+  bounded and a scan is linear in the input length.
+
+The rewrite of the address rule is the one intended change in output: the old
+pattern matched suffixes inside words ("at 3 in the Stadium" became
+"at [ADDRESS_REDACTED]adium") and could run across a whole paragraph.
+tests/test_anonymizer.py checks the two implementations against each
+other.
+"""
+import re
+from collections import defaultdict
+from typing import Any
+
+PII_RULES = [
+    # Email addresses
+    {"pattern": r"[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}",
+     "replace": "[EMAIL_REDACTED]"},
+
+    # Phone numbers (various formats)
+    {"pattern": r"\b(?:\+?1[-\.\s]?)?\(?\d{3}\)?[-\.\s]?\d{3}[-\.\s]?\d{4}\b",
+     "replace": "[PHONE_REDACTED]"},
+
+    # Names (basic pattern - capitalized words)
+    {"pattern": r"\b([A-Z][a-z]+\s[A-Z][a-z]+)\b",
+     "replace": "[NAME_REDACTED]"},
+
+    # Street addresses
+    {"pattern": r"\d+\s+[\w\s]+(?:Street|St|Avenue|Ave|Road|Rd|Boulevard|Blvd|Lane|Ln|Drive|Dr|Court|Ct|Circle|Cir|Way|Parkway|Pkwy)",
+     "replace": "[ADDRESS_REDACTED]"},
+
+    # Credit card numbers
+    {"pattern": r"\b(?:\d[ -]*?){13,16}\b",
+     "replace": "[CARD_REDACTED]"},
+
+    # Social Security Numbers
+    {"pattern": r"\b\d{3}-\d{2}-\d{4}\b",
+     "replace": "[SSN_REDACTED]"}
+]
+
+# Most words allowed between a house number and its street suffix
+MAX_ADDRESS_WORDS = 5
+
+_EMAIL_LOCAL = r"[a-zA-Z0-9._%+-]"
+_EMAIL_DOMAIN = r"@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}"
+# Rest of an email address starting at the current position
+_EMAIL_TAIL = rf"{_EMAIL_LOCAL}*{_EMAIL_DOMAIN}"
+_PHONE = r"\b(?:\+?1[-\.\s]?)?\(?\d{3}\)?[-\.\s]?\d{3}[-\.\s]?\d{4}\b"
+_NAME = r"\b[A-Z][a-z]+\s[A-Z][a-z]+\b"
+_STREET_SUFFIX = r"(?:Street|St|Avenue|Ave|Road|Rd|Boulevard|Blvd|Lane|Ln|Drive|Dr|Court|Ct|Circle|Cir|Way|Parkway|Pkwy)"
+
+_ADDRESS = (rf"(?<!\d)\d+\s+(?:(?!{_NAME}|{_PHONE})\w+\s+){{1,{MAX_ADDRESS_WORDS}}}"
+            rf"(?!{_NAME}){_STREET_SUFFIX}\b")
+
+_ALTERNATIVES = [
+    # An email starts at the beginning of a run of local-part characters
+    ("EMAIL", rf"(?<!{_EMAIL_LOCAL}){_EMAIL_LOCAL}+{_EMAIL_DOMAIN}"),
+    ("PHONE", rf"{_PHONE}(?!{_EMAIL_TAIL})"),
+    ("NAME", rf"{_NAME}(?!{_EMAIL_TAIL})"),
+    ("ADDRESS", rf"{_ADDRESS}(?!{_EMAIL_TAIL})"),
+    # The old lazy separators stop the match at the first separator after the
+    # 13th digit, so only up to three more digits can follow without one.
+    # A phone number or address can only begin after a separator.
+    ("CARD", rf"\b\d(?:\d|[ -]+(?!{_PHONE}|{_ADDRESS})\d){{12}}\d{{0,3}}\b(?!{_EMAIL_TAIL})"),
+    ("SSN", rf"\b\d{{3}}-\d{{2}}-(?!{_ADDRESS})\d{{4}}\b(?!{_EMAIL_TAIL})"),
+]
+
+PII_PATTERN = re.compile("|".join(f"(?P<{name}>{pattern})" for name, pattern in _ALTERNATIVES))
+
+REPLACEMENTS = {
+    "EMAIL": "[EMAIL_REDACTED]",
+    "PHONE": "[PHONE_REDACTED]",
+    "NAME": "[NAME_REDACTED]",
+    "ADDRESS": "[ADDRESS_REDACTED]",
+    "CARD": "[CARD_REDACTED]",
+    "SSN": "[SSN_REDACTED]"
+}
+
+
+def _replacement(match: re.Match) -> str:
+    return REPLACEMENTS[match.lastgroup]
+
+
+def redact(text: str) -> str:
+    """Replace every PII match in text with its redaction token"""
+    return PII_PATTERN.sub(_replacement, text)
+
+
+def anonymize(data: Any, max_depth: int = 10) -> Any:
+    """Return a copy of data with every string redacted.
+
+    Walks dicts and lists like langsmith's anonymizer, including its depth
+    limit: containers nested deeper than max_depth are left as they are.
+    """
+    return _anonymize(data, 0, max_depth)
+
+
+def _anonymize(value: Any, depth: int, max_depth: int) -> Any:
+    if isinstance(value, str):
+        return redact(value)
+    if isinstance(value, (dict, defaultdict)):
+        if depth >= max_depth:
+            return value
+        return {key: _anonymize(item, depth + 1, max_depth) for key, item in value.items()}
+    if isinstance(value, list):
+        if depth >= max_depth:
+            return value
+        return [_anonymize(item, depth + 1, max_depth) for item in value]
+    return value
+
+
+def create_pii_anonymizer():
+    """Anonymizer applied to traced runs by the export worker, before they leave the process"""
+    return anonymize
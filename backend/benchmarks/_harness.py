@@ -0,0 +1,60 @@
+"""
+Setup shared by the benchmarks.
+
+- stub_env / start_stub: point the backend at the local stub LLM (stub_llm.py),
+  started in a thread of the benchmark process
+- import_main: import the app once with its startup output silenced and its
+  request logs sent to devnull, so they don't interleave with the report
+- asgi_client: an httpx client calling the app in-process, without sockets
+- percentile: nearest-rank percentile used in every latency report
+
+Benchmarks that run the server as a subprocess use BACKEND_DIR as its working
+directory and stub_env for its environment.
+"""
+import contextlib
+import os
+import sys
+from typing import Sequence
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.dirname(BENCH_DIR)
+
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+
+def stub_env(port: int) -> dict:
+    """Environment pointing the OpenAI client at a stub LLM on port"""
+    return {"OPENAI_API_KEY": "stub-key", "OPENAI_BASE_URL": f"http://127.0.0.1:{port}/v1"}
+
+
+def start_stub(port: int, **options):
+    """Start stub_llm in a thread (options go to stub_llm.start_in_thread) and point the app at it"""
+    import stub_llm
+    stub_llm.start_in_thread(port, **options)
+    os.environ.update(stub_env(port))
+    os.environ.setdefault("LANGSMITH_TRACING", "false")
+
+
+def import_main():
+    """Import the app with the current os.environ as its configuration"""
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        import main
+    import logs
+    # Request logs would otherwise go to the devnull stdout closed above
+    logs.configure_logging(stream=open(os.devnull, "w"))
+    return main
+
+
+def asgi_client(app, timeout: float = 60, **kwargs):
+    """httpx.AsyncClient sending requests straight to an ASGI app"""
+    import httpx
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://app", timeout=timeout, **kwargs)
+
+
+def percentile(values: Sequence[float], fraction: float) -> float:
+    """Nearest-rank percentile; 0.0 for no values"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, int(round(fraction * len(ordered))) - 1))]
@@ -0,0 +1,159 @@
+"""
+Per-client rate limiting and admission control under a noisy client and overload.
+
+Runs /process_event in-process against the local stub LLM with a small pool
+of upstream slots (--slots), so the shared LLM quota is the bottleneck. All
+traffic is open-loop: requests are sent on a fixed schedule whether or not
+earlier ones have finished, like real users.
+
+noisy client: one install ID floods at --noisy-rps while --good-clients
+others each send --good-rps. Without the limiter the flood fills the slots
+and the queue, so well-behaved users wait behind it. With the token buckets
+the flood is refused immediately once it has used its burst, and the good
+clients see plain upstream latency.
+
+overload: many distinct clients together offer --overload-rps, more than the
+slots can serve. An unbounded queue grows for the whole run, so every request
+waits longer than the one before. The admission controller sheds what it
+can't start within --max-wait-seconds and keeps admitted latency bounded.
+
+Shed and rate-limited requests come back as RATE_LIMITED fallbacks.
+
+Usage: python benchmarks/admission_bench.py --slots 4 --latency-ms 300 --duration 15
+"""
+import argparse
+import asyncio
+import os
+import time
+import uuid
+from datetime import datetime, timezone
+
+from _harness import asgi_client, import_main, percentile, start_stub
+
+STUB_PORT = 9122
+
+
+class Outcomes:
+    def __init__(self):
+        self.ok = []
+        self.limited = []
+
+    def record(self, result: dict, elapsed_ms: float):
+        (self.limited if result.get('error_code') == 'RATE_LIMITED' else self.ok).append(elapsed_ms)
+
+
+async def open_loop(http, rps: float, duration: float, install_id, outcomes: Outcomes):
+    """Send at a fixed rate for duration seconds; install_id=None gives every request its own client"""
+    tasks = []
+    start = time.monotonic()
+    sent = 0
+
+    async def one(i: int):
+        payload = {
+            # Distinct texts so single-flight doesn't coalesce them
+            "text": f"Team sync #{i} {uuid.uuid4().hex[:8]} tomorrow at 10am in Room 4",
+            "current_time": datetime.now(timezone.utc).isoformat(),
+            "user_timezone": "Europe/Berlin",
+        }
+        headers = {"X-Install-Id": install_id or uuid.uuid4().hex}
+        t0 = time.perf_counter()
+        response = await http.post("/process_event", json=payload, headers=headers)
+        outcomes.record(response.json(), (time.perf_counter() - t0) * 1000)
+
+    while time.monotonic() - start < duration:
+        tasks.append(asyncio.ensure_future(one(sent)))
+        sent += 1
+        await asyncio.sleep(max(0.0, start + sent / rps - time.monotonic()))
+    await asyncio.gather(*tasks)
+
+
+async def sample_queue(main, stop: asyncio.Event, peak: list):
+    while not stop.is_set():
+        peak[0] = max(peak[0], main.admission.stats()["queue_depth"])
+        await asyncio.sleep(0.05)
+
+
+async def run(main, flows, duration: float):
+    """flows: (name, rps, install_id); returns per-flow Outcomes and the peak queue depth"""
+    outcomes = {name: Outcomes() for name, _, _ in flows}
+    stop, peak = asyncio.Event(), [0]
+    async with asgi_client(main.app, timeout=600) as http:
+        sampler = asyncio.ensure_future(sample_queue(main, stop, peak))
+        await asyncio.gather(*(open_loop(http, rps, duration, install_id, outcomes[name])
+                               for name, rps, install_id in flows))
+        stop.set()
+        await sampler
+    return outcomes, peak[0]
+
+
+def report(scenario: str, outcomes: dict, peak_queue: int):
+    for name, result in outcomes.items():
+        total = len(result.ok) + len(result.limited)
+        print(f"{scenario:<24} {name:<8} {total:>5} {len(result.ok):>5} {len(result.limited):>7} "
+              f"{percentile(result.ok, 0.5):>7.0f} {percentile(result.ok, 0.99):>7.0f} "
+              f"{percentile(result.limited, 0.5):>9.1f} {peak_queue:>6}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--slots", type=int, default=4, help="upstream calls in flight (MAX_CONCURRENT_EXTRACTIONS)")
+    parser.add_argument("--latency-ms", type=float, default=300.0)
+    parser.add_argument("--duration", type=float, default=15.0, help="seconds per scenario")
+    parser.add_argument("--noisy-rps", type=float, default=20.0)
+    parser.add_argument("--good-clients", type=int, default=4)
+    parser.add_argument("--good-rps", type=float, default=0.5, help="per good client")
+    parser.add_argument("--per-minute", type=float, default=30.0, help="RATE_LIMIT_PER_MINUTE")
+    parser.add_argument("--burst", type=float, default=10.0, help="RATE_LIMIT_BURST")
+    parser.add_argument("--overload-rps", type=float, default=25.0)
+    parser.add_argument("--max-wait-seconds", type=float, default=2.0, help="ADMISSION_MAX_WAIT_SECONDS")
+    args = parser.parse_args()
+
+    start_stub(STUB_PORT, latency_ms=args.latency_ms)
+    os.environ["EXTRACTION_CACHE_BACKEND"] = "off"
+    os.environ["PREPARSER_MODE"] = "off"
+    # Queued requests must not time out upstream; queueing is what is measured
+    os.environ.setdefault("UPSTREAM_ATTEMPT_TIMEOUT_SECONDS", "600")
+    os.environ.setdefault("UPSTREAM_BUDGET_SECONDS", "600")
+
+    main = import_main()
+    from admission import AdmissionController, InMemoryBucketStore, TokenBucketLimiter
+
+    def unbounded():
+        # Behaves like the plain semaphore it replaced: FIFO, no queue limit, no deadline
+        return AdmissionController(args.slots, max_queue=10 ** 9, max_wait_seconds=10 ** 9)
+
+    def bounded():
+        return AdmissionController(args.slots, max_queue=args.slots * 16, max_wait_seconds=args.max_wait_seconds)
+
+    def limiter():
+        return TokenBucketLimiter(InMemoryBucketStore(), args.per_minute / 60, args.burst)
+
+    noisy_flows = [("noisy", args.noisy_rps, "noisy-client")] + [
+        (f"good{n}", args.good_rps, f"good-client-{n}") for n in range(args.good_clients)
+    ]
+    scenarios = [
+        ("noisy, no limits", noisy_flows, unbounded, None),
+        ("noisy, limiter+admission", noisy_flows, bounded, limiter),
+        ("overload, unbounded", [("clients", args.overload_rps, None)], unbounded, None),
+        ("overload, admission", [("clients", args.overload_rps, None)], bounded, limiter),
+    ]
+
+    print(f"{args.slots} slots x {args.latency_ms:.0f} ms = {args.slots * 1000 / args.latency_ms:.1f} req/s upstream "
+          f"capacity; {args.duration:.0f} s per scenario")
+    print(f"{'scenario':<24} {'flow':<8} {'sent':>5} {'ok':>5} {'limited':>7} {'ok p50':>7} {'ok p99':>7} "
+          f"{'shed p50':>9} {'peak q':>6}")
+    for scenario, flows, make_admission, make_limiter in scenarios:
+        main.admission = make_admission()
+        main.rate_limiter = make_limiter() if make_limiter else None
+        outcomes, peak_queue = asyncio.run(run(main, flows, args.duration))
+        if scenario.startswith("noisy"):
+            # Good clients reported together
+            good = Outcomes()
+            for name in list(outcomes):
+                if name.startswith("good"):
+                    good.ok += outcomes[name].ok
+                    good.limited += outcomes.pop(name).limited
+            outcomes["good"] = good
+        report(scenario, outcomes, peak_queue)
+        # Each scenario gets a fresh OpenAI client bound to its own event loop
+        main.client = None
@@ -0,0 +1,61 @@
+"""
+Latency of the /process_event cache hit path.
+
+Primes the cache with one extraction against the local stub LLM, then times
+repeated identical requests in-process (no network) for each cache backend.
+The hit path should stay well under 5 ms.
+
+Usage: python benchmarks/cache_bench.py --iterations 500
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import time
+from datetime import datetime, timezone
+
+from _harness import import_main, start_stub
+
+STUB_PORT = 9101
+
+PAYLOAD = {
+    "text": "All-hands   meeting\nFriday at 3pm in the main auditorium. Agenda: Q3 results.",
+    "current_time": datetime.now(timezone.utc).isoformat(),
+    "user_timezone": "America/New_York",
+}
+
+
+def run_backend(main, backend, iterations: int):
+    from cache import ExtractionCache
+    from fastapi.testclient import TestClient
+
+    main.extraction_cache = ExtractionCache(backend)
+    with TestClient(main.app) as http:
+        http.post("/process_event", json=PAYLOAD)  # miss: fills the cache
+        timings = []
+        for _ in range(iterations):
+            t0 = time.perf_counter()
+            resp = http.post("/process_event", json=PAYLOAD)
+            timings.append((time.perf_counter() - t0) * 1000)
+            assert resp.headers.get("x-cache") == "HIT", resp.headers
+    timings.sort()
+    return statistics.median(timings), timings[int(len(timings) * 0.99) - 1]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=500)
+    args = parser.parse_args()
+
+    start_stub(STUB_PORT, latency_ms=300)
+
+    from cache import InMemoryCacheBackend, SQLiteCacheBackend
+    sqlite_path = os.path.join(tempfile.mkdtemp(), "cache.sqlite3")
+    backends = {"memory": InMemoryCacheBackend(), "sqlite": SQLiteCacheBackend(sqlite_path)}
+
+    main = import_main()
+    results = {name: run_backend(main, backend, args.iterations) for name, backend in backends.items()}
+
+    print(f"{'backend':>8} {'p50 ms':>8} {'p99 ms':>8}")
+    for backend, (p50, p99) in results.items():
+        print(f"{backend:>8} {p50:>8.3f} {p99:>8.3f}")
@@ -0,0 +1,96 @@
+"""
+Throughput vs. concurrency for /process_event against the local stub LLM.
+
+Starts the stub and the FastAPI app (each on its own event loop), then fires
+batches of requests at increasing concurrency and reports requests/sec plus
+/health latency measured while the extraction load is running. With a
+non-blocking pipeline, throughput should scale roughly linearly with
+concurrency up to MAX_CONCURRENT_EXTRACTIONS.
+
+Usage: python benchmarks/concurrency_bench.py --latency-ms 200 --levels 1,4,16,32
+"""
+import argparse
+import asyncio
+import contextlib
+import os
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+
+import httpx
+import uvicorn
+
+import stub_llm
+from _harness import stub_env
+
+STUB_PORT = 9100
+APP_PORT = 9200
+
+PAYLOAD = {
+    "text": "Team sync tomorrow at 10am in Room 4 to go over the launch checklist",
+    "current_time": datetime.now(timezone.utc).isoformat(),
+    "user_timezone": "Europe/Berlin",
+}
+
+
+def start_app():
+    os.environ.update(stub_env(STUB_PORT))
+    os.environ.setdefault("LANGSMITH_TRACING", "false")
+    server = uvicorn.Server(uvicorn.Config("main:app", host="127.0.0.1", port=APP_PORT, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.01)
+    return server
+
+
+async def run_level(http: httpx.AsyncClient, concurrency: int, requests_per_worker: int):
+    health_latencies = []
+    done = asyncio.Event()
+
+    async def worker():
+        for _ in range(requests_per_worker):
+            await http.post("/process_event", json=PAYLOAD)
+
+    async def probe_health():
+        while not done.is_set():
+            t0 = time.perf_counter()
+            await http.get("/health")
+            health_latencies.append((time.perf_counter() - t0) * 1000)
+            await asyncio.sleep(0.05)
+
+    probe = asyncio.create_task(probe_health())
+    t0 = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - t0
+    done.set()
+    await probe
+
+    total = concurrency * requests_per_worker
+    health_max = max(health_latencies) if health_latencies else 0.0
+    return total / elapsed, health_max
+
+
+async def main(levels, latency_ms, requests_per_worker):
+    limits = httpx.Limits(max_connections=max(levels) + 8)
+    async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{APP_PORT}", limits=limits, timeout=60) as http:
+        await http.post("/process_event", json=PAYLOAD)  # warm-up
+        ideal = 1000.0 / latency_ms
+        print(f"{'concurrency':>11} {'req/s':>8} {'speedup':>8} {'health max ms':>14}", file=sys.__stdout__)
+        for level in levels:
+            rps, health_max = await run_level(http, level, requests_per_worker)
+            print(f"{level:>11} {rps:>8.1f} {rps / ideal:>8.1f} {health_max:>14.1f}", file=sys.__stdout__)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--latency-ms", type=float, default=200.0)
+    parser.add_argument("--levels", default="1,2,4,8,16,32")
+    parser.add_argument("--requests-per-worker", type=int, default=5)
+    args = parser.parse_args()
+
+    stub_llm.start_in_thread(STUB_PORT, latency_ms=args.latency_ms)
+    # The backend prints on every request; keep the report readable
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        start_app()
+        asyncio.run(main([int(x) for x in args.levels.split(",")], args.latency_ms, args.requests_per_worker))
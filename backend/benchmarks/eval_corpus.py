@@ -0,0 +1,62 @@
+"""
+Labeled event texts for offline prompt evaluation.
+
+Every item pins current_time and user_timezone, so relative dates have one
+right answer. Labels cover the fields the rules in the prompt decide: date
+(relative days, weekdays, year roll-over), start and end time (format,
+ranges, the one-hour default, first-of-several) and location ('' when none).
+Locations match if either string contains the other, ignoring case.
+"""
+
+# Monday 2025-03-10, 10:00 in Berlin
+MONDAY_MORNING = "2025-03-10T09:00:00Z"
+
+LABELED = [
+    {"text": "Team sync tomorrow at 10am in Room 4",
+     "expected": {"date": "2025-03-11", "startTime": "10:00 AM", "endTime": "11:00 AM", "location": "Room 4"}},
+    {"text": "Lunch with Sarah on Friday at 12:30",
+     "expected": {"date": "2025-03-14", "startTime": "12:30 PM", "endTime": "01:30 PM", "location": ""}},
+    {"text": "Dentist appointment on Tuesday March 18 at 3:15 PM at 200 Main Street",
+     "expected": {"date": "2025-03-18", "startTime": "03:15 PM", "endTime": "04:15 PM", "location": "200 Main Street"}},
+    {"text": "Quarterly planning review, March 14 from 2-4pm, Conference Room B. Please bring your roadmap drafts.",
+     "expected": {"date": "2025-03-14", "startTime": "02:00 PM", "endTime": "04:00 PM", "location": "Conference Room B"}},
+    {"text": "Reminder: parent-teacher conference on 10/24 at 6:00 PM in the school library",
+     "expected": {"date": "2025-10-24", "startTime": "06:00 PM", "endTime": "07:00 PM", "location": "school library"}},
+    {"text": "Join us for the product launch party! Thursday, 6pm-9pm at The Loft, 55 Harbor Ave. RSVP by Monday.",
+     "expected": {"date": "2025-03-13", "startTime": "06:00 PM", "endTime": "09:00 PM", "location": "The Loft"}},
+    {"text": "Board meeting moved to the 21st at 4pm",
+     "expected": {"date": "2025-03-21", "startTime": "04:00 PM", "endTime": "05:00 PM", "location": ""}},
+    {"text": "Call with the vendor about the contract renewal tomorrow at 2:30 PM",
+     "expected": {"date": "2025-03-11", "startTime": "02:30 PM", "endTime": "03:30 PM", "location": ""}},
+    {"text": "Birthday dinner for Mom, Sunday 8pm at Olive Garden",
+     "expected": {"date": "2025-03-16", "startTime": "08:00 PM", "endTime": "09:00 PM", "location": "Olive Garden"}},
+    {"text": "Webinar: Scaling Postgres - Nov 12, 11am PT. Link will be sent the day before.",
+     "expected": {"date": "2025-11-12", "startTime": "11:00 AM", "endTime": "12:00 PM", "location": ""}},
+    {"text": "Interview with Jordan Lee for the backend role, Wednesday 1-2pm, Zoom",
+     "expected": {"date": "2025-03-12", "startTime": "01:00 PM", "endTime": "02:00 PM", "location": "Zoom"}},
+    {"text": "Soccer practice moved to Thursday 5:30pm at Riverside Park",
+     "expected": {"date": "2025-03-13", "startTime": "05:30 PM", "endTime": "06:30 PM", "location": "Riverside Park"}},
+    {"text": "Concert tickets for The National, Jan 30, doors 7pm",
+     "expected": {"date": "2026-01-30", "startTime": "07:00 PM", "endTime": "08:00 PM", "location": ""}},
+    {"text": "Please join the all-hands on Thursday at 4 PM CET in the main auditorium",
+     "expected": {"date": "2025-03-13", "startTime": "04:00 PM", "endTime": "05:00 PM", "location": "main auditorium"}},
+    {"text": "Haircut Saturday at 11am",
+     "expected": {"date": "2025-03-15", "startTime": "11:00 AM", "endTime": "12:00 PM", "location": ""}},
+    {"text": "Coffee with Priya today at 3pm, or we could do 5pm if that's easier",
+     "expected": {"date": "2025-03-10", "startTime": "03:00 PM", "endTime": "04:00 PM", "location": ""}},
+    {"text": "Flight to Berlin departs Saturday March 22 at 7:45 AM",
+     "expected": {"date": "2025-03-22", "startTime": "07:45 AM", "endTime": "08:45 AM", "location": ""}},
+    {"text": "Book club on Friday at 7:30pm at Priya's place",
+     "expected": {"date": "2025-03-14", "startTime": "07:30 PM", "endTime": "08:30 PM", "location": "Priya's place"}},
+    # Sunday 22:00 in New York: "tomorrow" is Monday the 10th
+    {"text": "Yoga class tomorrow at 7pm", "current_time": "2025-03-10T02:00:00Z", "user_timezone": "America/New_York",
+     "expected": {"date": "2025-03-10", "startTime": "07:00 PM", "endTime": "08:00 PM", "location": ""}},
+    # Tuesday 05:00 in Tokyo: "tomorrow" is Wednesday the 12th
+    {"text": "Doctor follow-up tomorrow at 10:40 AM", "current_time": "2025-03-10T20:00:00Z",
+     "user_timezone": "Asia/Tokyo",
+     "expected": {"date": "2025-03-12", "startTime": "10:40 AM", "endTime": "11:40 AM", "location": ""}},
+]
+
+for _item in LABELED:
+    _item.setdefault("current_time", MONDAY_MORNING)
+    _item.setdefault("user_timezone", "Europe/Berlin")
@@ -0,0 +1,41 @@
+"""
+Event texts for load tests, shaped like what users select on web pages and in
+mail: short one-liners, invitations with addresses and attendees, relative
+dates, time ranges, and a few inputs the validator rejects (too short, too
+long), so the error-code distribution is not all 'none'.
+"""
+
+TEXTS = [
+    "Team sync tomorrow at 10am in Room 4",
+    "Lunch with Sarah on Friday at 12:30",
+    "Dentist appointment next Tuesday 3:15 PM at 200 Main Street",
+    "Quarterly planning review, March 14 from 2-4pm, Conference Room B. Please bring your roadmap drafts.",
+    "Coffee chat with the design team next week Wednesday at 9",
+    "Reminder: parent-teacher conference on 10/24 at 6:00 PM in the school library",
+    "Flight to Berlin departs Saturday at 7:45 AM, arrive 2 hours early for check-in",
+    "Join us for the product launch party! Thursday, 6pm-9pm at The Loft, 55 Harbor Ave. RSVP by Monday.",
+    "Weekly 1:1 with Alex every Monday 11:00-11:30",
+    "Yoga class tonight at 7",
+    "Board meeting moved to the 21st at 4pm, same dial-in as before",
+    "Hi all, the offsite is confirmed for June 3rd. We start at 9:30 with breakfast, sessions run until 5, "
+    "then dinner at 7 at Luigi's on 3rd Street. Let me know about dietary restrictions.",
+    "Call with the vendor about the contract renewal tomorrow afternoon around 2:30",
+    "Birthday dinner for Mom, Sunday 8pm at Olive Garden",
+    "Webinar: Scaling Postgres - Nov 12, 11am PT / 2pm ET. Link will be sent the day before.",
+    "Standup at 9:15 every weekday",
+    "Pick up dry cleaning after work on Thursday",
+    "Interview with Jordan Lee for the backend role, Tuesday 1-2pm, Zoom",
+    "Soccer practice moved from Wednesday to Thursday 5:30pm at Riverside Park field 3",
+    "Doctor follow-up in two weeks, 10:40 in the morning",
+    "Book club meets on the last Friday of the month at 7:30, this time at Priya's place",
+    "Hackathon kickoff: Friday 5pm, demos Sunday at noon",
+    "Haircut Sat 11",
+    "Team retro in 30 minutes",
+    "Concert tickets for The National, Oct 30, doors 7pm, show 8pm, Madison Square Garden",
+    "Please join the all-hands on Thursday at 4 PM CET in the main auditorium or via the livestream",
+    "Pay rent by the 1st",
+    "Date night Saturday - dinner reservation 7:15 at Nobu",
+    # Rejected by validate_text: too short, and too long
+    "tmrw 9",
+    "Agenda item. " * 400,
+]
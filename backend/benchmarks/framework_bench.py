@@ -0,0 +1,177 @@
+"""
+Per-request framework overhead of /process_event with the LLM stubbed out.
+
+The upstream call returns a canned completion in-process, so what is timed is
+everything around it: body parsing, validation, cache-key and prompt lookup,
+event finalization, response encoding and the middleware stack. Requests are
+driven straight through the ASGI interface, with no HTTP client or socket in
+the way.
+
+before: the previous handler. The body is parsed with request.json() and
+read field by field. finalize_event builds EventDetails twice when it
+corrects a past date, with a strptime for every date check. The dict result
+goes through FastAPI's jsonable_encoder and JSONResponse.
+
+after: ProcessEventRequest.model_validate_json parses and validates in one
+pass. The date is corrected before a single model_validate. The result is
+written with the orjson response class.
+
+Component timings are reported too, in microseconds per call.
+
+Usage: python benchmarks/framework_bench.py --requests 5000
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+from datetime import datetime
+from types import SimpleNamespace
+
+from _harness import import_main
+
+CURRENT_TIME = "2025-03-10T09:00:00Z"
+EVENT = {"title": "Team Sync", "date": "2025-03-11", "startTime": "10:00 AM", "endTime": "11:00 AM",
+         "location": "Room 4", "attendees": ["alex@example.com"], "description": "Weekly team sync"}
+PAST_EVENT = dict(EVENT, date="2025-03-03")
+BODY = json.dumps({"text": "Team sync tomorrow at 10am in Room 4", "current_time": CURRENT_TIME,
+                   "user_timezone": "Europe/Berlin"}).encode()
+
+
+def legacy_finalize_event(main, event_details: dict, user_now: datetime) -> dict:
+    """finalize_event as it was: validate, then re-validate after a past-date correction"""
+    if not event_details.get('endTime'):
+        event_details['endTime'] = main.add_one_hour(event_details['startTime'])
+    if event_details.get('location') is None:
+        event_details['location'] = ""
+    event = main.EventDetails(**event_details)
+    event_date = datetime.strptime(event.date, '%Y-%m-%d').date()
+    date_was_corrected = False
+    if event_date < user_now.date():
+        event_details['date'] = main.prompt_contexts.get(user_now).tomorrow_date
+        date_was_corrected = True
+        event = main.EventDetails(**event_details)
+    result = event.model_dump()
+    if date_was_corrected:
+        result['error_code'] = main.ErrorCodes.PAST_DATE
+        result['extraction_error'] = "Date/Time could not be extracted properly. Please select the correct ones manually."
+    return result
+
+
+def add_legacy_route(main):
+    from fastapi import Request, Response
+
+    @main.app.post("/process_event_legacy")
+    async def process_event_legacy(request: Request, response: Response):
+        data = await request.json()
+        result, cache_status = await main.extract_event(
+            data.get('text', ''), data.get('current_time'), data.get('user_timezone', 'UTC'),
+            main.wants_cache_bypass(request)
+        )
+        if cache_status:
+            response.headers['X-Cache'] = cache_status
+        main.record_result(result)
+        return result
+
+
+def stub_upstream(main, event: dict):
+    completion = SimpleNamespace(usage=None, choices=[SimpleNamespace(message=SimpleNamespace(
+        content=None, function_call=SimpleNamespace(name="createEvent", arguments=json.dumps(event))
+    ))])
+
+    async def call(attempt, budget_seconds=None):
+        return completion
+    main.upstream_caller.call = call
+
+
+async def call_app(app, path: str, body: bytes) -> int:
+    """One POST through the ASGI app; returns the status code"""
+    messages = [{"type": "http.request", "body": body, "more_body": False}]
+    status = 0
+
+    async def receive():
+        if messages:
+            return messages.pop()
+        await asyncio.Event().wait()
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "POST", "scheme": "http",
+        "path": path, "raw_path": path.encode(), "query_string": b"", "root_path": "",
+        "headers": [(b"host", b"bench"), (b"content-type", b"application/json"),
+                    (b"content-length", str(len(body)).encode())],
+        "client": ("127.0.0.1", 50000), "server": ("bench", 80)
+    }
+    await app(scope, receive, send)
+    return status
+
+
+async def end_to_end(main, path: str, requests: int) -> float:
+    for _ in range(200):
+        assert await call_app(main.app, path, BODY) == 200
+    start = time.perf_counter()
+    for _ in range(requests):
+        await call_app(main.app, path, BODY)
+    return (time.perf_counter() - start) / requests * 1e6
+
+
+def per_call(fn, iterations: int) -> float:
+    for _ in range(min(iterations, 1000)):
+        fn()
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--iterations", type=int, default=50000, help="calls per component timing")
+    args = parser.parse_args()
+
+    os.environ.update(OPENAI_API_KEY="stub-key", OPENAI_BASE_URL="http://127.0.0.1:9/v1", LANGSMITH_TRACING="false",
+                      EXTRACTION_CACHE_BACKEND="off", PREPARSER_MODE="off", RATE_LIMIT_BACKEND="off")
+    main = import_main()
+    import logs
+    from fastapi.encoders import jsonable_encoder
+    from fastapi.responses import JSONResponse
+
+    user_now = main.get_user_now(CURRENT_TIME, "Europe/Berlin")
+    result = main.finalize_event(dict(EVENT), user_now)
+    assert legacy_finalize_event(main, dict(PAST_EVENT), user_now) == main.finalize_event(dict(PAST_EVENT), user_now)
+    assert JSONResponse(jsonable_encoder(result)).body == main.EventJSONResponse(result).body
+
+    def legacy_parse():
+        data = json.loads(BODY)
+        return data.get('text', ''), data.get('current_time'), data.get('user_timezone', 'UTC')
+
+    components = [
+        ("parse body", legacy_parse, lambda: main.ProcessEventRequest.model_validate_json(BODY)),
+        ("finalize event", lambda: legacy_finalize_event(main, dict(EVENT), user_now),
+         lambda: main.finalize_event(dict(EVENT), user_now)),
+        ("finalize past date", lambda: legacy_finalize_event(main, dict(PAST_EVENT), user_now),
+         lambda: main.finalize_event(dict(PAST_EVENT), user_now)),
+        ("encode response", lambda: JSONResponse(jsonable_encoder(result)), lambda: main.EventJSONResponse(result)),
+    ]
+    print(f"{'component':<22} {'before us':>10} {'after us':>10} {'speedup':>8}")
+    # The past-date log line is per request in both versions; keep it out of the component timings
+    logs.get_logger('main').disabled = True
+    for name, old_fn, new_fn in components:
+        old, new = per_call(old_fn, args.iterations), per_call(new_fn, args.iterations)
+        print(f"{name:<22} {old:>10.2f} {new:>10.2f} {old / new:>7.2f}x")
+    logs.get_logger('main').disabled = False
+
+    add_legacy_route(main)
+    new_finalize = main.finalize_event
+    for label, event in (("request", EVENT), ("request, past date", PAST_EVENT)):
+        stub_upstream(main, event)
+        main.finalize_event = lambda details, now: legacy_finalize_event(main, details, now)
+        old = asyncio.run(end_to_end(main, "/process_event_legacy", args.requests))
+        main.finalize_event = new_finalize
+        new = asyncio.run(end_to_end(main, "/process_event", args.requests))
+        print(f"{label:<22} {old:>10.2f} {new:>10.2f} {old / new:>7.2f}x")
@@ -0,0 +1,90 @@
+"""
+Tail latency with and without hedged upstream calls.
+
+Runs /process_event in-process against the local stub LLM with heavy-tailed
+latency (base latency times a Pareto draw) and compares request latency
+percentiles without hedging and with hedging at a few trigger percentiles and
+budgets. Also reports the hedge rate, how often the hedge won, and the extra
+upstream calls actually sent (stub requests per app request).
+
+What to look for:
+- p99 and p99.9 drop sharply, p50 is unchanged
+- the hedge rate stays at or under the budget, so extra calls stay near it
+
+Usage: python benchmarks/hedge_bench.py --requests 2000 --concurrency 16 --latency-ms 40 --alpha 2
+"""
+import argparse
+import asyncio
+import contextlib
+import os
+import time
+from datetime import datetime, timezone
+
+import stub_llm
+from _harness import asgi_client, import_main, percentile, start_stub
+
+STUB_PORT = 9118
+
+SCENARIOS = [
+    # name, Hedger settings (None: hedging off)
+    ("no hedging", None),
+    ("p95, 5% budget", {"percentile": 95, "budget_ratio": 0.05}),
+    ("p90, 10% budget", {"percentile": 90, "budget_ratio": 0.10}),
+]
+
+
+async def run_scenario(main, requests: int, concurrency: int):
+    latencies = []
+    counter = iter(range(requests))
+
+    async def worker(http):
+        for i in counter:
+            payload = {
+                # Distinct texts so single-flight doesn't coalesce them
+                "text": f"Team sync #{i} tomorrow at 10am in Room 4",
+                "current_time": datetime.now(timezone.utc).isoformat(),
+                "user_timezone": "Europe/Berlin",
+            }
+            t0 = time.perf_counter()
+            await http.post("/process_event", json=payload)
+            latencies.append((time.perf_counter() - t0) * 1000)
+
+    async with asgi_client(main.app) as http:
+        await asyncio.gather(*(worker(http) for _ in range(concurrency)))
+    latencies.sort()
+    return latencies
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--latency-ms", type=float, default=40.0, help="base (minimum) stub latency")
+    parser.add_argument("--alpha", type=float, default=2.0, help="Pareto tail index; lower is heavier")
+    args = parser.parse_args()
+
+    start_stub(STUB_PORT, latency_ms=args.latency_ms, pareto_alpha=args.alpha)
+    os.environ["EXTRACTION_CACHE_BACKEND"] = "off"
+    os.environ["RATE_LIMIT_BACKEND"] = "off"
+    os.environ["PREPARSER_MODE"] = "off"
+    # Attempts must outlive the tail so hedging, not timeouts and retries, is measured
+    os.environ.setdefault("UPSTREAM_ATTEMPT_TIMEOUT_SECONDS", "30")
+
+    main = import_main()
+    from upstream import Hedger
+
+    print(f"{'scenario':<16} {'p50 ms':>7} {'p95 ms':>7} {'p99 ms':>7} {'p99.9 ms':>8} {'max ms':>7} "
+          f"{'hedged':>7} {'won':>5} {'skipped':>7} {'extra calls':>11}")
+    for name, settings in SCENARIOS:
+        main.upstream_hedger = Hedger(enabled=settings is not None, **(settings or {}))
+        stub_before = stub_llm.stats["requests"]
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            latencies = asyncio.run(run_scenario(main, args.requests, args.concurrency))
+        stats = main.upstream_hedger.stats()
+        skipped = stats['skipped_budget'] + stats['skipped_saturated']
+        extra = (stub_llm.stats["requests"] - stub_before) / args.requests - 1
+        print(f"{name:<16} {percentile(latencies, 0.5):>7.1f} {percentile(latencies, 0.95):>7.1f} "
+              f"{percentile(latencies, 0.99):>7.1f} {percentile(latencies, 0.999):>8.1f} {latencies[-1]:>7.1f} "
+              f"{stats['hedge_rate']:>7.1%} {stats['hedge_won']:>5} {skipped:>7} {extra:>11.1%}")
+        # Each scenario gets a fresh OpenAI client bound to its own event loop
+        main.client = None
@@ -0,0 +1,353 @@
+"""
+Reproducible load test for /process_event and /log_calendar_save.
+
+Starts the local stub LLM and the backend (uvicorn, --workers N) as separate
+processes, then replays the event-text corpus at fixed request rates. Load is
+open-loop: requests are sent on schedule whether or not earlier ones have
+finished, and latency is measured from the scheduled send time, so a stalled
+server shows up as latency instead of a lower request rate.
+
+For every (endpoint, rate) phase it reports p50/p95/p99 latency, throughput,
+the error-code distribution ('none' for clean extractions, HTTP_<status> and
+client exception names for transport failures) and CPU and RSS for each
+server worker process (read from /proc, Linux only). Results are written to
+a JSON file; --compare prints the differences between two result files.
+
+The extraction cache is off by default so every request reaches the stub;
+pass --app-env EXTRACTION_CACHE_BACKEND=memory to measure with it.
+
+Usage:
+  python benchmarks/load_test.py --rates 5,20,50 --duration 20 --latency-ms 300 --jitter-ms 100 --error-rate 0.02
+  python benchmarks/load_test.py --compare results/before.json results/after.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from typing import List, Optional
+
+import httpx
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from _harness import BACKEND_DIR, BENCH_DIR, percentile, stub_env
+from event_corpus import TEXTS
+
+STUB_PORT = 9114
+APP_PORT = 9214
+TIMEZONES = ["Europe/Berlin", "America/New_York", "UTC", "Asia/Tokyo"]
+CLOCK_TICKS = os.sysconf('SC_CLK_TCK') if hasattr(os, 'sysconf') else 100
+
+
+# --- Worker process accounting (/proc) ---
+
+def _read_stat(pid: int) -> Optional[List[str]]:
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            # comm may contain spaces; the fields after it are space separated
+            return f.read().rsplit(')', 1)[1].split()
+    except (OSError, IndexError):
+        return None
+
+
+def cpu_seconds(pid: int) -> float:
+    fields = _read_stat(pid)
+    if fields is None:
+        return 0.0
+    # utime and stime are fields 14 and 15 of /proc/<pid>/stat
+    return (int(fields[11]) + int(fields[12])) / CLOCK_TICKS
+
+
+def rss_mb(pid: int) -> float:
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return 0.0
+
+
+def worker_pids(server_pid: int) -> List[int]:
+    """Worker processes of a uvicorn server (the server itself when it runs a single worker)"""
+    if not os.path.isdir("/proc"):
+        return []
+    children = []
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        fields = _read_stat(int(entry))
+        if fields is None or int(fields[1]) != server_pid:
+            continue
+        try:
+            with open(f"/proc/{entry}/cmdline", "rb") as f:
+                cmdline = f.read()
+        except OSError:
+            continue
+        if b"resource_tracker" not in cmdline:
+            children.append(int(entry))
+    return sorted(children) or [server_pid]
+
+
+class WorkerSampler:
+    """Samples RSS of the server's workers while a phase runs and diffs their CPU time"""
+
+    def __init__(self, pids: List[int], interval: float = 0.25):
+        self.pids = pids
+        self.interval = interval
+        self.peak_rss = {pid: rss_mb(pid) for pid in pids}
+        self.cpu_start = {pid: cpu_seconds(pid) for pid in pids}
+        self.started = time.monotonic()
+        self._task = None
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            for pid in self.pids:
+                self.peak_rss[pid] = max(self.peak_rss[pid], rss_mb(pid))
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> List[dict]:
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        wall = time.monotonic() - self.started
+        report = []
+        for pid in self.pids:
+            used = cpu_seconds(pid) - self.cpu_start[pid]
+            report.append({
+                "pid": pid,
+                "cpu_seconds": round(used, 3),
+                "cpu_percent": round(100 * used / wall, 1) if wall else 0.0,
+                "rss_mb": round(rss_mb(pid), 1),
+                "peak_rss_mb": round(self.peak_rss[pid], 1)
+            })
+        return report
+
+
+# --- Request generation ---
+
+def process_event_request(i: int) -> dict:
+    return {
+        "text": TEXTS[i % len(TEXTS)],
+        "current_time": datetime.now(timezone.utc).isoformat(),
+        "user_timezone": TIMEZONES[i % len(TIMEZONES)]
+    }
+
+
+def calendar_save_request(i: int) -> dict:
+    return {
+        "success": i % 20 != 0,
+        "event_id": f"evt-{i}",
+        "event_title": "Team Sync",
+        "event_date": "2026-03-14",
+        "event_start_time": "10:00 AM",
+        "event_end_time": "11:00 AM",
+        "error": None if i % 20 else "Calendar API returned 403",
+        "extraction_duration_ms": 640,
+        "save_duration_ms": 180
+    }
+
+
+def process_event_code(response: httpx.Response) -> str:
+    if response.status_code != 200:
+        return f"HTTP_{response.status_code}"
+    return response.json().get("error_code") or "none"
+
+
+def calendar_save_code(response: httpx.Response) -> str:
+    if response.status_code != 200:
+        return f"HTTP_{response.status_code}"
+    return "none" if response.json().get("status") == "logged" else "LOG_ERROR"
+
+
+ENDPOINTS = {
+    "/process_event": (process_event_request, process_event_code),
+    "/log_calendar_save": (calendar_save_request, calendar_save_code),
+}
+
+
+async def run_phase(http: httpx.AsyncClient, endpoint: str, rate: float, duration: float, pids: List[int]) -> dict:
+    make_request, classify = ENDPOINTS[endpoint]
+    latencies = []
+    codes = Counter()
+    total = max(1, int(rate * duration))
+
+    async def send(i: int, scheduled: float):
+        try:
+            response = await http.post(endpoint, json=make_request(i))
+            code = classify(response)
+        except Exception as e:
+            code = type(e).__name__
+        latencies.append((time.monotonic() - scheduled) * 1000)
+        codes[code] += 1
+
+    sampler = WorkerSampler(pids)
+    sampler.start()
+    start = time.monotonic()
+    tasks = []
+    for i in range(total):
+        scheduled = start + i / rate
+        delay = scheduled - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        tasks.append(asyncio.create_task(send(i, scheduled)))
+    await asyncio.gather(*tasks)
+    elapsed = time.monotonic() - start
+    workers = await sampler.stop()
+
+    latencies.sort()
+    return {
+        "endpoint": endpoint,
+        "target_rps": rate,
+        "duration_seconds": round(elapsed, 2),
+        "requests": total,
+        "throughput_rps": round(total / elapsed, 2),
+        "latency_ms": {
+            "p50": round(percentile(latencies, 0.50), 1),
+            "p95": round(percentile(latencies, 0.95), 1),
+            "p99": round(percentile(latencies, 0.99), 1),
+            "max": round(latencies[-1], 1),
+            "mean": round(sum(latencies) / len(latencies), 1)
+        },
+        "error_codes": dict(codes.most_common()),
+        "workers": workers
+    }
+
+
+# --- Process management ---
+
+def wait_for(url: str, timeout: float = 30.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(url, timeout=1.0).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.1)
+    raise RuntimeError(f"{url} did not come up within {timeout:.0f}s")
+
+
+def start_processes(args) -> List[subprocess.Popen]:
+    stub = subprocess.Popen(
+        [sys.executable, os.path.join(BENCH_DIR, "stub_llm.py"), "--port", str(STUB_PORT),
+         "--latency-ms", str(args.latency_ms), "--jitter-ms", str(args.jitter_ms),
+         "--error-rate", str(args.error_rate)],
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    env = dict(os.environ, **stub_env(STUB_PORT), LANGSMITH_TRACING="false", EXTRACTION_CACHE_BACKEND="off",
+               RATE_LIMIT_BACKEND="off")
+    for item in args.app_env:
+        key, _, value = item.partition("=")
+        env[key] = value
+    app = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(APP_PORT),
+         "--workers", str(args.workers), "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    wait_for(f"http://127.0.0.1:{STUB_PORT}/v1/models")
+    wait_for(f"http://127.0.0.1:{APP_PORT}/health")
+    return [stub, app]
+
+
+async def run(args, server_pid: int) -> List[dict]:
+    # Give every worker time to import and warm up before measuring
+    await asyncio.sleep(args.settle_seconds)
+    pids = worker_pids(server_pid)
+    limits = httpx.Limits(max_connections=1000, max_keepalive_connections=200)
+    phases = []
+    async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{APP_PORT}", limits=limits, timeout=60) as http:
+        for endpoint in args.endpoints:
+            for rate in args.rates:
+                phase = await run_phase(http, endpoint, rate, args.duration, pids)
+                phases.append(phase)
+                latency = phase["latency_ms"]
+                print(f"{endpoint:<20} {rate:>6.0f} {phase['throughput_rps']:>8.1f} {latency['p50']:>8.1f} "
+                      f"{latency['p95']:>8.1f} {latency['p99']:>8.1f} "
+                      f"{sum(w['cpu_percent'] for w in phase['workers']):>6.1f} "
+                      f"{max((w['peak_rss_mb'] for w in phase['workers']), default=0):>8.1f}  "
+                      f"{', '.join(f'{k}={v}' for k, v in phase['error_codes'].items())}")
+    return phases
+
+
+def compare(path_a: str, path_b: str):
+    with open(path_a) as f:
+        a = json.load(f)
+    with open(path_b) as f:
+        b = json.load(f)
+    baseline = {(p["endpoint"], p["target_rps"]): p for p in a["phases"]}
+    print(f"{'endpoint':<20} {'rps':>6} {'p50 ms':>16} {'p95 ms':>16} {'p99 ms':>16} {'throughput':>16}")
+    for phase in b["phases"]:
+        old = baseline.get((phase["endpoint"], phase["target_rps"]))
+        if old is None:
+            continue
+        cells = []
+        for key in ("p50", "p95", "p99"):
+            cells.append(f"{old['latency_ms'][key]:.0f}->{phase['latency_ms'][key]:.0f}")
+        cells.append(f"{old['throughput_rps']:.1f}->{phase['throughput_rps']:.1f}")
+        print(f"{phase['endpoint']:<20} {phase['target_rps']:>6.0f} " + " ".join(f"{c:>16}" for c in cells))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rates", default="5,20,50", help="comma-separated request rates (req/s)")
+    parser.add_argument("--duration", type=float, default=20.0, help="seconds per phase")
+    parser.add_argument("--endpoints", default=",".join(ENDPOINTS))
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--latency-ms", type=float, default=300.0)
+    parser.add_argument("--jitter-ms", type=float, default=100.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--app-env", action="append", default=[], metavar="KEY=VALUE",
+                        help="extra environment for the backend, repeatable")
+    parser.add_argument("--settle-seconds", type=float, default=2.0)
+    parser.add_argument("--output", default=None, help="results file (default results/load_test-<time>.json)")
+    parser.add_argument("--compare", nargs=2, metavar=("BEFORE", "AFTER"))
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        sys.exit(0)
+
+    args.rates = [float(x) for x in args.rates.split(",")]
+    args.endpoints = [x for x in args.endpoints.split(",") if x]
+    unknown = set(args.endpoints) - set(ENDPOINTS)
+    if unknown:
+        parser.error(f"unknown endpoints: {', '.join(sorted(unknown))}")
+
+    started_at = datetime.now(timezone.utc)
+    processes = start_processes(args)
+    try:
+        print(f"{'endpoint':<20} {'rps':>6} {'actual':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} "
+              f"{'cpu %':>6} {'peak MB':>8}  error codes")
+        phases = asyncio.run(run(args, processes[1].pid))
+    finally:
+        for process in reversed(processes):
+            process.terminate()
+            process.wait(timeout=15)
+
+    output = args.output or os.path.join(BENCH_DIR, "results", f"load_test-{started_at:%Y%m%dT%H%M%S}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump({
+            "started_at": started_at.isoformat(),
+            "config": {
+                "workers": args.workers,
+                "duration_seconds": args.duration,
+                "stub": {"latency_ms": args.latency_ms, "jitter_ms": args.jitter_ms, "error_rate": args.error_rate},
+                "app_env": args.app_env,
+                "corpus_size": len(TEXTS)
+            },
+            "phases": phases
+        }, f, indent=2)
+    print(f"results written to {output}")
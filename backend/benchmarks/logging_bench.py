@@ -0,0 +1,111 @@
+"""
+Request latency cost of logging: synchronous, unsampled lines vs the queue.
+
+Runs /process_event in-process against the local stub LLM under concurrency
+with two logging setups, writing to a stream whose write() takes
+--write-latency-ms (a slow terminal, a full pipe to the log shipper):
+
+- old: the print()-era behaviour. Every line (DEBUG included) is written
+  inline on the event loop, with the user's text in it.
+- new: the defaults. Lines go through the bounded queue to the listener
+  thread, verbose per-request lines are sampled at LOG_SAMPLE_RATE and user
+  text is dropped.
+
+A blocking write on the event loop stalls every request in flight, so the
+old setup's latency grows with concurrency and write latency; the new one
+stays near the stub's latency.
+
+Usage: python benchmarks/logging_bench.py --requests 400 --concurrency 32 --write-latency-ms 0.5
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import threading
+import time
+from datetime import datetime, timezone
+
+from _harness import asgi_client, import_main, percentile, start_stub
+
+STUB_PORT = 9112
+
+SETUPS = [
+    # name, handler, sample rate, level, user text
+    ("old (sync, all lines)", "sync", 1.0, "DEBUG", "full"),
+    ("new (queue, sampled)", "queue", 0.1, "INFO", "drop"),
+]
+
+
+class SlowStream:
+    """Discards output after sleeping for write_latency seconds per write"""
+
+    def __init__(self, write_latency: float):
+        self.write_latency = write_latency
+        self.writes = 0
+        self._lock = threading.Lock()
+
+    def write(self, data: str):
+        time.sleep(self.write_latency)
+        with self._lock:
+            self.writes += 1
+
+    def flush(self):
+        pass
+
+
+async def run_load(main, requests: int, concurrency: int):
+    latencies = []
+    counter = iter(range(requests))
+
+    async def worker(http):
+        for i in counter:
+            payload = {
+                "text": f"Team sync #{i} tomorrow at 10am in Room 4 with Anna Smith",
+                "current_time": datetime.now(timezone.utc).isoformat(),
+                "user_timezone": "Europe/Berlin",
+            }
+            t0 = time.perf_counter()
+            await http.post("/process_event", json=payload)
+            latencies.append((time.perf_counter() - t0) * 1000)
+
+    async with asgi_client(main.app) as http:
+        await asyncio.gather(*(worker(http) for _ in range(concurrency)))
+    latencies.sort()
+    return latencies
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--latency-ms", type=float, default=50.0)
+    parser.add_argument("--write-latency-ms", type=float, default=0.5)
+    args = parser.parse_args()
+
+    start_stub(STUB_PORT, latency_ms=args.latency_ms, jitter_ms=args.latency_ms / 5)
+    os.environ["EXTRACTION_CACHE_BACKEND"] = "off"
+    os.environ["RATE_LIMIT_BACKEND"] = "off"
+    os.environ["PREPARSER_MODE"] = "off"
+
+    main = import_main()
+    import logs
+
+    print(f"stub latency {args.latency_ms:.0f} ms, log write latency {args.write_latency_ms} ms, "
+          f"concurrency {args.concurrency}")
+    print(f"{'setup':<24} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'req/s':>7} {'lines':>6} {'dropped':>7}")
+    for name, handler, sample_rate, level, user_text in SETUPS:
+        os.environ.update(LOG_LEVEL=level, LOG_USER_TEXT=user_text)
+        stream = SlowStream(args.write_latency_ms / 1000)
+        logs.configure_logging(stream=stream, handler_kind=handler, sample_rate=sample_rate)
+
+        started = time.perf_counter()
+        latencies = asyncio.run(run_load(main, args.requests, args.concurrency))
+        elapsed = time.perf_counter() - started
+        dropped = logs.stats()["dropped"]
+        logs.shutdown_logging()
+
+        print(f"{name:<24} {statistics.median(latencies):>8.1f} {percentile(latencies, 0.95):>8.1f} "
+              f"{percentile(latencies, 0.99):>8.1f} "
+              f"{len(latencies) / elapsed:>7.1f} {stream.writes:>6} {dropped:>7}")
+        # Each run gets a fresh OpenAI client bound to its own event loop
+        main.client = None
@@ -0,0 +1,117 @@
+"""
+Per-request cost of the /metrics instrumentation, measured end to end.
+
+Sends /process_event requests in-process (mock mode, no upstream) through
+three configurations of the same app:
+
+- bare: MetricsMiddleware removed and recording off, i.e. no instrumentation
+  beyond the @timed wrappers' clock reads
+- off: the middleware in place, METRICS_ENABLED=false
+- on: everything recording, as in production
+
+Requests rotate through the configurations one at a time, so drift (CPU
+frequency, GC, cache warmth) hits all three alike, and the p50 of each is
+compared with bare. Two paths are timed: a cache hit, and a miss that runs
+the full mock extraction (validation, prompt build, event validation, result
+counter). Also prints how many metric updates one request of each path makes.
+The target is < 50 µs per request.
+
+Usage: python benchmarks/metrics_bench.py --iterations 5000
+"""
+import argparse
+import asyncio
+import collections
+import contextlib
+import os
+import statistics
+import time
+from datetime import datetime, timezone
+
+from _harness import asgi_client, import_main
+import metrics
+
+PAYLOAD = {
+    "text": "Team sync tomorrow at 10am in Room 4",
+    "current_time": datetime.now(timezone.utc).isoformat(),
+    "user_timezone": "Europe/Berlin",
+}
+CONFIGS = ("bare", "off", "on")
+
+
+def build_stacks(app) -> dict:
+    """Middleware stacks with and without MetricsMiddleware, swapped in per request"""
+    full = app.build_middleware_stack()
+    user_middleware = app.user_middleware
+    app.user_middleware = [m for m in user_middleware if m.cls is not metrics.MetricsMiddleware]
+    try:
+        bare = app.build_middleware_stack()
+    finally:
+        app.user_middleware = user_middleware
+    return {"bare": bare, "off": full, "on": full}
+
+
+@contextlib.contextmanager
+def counting_updates(counts: collections.Counter):
+    """Count histogram observations and counter/gauge updates, the middleware's in-flight gauge included"""
+    observe, inc = metrics._HistogramChild.observe, metrics._ScalarMetric.inc
+    in_flight = metrics.REQUESTS_IN_FLIGHT.values
+
+    class CountingDict(dict):
+        def __setitem__(self, key, value):
+            counts["in_flight"] += 1
+            super().__setitem__(key, value)
+
+    metrics._HistogramChild.observe = lambda self, seconds: (counts.update(["observe"]), observe(self, seconds))
+    metrics._ScalarMetric.inc = lambda self, *args: (counts.update(["inc"]), inc(self, *args))
+    metrics.REQUESTS_IN_FLIGHT.values = CountingDict(in_flight)
+    try:
+        yield
+    finally:
+        metrics._HistogramChild.observe, metrics._ScalarMetric.inc = observe, inc
+        metrics.REQUESTS_IN_FLIGHT.values = in_flight
+
+
+async def run(main, iterations: int):
+    stacks = build_stacks(main.app)
+    timings = {path: {config: [] for config in CONFIGS} for path in ("hit", "miss")}
+    updates = {}
+    async with asgi_client(main.app) as http:
+        await http.post("/process_event", json=PAYLOAD)  # fills the cache
+        for path in ("hit", "miss"):
+            counts = updates[path] = collections.Counter()
+            text = PAYLOAD["text"] + (" #0" if path == "miss" else "")
+            with counting_updates(counts):
+                await http.post("/process_event", json=dict(PAYLOAD, text=text))
+        for i in range(iterations):
+            for n in range(len(CONFIGS)):
+                config = CONFIGS[(i + n) % len(CONFIGS)]
+                main.app.middleware_stack = stacks[config]
+                metrics.registry.enabled = config == "on"
+                for path in ("hit", "miss"):
+                    # Distinct texts miss the cache every time
+                    text = PAYLOAD["text"] if path == "hit" else f"{PAYLOAD['text']} #{i}-{config}"
+                    t0 = time.perf_counter()
+                    await http.post("/process_event", json=dict(PAYLOAD, text=text))
+                    timings[path][config].append((time.perf_counter() - t0) * 1e6)
+    main.app.middleware_stack = stacks["on"]
+    metrics.registry.enabled = True
+    return timings, updates
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=5000, help="requests per configuration and path")
+    args = parser.parse_args()
+
+    os.environ.setdefault("LANGSMITH_TRACING", "false")
+    os.environ.pop("OPENAI_API_KEY", None)
+    os.environ["RATE_LIMIT_BACKEND"] = "off"
+    main = import_main()
+
+    timings, updates = asyncio.run(run(main, args.iterations))
+    print(f"{'path':<5} {'metric updates':>14} {'bare p50 us':>11} {'off p50 us':>10} {'on p50 us':>9} "
+          f"{'on - bare':>9}")
+    for path, by_config in timings.items():
+        p50 = {config: statistics.median(values) for config, values in by_config.items()}
+        print(f"{path:<5} {sum(updates[path].values()):>14} {p50['bare']:>11.1f} {p50['off']:>10.1f} "
+              f"{p50['on']:>9.1f} {p50['on'] - p50['bare']:>+9.1f}")
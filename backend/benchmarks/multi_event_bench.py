@@ -0,0 +1,110 @@
+"""
+Multi-event extraction latency: one request for a whole schedule vs one per session.
+
+Runs in-process against the local stub LLM in --echo mode, so each session
+of a generated conference schedule comes back as its own event. For schedules
+of increasing size it compares:
+
+- one by one: the user selects and extracts each session in turn (N
+  sequential /process_event calls), the only way to get N events before
+- whole text: the schedule sent to /process_event, which returns one event
+- multi: /process_event/multi, which segments, extracts in parallel and
+  deduplicates
+
+and reports wall time, events returned and LLM calls made. Also reports the
+segmenter's own cost on a maximum-length (5000 character) text.
+
+What to look for: multi stays near the single-call latency while returning
+all N events.
+
+Usage: python benchmarks/multi_event_bench.py --sizes 1,2,4,6,8,10 --latency-ms 300
+"""
+import argparse
+import asyncio
+import contextlib
+import os
+import time
+from datetime import datetime, timezone
+
+import stub_llm
+from _harness import asgi_client, import_main, start_stub
+
+STUB_PORT = 9124
+
+SESSIONS = [
+    "9:00 AM - 9:45 AM Opening keynote with Dana Ruiz",
+    "10:00 AM Workshop: Async Python (bring a laptop)",
+    "11:15 AM Panel on observability",
+    "12:30 PM Lunch in the Atrium",
+    "1:30 PM Talk: Scaling Postgres",
+    "2:30 PM Lightning talks",
+    "3:30 PM Hallway track and coffee",
+    "4:00 PM Security deep dive",
+    "5:00 PM Closing remarks",
+    "6:30 PM Speakers dinner at Luigi's",
+]
+
+
+def schedule(sessions: int, run: int) -> str:
+    """A day of a conference programme; run keeps texts distinct across scenarios so nothing is cached"""
+    lines = [f"DevConf {run} - Main Hall, 1 Congress Square", "", "Tuesday, March 11"]
+    lines += SESSIONS[:sessions]
+    return "\n".join(lines)
+
+
+async def scenarios(main, sessions: int, run: int):
+    text = schedule(sessions, run)
+    base = {"current_time": datetime.now(timezone.utc).isoformat(), "user_timezone": "Europe/Berlin"}
+    timings = {}
+    async with asgi_client(main.app) as http:
+        calls = stub_llm.stats["requests"]
+        t0 = time.perf_counter()
+        for line in SESSIONS[:sessions]:
+            await http.post("/process_event", json=dict(base, text=f"Tuesday, March 11 {line} #{run}"))
+        timings["one by one"] = (time.perf_counter() - t0, sessions, stub_llm.stats["requests"] - calls)
+
+        calls = stub_llm.stats["requests"]
+        t0 = time.perf_counter()
+        await http.post("/process_event", json=dict(base, text=text + " (whole)"))
+        timings["whole text"] = (time.perf_counter() - t0, 1, stub_llm.stats["requests"] - calls)
+
+        calls = stub_llm.stats["requests"]
+        t0 = time.perf_counter()
+        response = await http.post("/process_event/multi", json=dict(base, text=text))
+        timings["multi"] = (time.perf_counter() - t0, len(response.json()["events"]),
+                            stub_llm.stats["requests"] - calls)
+    return timings
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="1,2,4,6,8,10", help="comma-separated session counts")
+    parser.add_argument("--latency-ms", type=float, default=300.0)
+    parser.add_argument("--jitter-ms", type=float, default=50.0)
+    args = parser.parse_args()
+
+    start_stub(STUB_PORT, latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, echo=True)
+    os.environ["EXTRACTION_CACHE_BACKEND"] = "off"
+    os.environ["RATE_LIMIT_BACKEND"] = "off"
+    os.environ["PREPARSER_MODE"] = "off"
+
+    main = import_main()
+    from segmenter import segment_text
+
+    print(f"{'sessions':>8} {'scenario':<11} {'wall ms':>8} {'events':>6} {'LLM calls':>9}")
+    for run, sessions in enumerate(int(s) for s in args.sizes.split(",")):
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            timings = asyncio.run(scenarios(main, sessions, run))
+        for name, (seconds, events, calls) in timings.items():
+            print(f"{sessions:>8} {name:<11} {seconds * 1000:>8.0f} {events:>6} {calls:>9}")
+        # Each run gets a fresh OpenAI client bound to its own event loop
+        main.client = None
+
+    long_text = schedule(len(SESSIONS), 0)
+    long_text = (long_text + "\n") * (5000 // (len(long_text) + 1))
+    iterations = 200
+    t0 = time.perf_counter()
+    for _ in range(iterations):
+        spans = segment_text(long_text)
+    print(f"segment_text on {len(long_text)} chars: {len(spans)} spans in "
+          f"{(time.perf_counter() - t0) / iterations * 1e6:.0f} us")
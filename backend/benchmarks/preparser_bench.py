@@ -0,0 +1,57 @@
+"""
+Per-call latency and coverage of the rule-based pre-parser.
+
+Runs a small corpus of typical selections through preparse_event and reports
+p50/p99 latency (target: well under 1 ms) and how many inputs clear the
+confidence threshold, i.e. would skip the LLM in PREPARSER_MODE=primary.
+
+Usage: python benchmarks/preparser_bench.py --iterations 2000 --threshold 0.9
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+from datetime import datetime
+
+import pytz
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from preparser import preparse_event
+
+CORPUS = [
+    "Lunch with Sam tomorrow at 12:30 PM at Cafe Luna",
+    "Dentist appointment on Friday 3pm",
+    "Team standup 10-10:30am Monday in Room 4 with bob@example.com",
+    "Quarterly review March 5 from 2 to 3:30pm at The Hub",
+    "Yoga class tonight 7pm",
+    "Coffee chat 2030-11-02 at 9:15 AM",
+    "Call with Anna between 2 and 3pm next Tuesday",
+    "Meet at 10am or 2pm tomorrow, whichever works",
+    "Hey all! Reminder that the offsite planning session is moved to Thursday afternoon, "
+    "roughly 1:30 (PT), details to follow from jane.doe@example.com",
+    "Happy hour at Luigi's on Friday from 5-7pm",
+]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument("--threshold", type=float, default=0.9)
+    args = parser.parse_args()
+
+    now = pytz.timezone("America/New_York").localize(datetime(2030, 10, 16, 9, 0))
+    print(f"{'p50 us':>8} {'p99 us':>8} {'conf':>5}  text")
+    confident = 0
+    for text in CORPUS:
+        timings = []
+        for _ in range(args.iterations):
+            t0 = time.perf_counter()
+            result = preparse_event(text, now)
+            timings.append((time.perf_counter() - t0) * 1e6)
+        timings.sort()
+        confidence = result.confidence if result else 0.0
+        confident += confidence >= args.threshold
+        print(f"{statistics.median(timings):>8.1f} {timings[int(len(timings) * 0.99) - 1]:>8.1f} {confidence:>5.2f}  {text[:60]}")
+    print(f"\n{confident}/{len(CORPUS)} inputs at or above confidence {args.threshold}")
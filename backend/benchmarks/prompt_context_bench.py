@@ -0,0 +1,94 @@
+"""
+Per-request CPU of timezone handling and system prompt construction.
+
+before: the previous request path. extract_event parses current_time for the
+cache key, process_text parses it again and formats the prompt from scratch
+(three strftime calls and the multi-line f-string), and a fallback resolves
+the timezone and parses the time a third time.
+
+after: current_time is parsed once with a cached timezone lookup, and the
+cache key date, prompt and fallback date come from the memoized
+(timezone, local date) prompt context.
+
+Usage: python benchmarks/prompt_context_bench.py --iterations 50000
+"""
+import argparse
+import os
+import time
+from datetime import datetime, timedelta, timezone
+
+import pytz
+
+from _harness import import_main
+from prompt_context import PromptContext
+
+CURRENT_TIME = datetime.now(timezone.utc).isoformat()
+TIMEZONES = ["Europe/Berlin", "America/New_York", "Asia/Tokyo", "UTC", "Australia/Sydney"]
+
+
+def old_get_user_now(current_time: str, user_timezone: str) -> datetime:
+    try:
+        user_tz = pytz.timezone(user_timezone)
+    except pytz.UnknownTimeZoneError:
+        user_tz = pytz.UTC
+    return datetime.fromisoformat(current_time.replace('Z', '+00:00')).astimezone(user_tz)
+
+
+def old_build_system_prompt(main, user_now: datetime) -> str:
+    current_date = user_now.strftime('%Y-%m-%d')
+    tomorrow_date = (user_now + timedelta(days=1)).strftime('%Y-%m-%d')
+    next_week_date = (user_now + timedelta(weeks=1)).strftime('%Y-%m-%d')
+    # Same template, formatted on every call
+    context = PromptContext.__new__(PromptContext)
+    context.current_date, context.tomorrow_date, context.next_week_date = current_date, tomorrow_date, next_week_date
+    return main.prompt_variant.render(context)
+
+
+def before(main, user_timezone: str, with_fallback: bool):
+    current_date = old_get_user_now(CURRENT_TIME, user_timezone).strftime('%Y-%m-%d')
+    user_now = old_get_user_now(CURRENT_TIME, user_timezone)
+    old_build_system_prompt(main, user_now)
+    if with_fallback:
+        try:
+            user_tz = pytz.timezone(user_timezone)
+        except Exception:
+            user_tz = pytz.UTC
+        datetime.fromisoformat(CURRENT_TIME.replace('Z', '+00:00')).astimezone(user_tz).strftime('%Y-%m-%d')
+    return current_date
+
+
+def after(main, user_timezone: str, with_fallback: bool):
+    user_now = main.get_user_now(CURRENT_TIME, user_timezone)
+    current_date = main.prompt_contexts.get(user_now).current_date
+    main.prompt_contexts.get(user_now).system_prompt()
+    if with_fallback:
+        main.prompt_contexts.get(user_now).current_date
+    return current_date
+
+
+def measure(fn, main, iterations: int, with_fallback: bool) -> float:
+    start = time.perf_counter()
+    for i in range(iterations):
+        fn(main, TIMEZONES[i % len(TIMEZONES)], with_fallback)
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=50000)
+    args = parser.parse_args()
+
+    os.environ.setdefault("LANGSMITH_TRACING", "false")
+    main = import_main()
+
+    # Both paths must agree on the prompt before timing them
+    for name in TIMEZONES:
+        user_now = main.get_user_now(CURRENT_TIME, name)
+        assert old_build_system_prompt(main, old_get_user_now(CURRENT_TIME, name)) == main.build_system_prompt(user_now)
+
+    print(f"{'path':<22} {'before us':>10} {'after us':>10} {'speedup':>8}")
+    for label, with_fallback in (("extraction", False), ("extraction + fallback", True)):
+        measure(after, main, 1000, with_fallback)  # fill the prompt contexts
+        old = measure(before, main, args.iterations, with_fallback)
+        new = measure(after, main, args.iterations, with_fallback)
+        print(f"{label:<22} {old:>10.2f} {new:>10.2f} {old / new:>7.1f}x")
@@ -0,0 +1,230 @@
+"""
+Offline accuracy and token comparison of the prompt variants (prompts.py).
+
+Built on the record/replay harness (recorder.py, benchmarks/replay.py): the
+labeled texts in eval_corpus.py go through process_text under each variant,
+so prompts, schemas and validation are exactly the backend's.
+
+1. Record once per variant against a real (or any OpenAI-compatible) API:
+     python benchmarks/prompt_eval.py --record --model gpt-3.5-turbo
+   Every extraction is appended to the recordings file as a recorder.py
+   record tagged with its variant. Each upstream call in it carries a
+   fingerprint of the system prompt and schema it was made with.
+2. Evaluate offline, as often as needed:
+     python benchmarks/prompt_eval.py
+   Each variant's newest record per text is replayed through process_text
+   with ReplayClient. A record answered for a different prompt (the prompt was
+   edited since) is reported as 'stale' instead of scoring its old answer.
+   Date, start time, end time and location are compared with the labels.
+
+--stub records against the local stub LLM (benchmarks/stub_llm.py) into a
+temporary file and evaluates that, so the harness and the per-call token
+counts can be checked without an API key. The stub's answers ignore the
+prompt, so their accuracy means nothing. Without a recordings file the
+script says so and runs --stub.
+
+Exits with status 1 when a variant's all-fields accuracy is more than
+--max-accuracy-drop below the standard variant's, so it can gate switching
+PROMPT_VARIANT.
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+from _harness import import_main, start_stub
+from eval_corpus import LABELED
+from prompts import VARIANTS
+from replay import REPLAY_ENV
+
+DEFAULT_RECORDINGS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results", "prompt_eval_recordings.jsonl")
+STUB_PORT = 9127
+FIELDS = ("date", "startTime", "endTime", "location")
+TOKEN_PARTS = ("system_prompt", "user_text", "schema", "completion")
+
+# Every labeled text reaches the LLM once, with its exact text in the recording
+EVAL_ENV = {"LANGSMITH_TRACING": "false", "PREPARSER_MODE": "off", "EXTRACTION_CACHE_BACKEND": "off",
+            "RATE_LIMIT_BACKEND": "off", "HEDGE_ENABLED": "false", "RECORD_ANONYMIZE": "false"}
+
+_worker = {}
+
+
+def field_matches(field: str, got, expected: str) -> bool:
+    got = got or ""
+    if field in ("startTime", "endTime"):
+        try:
+            return datetime.strptime(got, '%I:%M %p') == datetime.strptime(expected, '%I:%M %p')
+        except ValueError:
+            return False
+    if field == "location":
+        got, expected = got.lower().strip(), expected.lower().strip()
+        return got == expected if not expected or not got else (expected in got or got in expected)
+    return got == expected
+
+
+def item_key(inputs: dict) -> tuple:
+    return inputs["text"], inputs["current_time"], inputs["user_timezone"]
+
+
+def init_worker(env: dict):
+    os.environ.update(env)
+    _worker["main"] = import_main()
+
+
+def record_corpus() -> int:
+    """Extract every labeled text with recording on; returns the number of records written"""
+    main = _worker["main"]
+
+    async def run():
+        for item in LABELED:
+            try:
+                await main.process_text(item["text"], item["current_time"], item["user_timezone"])
+            except Exception as e:
+                # Recorded with its error; evaluation reports it as missing
+                print(f"  {item['text'][:50]!r}: {e}")
+
+    asyncio.run(run())
+    main.recorder.flush()
+    return main.recorder.stats()["sent"]
+
+
+def record(args, path: str):
+    env = dict(EVAL_ENV, RECORD_PATH=path, MODEL_TIERS=f"default={args.model}")
+    if args.base_url:
+        env["OPENAI_BASE_URL"] = args.base_url
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    for name in args.variants:
+        # The variant is read when main is imported, so each one gets a fresh process
+        with ProcessPoolExecutor(max_workers=1, initializer=init_worker,
+                                 initargs=(dict(env, PROMPT_VARIANT=name),)) as pool:
+            recorded = pool.submit(record_corpus).result()
+        print(f"{name}: recorded {recorded} extractions")
+
+
+def evaluate_corpus(name: str, records: dict) -> dict:
+    """Replay a variant's records against the labels; runs in a worker importing main under that variant"""
+    from recorder import ReplayClient
+    main = _worker["main"]
+    client = main.client = ReplayClient()
+    correct = {field: 0 for field in FIELDS}
+    all_correct = invalid = missing = stale = scored = 0
+    tokens = {part: 0 for part in TOKEN_PARTS + ("api_prompt_tokens",)}
+    failures = []
+
+    async def run():
+        nonlocal all_correct, invalid, missing, stale, scored
+        for item in LABELED:
+            record = records.get(item_key(item))
+            if record is None:
+                missing += 1
+                continue
+            before = dict(main.LLM_TOKENS_TOTAL.values)
+            with client.replaying(record) as state:
+                try:
+                    result, error = await main.process_text(item["text"], item["current_time"],
+                                                            item["user_timezone"]), None
+                except Exception as e:
+                    result, error = None, str(e)
+            if state.missed or state.prompt_changed:
+                stale += 1
+                continue
+            scored += 1
+            for part in TOKEN_PARTS:
+                tokens[part] += main.LLM_TOKENS_TOTAL.values.get(part, 0) - before.get(part, 0)
+            tokens["api_prompt_tokens"] += sum((call.get("usage") or {}).get("prompt_tokens", 0) for call in state.used)
+            if error is not None:
+                invalid += 1
+                failures.append({"text": item["text"], "error": error})
+                continue
+            matched = [field for field in FIELDS if field_matches(field, result.get(field), item["expected"][field])]
+            for field in matched:
+                correct[field] += 1
+            if len(matched) == len(FIELDS):
+                all_correct += 1
+            else:
+                failures.append({"text": item["text"],
+                                 "wrong": {f: [result.get(f), item["expected"][f]] for f in FIELDS if f not in matched}})
+
+    asyncio.run(run())
+    return {
+        "scored": scored,
+        "missing": missing,
+        "stale": stale,
+        "invalid": invalid,
+        "accuracy": round(all_correct / scored, 3) if scored else None,
+        "field_accuracy": {f: round(c / scored, 3) if scored else None for f, c in correct.items()},
+        "tokens_per_call": {part: round(total / scored, 1) if scored else None for part, total in tokens.items()},
+        "failures": failures
+    }
+
+
+def evaluate(args, path: str) -> dict:
+    from recorder import load_records
+    by_variant = {name: {} for name in args.variants}
+    for record in load_records(path):
+        if record.get("prompt_variant") in by_variant and "result" in record["outputs"]:
+            # Appended in order, so the newest recording of a text wins
+            by_variant[record["prompt_variant"]][item_key(record["inputs"])] = record
+    report = {}
+    for name in args.variants:
+        with ProcessPoolExecutor(max_workers=1, initializer=init_worker,
+                                 initargs=(dict(REPLAY_ENV, **EVAL_ENV, PROMPT_VARIANT=name),)) as pool:
+            report[name] = pool.submit(evaluate_corpus, name, by_variant[name]).result()
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--recordings", default=DEFAULT_RECORDINGS)
+    parser.add_argument("--variants", default=",".join(VARIANTS))
+    parser.add_argument("--record", action="store_true", help="call the API and append new recordings")
+    parser.add_argument("--stub", action="store_true", help="record against the local stub LLM and evaluate that")
+    parser.add_argument("--model", default="gpt-3.5-turbo")
+    parser.add_argument("--base-url", default=None)
+    parser.add_argument("--max-accuracy-drop", type=float, default=0.02)
+    parser.add_argument("--show-failures", action="store_true")
+    args = parser.parse_args()
+    args.variants = [v for v in args.variants.split(",") if v]
+
+    if args.record and not args.stub:
+        record(args, args.recordings)
+        sys.exit(0)
+
+    path = args.recordings
+    if not args.stub and not os.path.exists(path):
+        print(f"no recordings at {path}; record them with --record, running against the stub LLM instead")
+        args.stub = True
+    if args.stub:
+        start_stub(STUB_PORT, latency_ms=0)
+        args.base_url = os.environ["OPENAI_BASE_URL"]
+        path = os.path.join(tempfile.mkdtemp(), "prompt_eval_stub.jsonl")
+        record(args, path)
+        print("stub answers ignore the prompt: token counts are real, accuracy is not")
+
+    report = evaluate(args, path)
+    print(f"{'variant':<10} {'scored':>6} {'missing':>7} {'stale':>5} {'invalid':>7} {'accuracy':>8} "
+          f"{'date':>6} {'start':>6} {'end':>6} {'loc':>6} {'prompt':>7} {'schema':>7} {'compl':>6} {'api in':>7}")
+    for name, r in report.items():
+        if not r["scored"]:
+            print(f"{name:<10} no usable recordings ({r['missing']} missing, {r['stale']} stale); "
+                  f"run with --record")
+            continue
+        fa, t = r["field_accuracy"], r["tokens_per_call"]
+        print(f"{name:<10} {r['scored']:>6} {r['missing']:>7} {r['stale']:>5} {r['invalid']:>7} {r['accuracy']:>8.1%} "
+              f"{fa['date']:>6.0%} {fa['startTime']:>6.0%} {fa['endTime']:>6.0%} {fa['location']:>6.0%} "
+              f"{t['system_prompt']:>7.0f} {t['schema']:>7.0f} {t['completion']:>6.0f} {t['api_prompt_tokens']:>7.0f}")
+        if args.show_failures:
+            for failure in r["failures"]:
+                print(f"    {json.dumps(failure)}")
+
+    baseline = report.get("standard")
+    regressed = [name for name, r in report.items()
+                 if not args.stub and baseline and baseline["scored"] and r["scored"] and name != "standard"
+                 and r["accuracy"] < baseline["accuracy"] - args.max_accuracy_drop]
+    if regressed:
+        print(f"accuracy drop above {args.max_accuracy_drop:.0%}: {', '.join(regressed)}")
+        sys.exit(1)
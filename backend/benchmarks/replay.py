@@ -0,0 +1,208 @@
+"""
+Offline replay of recorded extractions: accuracy diffs and per-stage latency.
+
+The backend records extractions when RECORD_PATH is set (see recorder.py):
+one JSON line per process_text call with its inputs, the upstream LLM
+responses it used and its result, PII redacted. This script replays such a
+file through process_text in the current tree, with the upstream answered
+from the recording instead of the network, and reports:
+
+- accuracy: records whose result is unchanged, agreement per field, and
+  results that turned into errors or recovered from one
+- upstream: recorded calls the replay didn't need, calls it made that the
+  recording lacks (misses), and calls answered for a different model or
+  from a response recorded for another prompt
+- latency: per-stage mean/p50/p95 from the app's stage histograms, and
+  records per second
+
+Records are split across --workers processes (default: one per core). Each
+worker imports the app once and replays its share in order. --app-env sets
+backend configuration for the replay (PROMPT_VARIANT, MODEL_TIERS,
+PREPARSER_MODE, ...), so a change can be checked against the corpus before it
+ships. --latency sleeps the recorded upstream time per call for end-to-end
+numbers; by default only local work is timed.
+
+'record' builds a corpus without production traffic: it sends the load-test
+texts through /process_event against the local stub LLM with recording on.
+
+Usage: python benchmarks/replay.py record recordings.jsonl --echo
+       python benchmarks/replay.py replay recordings.jsonl --workers 4 --diff-out diffs.jsonl
+       python benchmarks/replay.py replay recordings.jsonl --app-env PREPARSER_MODE=primary --fail-under 0.95
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+
+from _harness import asgi_client, import_main, start_stub
+
+STUB_PORT = 9126
+
+# Configuration replay always needs: no network, no recording of the replay itself, no
+# server-side state between records, and one upstream call per call site (no hedges)
+REPLAY_ENV = {
+    "OPENAI_API_KEY": "replay", "LANGSMITH_TRACING": "false", "RECORD_PATH": "",
+    "EXTRACTION_CACHE_BACKEND": "off", "RATE_LIMIT_BACKEND": "off", "HEDGE_ENABLED": "false",
+}
+
+_worker = {}
+
+
+def record(args):
+    from event_corpus import TEXTS
+
+    start_stub(STUB_PORT, latency_ms=args.latency_ms, jitter_ms=args.latency_ms / 4, echo=args.echo)
+    os.environ.update(LANGSMITH_TRACING="false", EXTRACTION_CACHE_BACKEND="off", RATE_LIMIT_BACKEND="off",
+                      RECORD_PATH=args.path)
+    main = import_main()
+
+    async def send_all():
+        semaphore = asyncio.Semaphore(args.concurrency)
+        async with asgi_client(main.app) as http:
+            async def one(text: str):
+                async with semaphore:
+                    await http.post("/process_event", json={
+                        "text": text, "current_time": datetime.now(timezone.utc).isoformat(),
+                        "user_timezone": "Europe/Berlin"
+                    })
+            await asyncio.gather(*(one(f"{text} #{n}" if n else text)
+                                   for n in range(args.repeat) for text in TEXTS))
+
+    asyncio.run(send_all())
+    main.recorder.flush()
+    print(f"recorded {main.recorder.stats()['sent']} extractions to {args.path}")
+
+
+def init_worker(env: dict, latency: bool):
+    os.environ.update(env)
+    main = import_main()
+    from recorder import ReplayClient
+    main.client = _worker["client"] = ReplayClient(latency=latency)
+    _worker["main"] = main
+
+
+def replay_chunk(records: list):
+    """Replay records in order; returns (seconds taken, outcomes)"""
+    started = time.perf_counter()
+    outcomes = asyncio.run(_replay_chunk(records))
+    return time.perf_counter() - started, outcomes
+
+
+async def _replay_chunk(records: list) -> list:
+    from recorder import diff_results
+    main, client = _worker["main"], _worker["client"]
+    outcomes = []
+    for record in records:
+        inputs, outputs = record["inputs"], record["outputs"]
+        before = main.STAGE_SECONDS.sums()
+        result, error = None, None
+        with client.replaying(record) as state:
+            started = time.perf_counter()
+            try:
+                result = await main.process_text(inputs["text"], inputs["current_time"], inputs["user_timezone"])
+            except Exception as e:
+                error = str(e)
+            seconds = time.perf_counter() - started
+        after = main.STAGE_SECONDS.sums()
+        stages = {stage: total - before.get(stage, 0.0) for stage, total in after.items()
+                  if total - before.get(stage, 0.0) > 0}
+        stages["process_text"] = seconds
+        outcomes.append({
+            "id": record.get("id"),
+            "text": inputs["text"],
+            "diff": diff_results(outputs.get("result"), result),
+            "recorded_error": outputs.get("error"),
+            "error": error,
+            "stages": stages,
+            "recorded_seconds": record.get("seconds"),
+            "answered": state.answered,
+            "unused": len(state.remaining),
+            "missed": state.missed,
+            "model_changed": state.model_changed,
+            "prompt_changed": state.prompt_changed,
+        })
+    return outcomes
+
+
+def replay(args):
+    from recorder import COMPARED_FIELDS, load_records, summarize_stage_seconds
+
+    records = list(load_records(args.path))
+    if args.limit:
+        records = records[:args.limit]
+    if not records:
+        sys.exit(f"no records in {args.path}")
+    env = dict(REPLAY_ENV)
+    for item in args.app_env:
+        key, _, value = item.partition("=")
+        env[key] = value
+    workers = min(args.workers, len(records))
+    chunks = [records[i::workers] for i in range(workers)]
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_worker, initargs=(env, args.latency)) as pool:
+        results = list(pool.map(replay_chunk, chunks))
+    # Chunks run side by side; the slowest one is the replay's wall time, app imports excluded
+    wall = max(seconds for seconds, _ in results)
+    outcomes = [outcome for _, chunk in results for outcome in chunk]
+
+    total = len(outcomes)
+    unchanged = sum(not o["diff"] and bool(o["error"]) == bool(o["recorded_error"]) for o in outcomes)
+    print(f"replayed {total} records on {workers} workers in {wall:.2f} s ({total / wall:.1f} records/s)")
+    print(f"unchanged results: {unchanged}/{total} ({unchanged / total:.1%})")
+    print("field agreement: " + ", ".join(
+        f"{field} {sum(field not in o['diff'] for o in outcomes) / total:.1%}" for field in COMPARED_FIELDS))
+    print(f"new errors: {sum(bool(o['error']) and not o['recorded_error'] for o in outcomes)}, "
+          f"fixed errors: {sum(o['recorded_error'] is not None and not o['error'] for o in outcomes)}")
+    print(f"upstream calls: {sum(o['answered'] for o in outcomes)} answered, "
+          f"{sum(o['unused'] for o in outcomes)} recorded but not needed, {sum(o['missed'] for o in outcomes)} missed, "
+          f"{sum(o['model_changed'] for o in outcomes)} answered for another model, "
+          f"{sum(o['prompt_changed'] for o in outcomes)} for another prompt")
+
+    recorded = sorted(o["recorded_seconds"] for o in outcomes if o["recorded_seconds"] is not None)
+    if recorded:
+        print(f"recorded process_text p50 {recorded[len(recorded) // 2] * 1000:.1f} ms")
+    print(f"{'stage':<22} {'mean ms':>9} {'p50 ms':>9} {'p95 ms':>9}")
+    for stage, summary in summarize_stage_seconds([o["stages"] for o in outcomes]).items():
+        print(f"{stage:<22} {summary['mean_ms']:>9.3f} {summary['p50_ms']:>9.3f} {summary['p95_ms']:>9.3f}")
+
+    changed = [o for o in outcomes if o["diff"] or bool(o["error"]) != bool(o["recorded_error"])]
+    for outcome in changed[:args.show]:
+        print(f"- {outcome['text'][:60]!r}: " + (f"error {outcome['error']!r}" if outcome["error"] else
+                                                   json.dumps(outcome["diff"])))
+    if args.diff_out:
+        with open(args.diff_out, "w", encoding="utf-8") as f:
+            for outcome in changed:
+                f.write(json.dumps(outcome, default=str) + "\n")
+    if args.fail_under is not None and unchanged / total < args.fail_under:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    record_parser = commands.add_parser("record", help="record the load-test corpus against the stub LLM")
+    record_parser.add_argument("path")
+    record_parser.add_argument("--repeat", type=int, default=1, help="copies of each text, made distinct")
+    record_parser.add_argument("--concurrency", type=int, default=8)
+    record_parser.add_argument("--latency-ms", type=float, default=300.0)
+    record_parser.add_argument("--echo", action="store_true", help="stub answers depend on the text")
+
+    replay_parser = commands.add_parser("replay", help="replay a recording through the current tree")
+    replay_parser.add_argument("path")
+    replay_parser.add_argument("--workers", type=int, default=len(os.sched_getaffinity(0))
+                               if hasattr(os, "sched_getaffinity") else os.cpu_count() or 1)
+    replay_parser.add_argument("--limit", type=int, default=0, help="replay only the first N records")
+    replay_parser.add_argument("--latency", action="store_true", help="wait the recorded upstream time per call")
+    replay_parser.add_argument("--app-env", action="append", default=[], metavar="KEY=VALUE",
+                               help="backend configuration for the replay, repeatable")
+    replay_parser.add_argument("--show", type=int, default=10, help="changed records to print")
+    replay_parser.add_argument("--diff-out", default=None, help="write every changed record as JSONL")
+    replay_parser.add_argument("--fail-under", type=float, default=None,
+                               help="exit 1 if the unchanged share is below this (e.g. 0.95)")
+    args = parser.parse_args()
+    record(args) if args.command == "record" else replay(args)
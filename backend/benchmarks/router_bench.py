@@ -0,0 +1,96 @@
+"""
+Latency of adaptive model routing versus sending everything to one model.
+
+Runs /process_event in-process over the load-test corpus against the local
+stub LLM standing in for two tiers: 'fast' answers quickly but a fraction of
+its answers fail EventDetails validation, 'strong' is slower and always
+valid. Scenarios:
+
+- all strong: MODEL_TIERS=strong=strong, the cost/latency baseline
+- routed: MODEL_TIERS=fast=fast,strong=strong, simple texts go to fast,
+  complex ones straight to strong, invalid fast answers escalate
+
+Reports p50/p95 request latency, the routing mix, escalations by reason,
+fallbacks, and mean LLM call latency per tier.
+
+Usage: python benchmarks/router_bench.py --passes 4 --concurrency 8 --invalid-rate 0.1
+"""
+import argparse
+import asyncio
+import contextlib
+import os
+import statistics
+import time
+from datetime import datetime, timezone
+
+from _harness import asgi_client, import_main, percentile, start_stub
+from event_corpus import TEXTS
+
+STUB_PORT = 9116
+
+SCENARIOS = [
+    ("all strong", "strong=strong"),
+    ("routed", "fast=fast,strong=strong"),
+]
+
+
+async def run_scenario(main, passes: int, concurrency: int):
+    latencies = []
+    fallbacks = 0
+    counter = iter(range(passes * len(TEXTS)))
+
+    async def worker(http):
+        nonlocal fallbacks
+        for i in counter:
+            payload = {
+                # Suffix keeps texts distinct so single-flight doesn't coalesce passes
+                "text": f"{TEXTS[i % len(TEXTS)]} #{i // len(TEXTS)}",
+                "current_time": datetime.now(timezone.utc).isoformat(),
+                "user_timezone": "Europe/Berlin",
+            }
+            t0 = time.perf_counter()
+            resp = await http.post("/process_event", json=payload)
+            latencies.append((time.perf_counter() - t0) * 1000)
+            fallbacks += resp.json().get("error_code") not in (None, "")
+
+    async with asgi_client(main.app) as http:
+        await asyncio.gather(*(worker(http) for _ in range(concurrency)))
+    latencies.sort()
+    return latencies, fallbacks
+
+
+def delta(after: dict, before: dict) -> dict:
+    return {key: value - before.get(key, 0) for key, value in after.items() if value - before.get(key, 0)}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--passes", type=int, default=4, help="times through the corpus per scenario")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--fast-ms", type=float, default=60.0)
+    parser.add_argument("--strong-ms", type=float, default=300.0)
+    parser.add_argument("--invalid-rate", type=float, default=0.1, help="share of invalid 'fast' answers")
+    args = parser.parse_args()
+
+    start_stub(STUB_PORT, jitter_ms=args.fast_ms / 5, model_latency_ms={"fast": args.fast_ms, "strong": args.strong_ms},
+               invalid_rate=args.invalid_rate, invalid_models=["fast"])
+    os.environ["EXTRACTION_CACHE_BACKEND"] = "off"
+    os.environ["RATE_LIMIT_BACKEND"] = "off"
+    os.environ["PREPARSER_MODE"] = "off"
+
+    main = import_main()
+    from router import ModelRouter, parse_tiers
+
+    print(f"{'scenario':<12} {'p50 ms':>8} {'p95 ms':>8} {'mean ms':>8} {'fallback':>8}  routed / escalations / tier mean ms")
+    for name, tiers in SCENARIOS:
+        main.model_router = ModelRouter(parse_tiers(tiers))
+        before = main.model_router.stats()
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            latencies, fallbacks = asyncio.run(run_scenario(main, args.passes, args.concurrency))
+        after = main.model_router.stats()
+        tier_ms = {tier: round(s["mean"] * 1000) for tier, s in after["latency_seconds"].items() if s["count"]}
+        print(f"{name:<12} {statistics.median(latencies):>8.1f} {percentile(latencies, 0.95):>8.1f} {statistics.mean(latencies):>8.1f} "
+              f"{fallbacks:>8}  {delta(after['routed'], before['routed'])} / "
+              f"{delta(after['escalations'], before['escalations'])} / {tier_ms}")
+        # Each scenario gets a fresh OpenAI client bound to its own event loop
+        main.client = None
@@ -0,0 +1,139 @@
+"""
+Throughput of the gunicorn serving profile by worker count and event loop.
+
+Starts the stub LLM and the backend under gunicorn.conf.py (serving.py
+workers) as separate processes, then drives /process_event closed-loop at a
+fixed concurrency for --duration seconds per configuration. The stub answers
+fast (--latency-ms) so the backend's own CPU, not upstream latency, limits
+throughput.
+
+For each configuration it reports requests/s, p50/p99 latency, CPU used by
+the server processes, and their proportional set size (PSS, Linux only), which
+counts pages shared copy-on-write after a preloading fork only once.
+
+Throughput can only scale up to the number of cores: the load generator and
+the stub compete for the same CPUs, so on small machines expect it to flatten
+early. Run it on the target instance size to pick WEB_CONCURRENCY.
+
+Usage: python benchmarks/serving_bench.py --workers 1,2,4 --loops auto,asyncio --concurrency 64 --duration 15
+"""
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import time
+from typing import List
+
+import httpx
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from _harness import BACKEND_DIR, BENCH_DIR, percentile, stub_env
+from event_corpus import TEXTS
+from load_test import cpu_seconds, wait_for
+
+STUB_PORT = 9120
+APP_PORT = 9220
+
+
+def server_pids(master_pid: int) -> List[int]:
+    """The gunicorn master and its workers"""
+    pids = [master_pid]
+    for entry in os.listdir("/proc"):
+        if entry.isdigit():
+            try:
+                with open(f"/proc/{entry}/stat") as f:
+                    if int(f.read().rsplit(")", 1)[1].split()[1]) == master_pid:
+                        pids.append(int(entry))
+            except (OSError, IndexError, ValueError):
+                continue
+    return pids
+
+
+def pss_mb(pid: int) -> float:
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as f:
+            for line in f:
+                if line.startswith("Pss:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return 0.0
+
+
+def start_server(workers: int, loop: str, preload: bool) -> subprocess.Popen:
+    env = dict(os.environ, **stub_env(STUB_PORT), LANGSMITH_TRACING="false", EXTRACTION_CACHE_BACKEND="off",
+               RATE_LIMIT_BACKEND="off", LOG_LEVEL="WARNING",
+               PORT=str(APP_PORT), WEB_CONCURRENCY=str(workers), SERVER_LOOP=loop,
+               SERVER_HTTP="h11" if loop == "asyncio" else "auto", SERVER_PRELOAD=str(preload).lower())
+    server = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "main:app"],
+        cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    wait_for(f"http://127.0.0.1:{APP_PORT}/health")
+    return server
+
+
+async def saturate(concurrency: int, duration: float) -> List[float]:
+    latencies = []
+    deadline = time.monotonic() + duration
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async def worker(http, offset: int):
+        i = offset
+        while time.monotonic() < deadline:
+            # Suffix keeps texts distinct so single-flight doesn't coalesce them
+            payload = {"text": f"{TEXTS[i % len(TEXTS)]} #{i}", "user_timezone": "Europe/Berlin",
+                       "current_time": "2025-03-10T09:00:00Z"}
+            t0 = time.perf_counter()
+            await http.post("/process_event", json=payload)
+            latencies.append((time.perf_counter() - t0) * 1000)
+            i += concurrency
+
+    async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{APP_PORT}", limits=limits, timeout=60) as http:
+        await asyncio.gather(*(worker(http, n) for n in range(concurrency)))
+    latencies.sort()
+    return latencies
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", default="1,2,4", help="comma-separated WEB_CONCURRENCY values")
+    parser.add_argument("--loops", default="auto", help="comma-separated SERVER_LOOP values (auto, asyncio)")
+    parser.add_argument("--no-preload", action="store_true", help="also measure each config without preload")
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--duration", type=float, default=15.0)
+    parser.add_argument("--latency-ms", type=float, default=20.0)
+    parser.add_argument("--settle-seconds", type=float, default=2.0)
+    args = parser.parse_args()
+
+    stub = subprocess.Popen(
+        [sys.executable, os.path.join(BENCH_DIR, "stub_llm.py"), "--port", str(STUB_PORT),
+         "--latency-ms", str(args.latency_ms)],
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    wait_for(f"http://127.0.0.1:{STUB_PORT}/v1/models")
+    print(f"cores available: {len(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else os.cpu_count()}")
+    print(f"{'workers':>7} {'loop':<8} {'preload':<7} {'req/s':>8} {'p50 ms':>8} {'p99 ms':>8} {'cpu %':>6} {'PSS MB':>7}")
+    try:
+        for loop in args.loops.split(","):
+            for workers in (int(w) for w in args.workers.split(",")):
+                for preload in ((True, False) if args.no_preload else (True,)):
+                    server = start_server(workers, loop, preload)
+                    try:
+                        time.sleep(args.settle_seconds)
+                        pids = server_pids(server.pid)
+                        cpu_before = sum(cpu_seconds(pid) for pid in pids)
+                        latencies = asyncio.run(saturate(args.concurrency, args.duration))
+                        cpu = sum(cpu_seconds(pid) for pid in pids) - cpu_before
+                        memory = sum(pss_mb(pid) for pid in pids)
+                    finally:
+                        server.terminate()
+                        server.wait(timeout=60)
+                    print(f"{workers:>7} {loop:<8} {str(preload).lower():<7} {len(latencies) / args.duration:>8.1f} "
+                          f"{percentile(latencies, 0.5):>8.1f} {percentile(latencies, 0.99):>8.1f} "
+                          f"{cpu / args.duration * 100:>6.0f} {memory:>7.1f}")
+    finally:
+        stub.terminate()
+        stub.wait(timeout=15)
@@ -0,0 +1,70 @@
+"""
+Cold start benchmark: process spawn -> first /health -> /ready -> first extraction.
+
+Launches `uvicorn main:app` in a fresh interpreter (against the local stub LLM)
+several times and reports the median time until the server first answers
+/health, until /ready reports ready, and how long the first /process_event
+takes after that. Run it before and after startup changes to catch regressions.
+
+Usage: python benchmarks/startup_bench.py --runs 5
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+
+import httpx
+
+import stub_llm
+from _harness import BACKEND_DIR, stub_env
+
+STUB_PORT = 9106
+APP_PORT = 9206
+
+
+def wait_for(url: str, deadline: float, ok_status=200) -> float:
+    while time.perf_counter() < deadline:
+        try:
+            if httpx.get(url, timeout=0.5).status_code == ok_status:
+                return time.perf_counter()
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.005)
+    raise TimeoutError(url)
+
+
+def one_run():
+    env = dict(os.environ, **stub_env(STUB_PORT))
+    env.setdefault("LANGSMITH_TRACING", "false")
+    t0 = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(APP_PORT), "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        base = f"http://127.0.0.1:{APP_PORT}"
+        health = wait_for(f"{base}/health", t0 + 60) - t0
+        ready = wait_for(f"{base}/ready", t0 + 60) - t0
+        payload = {"text": "Team sync tomorrow at 10am in Room 4", "current_time": datetime.now(timezone.utc).isoformat()}
+        t1 = time.perf_counter()
+        httpx.post(f"{base}/process_event", json=payload, timeout=30)
+        first_extraction = time.perf_counter() - t1
+        return health, ready, first_extraction
+    finally:
+        proc.terminate()
+        proc.wait()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--latency-ms", type=float, default=50.0)
+    args = parser.parse_args()
+
+    stub_llm.start_in_thread(STUB_PORT, latency_ms=args.latency_ms)
+    runs = [one_run() for _ in range(args.runs)]
+    for label, index in (("spawn -> /health", 0), ("spawn -> /ready", 1), ("first /process_event", 2)):
+        print(f"{label:>22}: {statistics.median(r[index] for r in runs) * 1000:8.1f} ms (median of {args.runs})")
@@ -0,0 +1,71 @@
+"""
+Local trace collector stub for the HTTP trace exporter.
+
+Accepts POST /runs with {"runs": [...]} after a configurable delay and keeps
+counts, so trace export can be exercised with a slow or failing backend.
+Point the backend at it with TRACE_EXPORTER=http and
+TRACE_COLLECTOR_URL=http://127.0.0.1:<port>/runs.
+
+Usage: python benchmarks/stub_collector.py --port 9300 --latency-ms 500
+"""
+import argparse
+import asyncio
+import random
+import threading
+import time
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+
+class CollectorConfig:
+    latency_ms = 0.0
+    error_rate = 0.0
+
+
+config = CollectorConfig()
+stats = {"batches": 0, "runs": 0, "errors": 0}
+received = []
+
+app = FastAPI()
+
+
+@app.post("/runs")
+async def ingest(request: Request):
+    body = await request.json()
+    await asyncio.sleep(config.latency_ms / 1000)
+    if config.error_rate and random.random() < config.error_rate:
+        stats["errors"] += 1
+        return JSONResponse(status_code=503, content={"error": "collector unavailable"})
+    stats["batches"] += 1
+    stats["runs"] += len(body["runs"])
+    received.extend(body["runs"])
+    return {"accepted": len(body["runs"])}
+
+
+@app.get("/stats")
+async def get_stats():
+    return stats
+
+
+def start_in_thread(port: int, latency_ms: float = 0.0, error_rate: float = 0.0):
+    """Run the collector on its own event loop in a daemon thread; returns the uvicorn Server"""
+    config.latency_ms = latency_ms
+    config.error_rate = error_rate
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.01)
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=9300)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    args = parser.parse_args()
+    config.latency_ms = args.latency_ms
+    config.error_rate = args.error_rate
+    uvicorn.run(app, host="127.0.0.1", port=args.port, log_level="warning")
@@ -0,0 +1,234 @@
+"""
+Local OpenAI-compatible stub server for benchmarks.
+
+Serves /v1/models and /v1/chat/completions with a canned createEvent
+function call, after a configurable latency. Faults can be injected: a
+fraction of requests answered with 429s (--error-rate, optional Retry-After)
+and a fraction delayed by an extra --slow-ms (--slow-rate) for tail latency.
+--pareto-alpha makes latency heavy-tailed instead: the base latency is
+multiplied by a Pareto(alpha) draw (>= 1; alpha 2 gives a p99 of 10x). Point the backend at it with
+OPENAI_BASE_URL=http://127.0.0.1:<port>/v1 and any OPENAI_API_KEY.
+
+To stand in for several model tiers, --model-latency gives some models their
+own base latency, and --invalid-rate answers a fraction of requests to
+--invalid-models (all models when empty) with a startTime that fails
+EventDetails validation.
+
+--echo makes createEvent answers depend on the text: the start time is the
+first "H:MM AM/PM" in it and the title the words that follow on that line,
+so distinct spans of a schedule come back as distinct events.
+
+Usage: python benchmarks/stub_llm.py --port 9100 --latency-ms 300 --jitter-ms 50
+       python benchmarks/stub_llm.py --model-latency fast=60,strong=300 --invalid-rate 0.1 --invalid-models fast
+"""
+import argparse
+import asyncio
+import json
+import random
+import re
+import threading
+import time
+from datetime import datetime, timedelta
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from starlette.requests import ClientDisconnect
+
+
+class StubConfig:
+    latency_ms = 300.0
+    jitter_ms = 0.0
+    error_rate = 0.0
+    retry_after_ms = None
+    slow_rate = 0.0
+    slow_ms = 0.0
+    model_latency_ms = {}
+    invalid_rate = 0.0
+    invalid_models = set()
+    pareto_alpha = None
+    echo = False
+
+
+config = StubConfig()
+stats = {"requests": 0, "errors": 0, "invalid": 0, "by_model": {}}
+
+app = FastAPI()
+
+
+ECHO_TIME = re.compile(r"(\d{1,2}):(\d{2})\s*([AaPp][Mm])")
+
+
+def echo_event(user_text: str):
+    """canned_event with the start time and title taken from the first time in user_text"""
+    event = canned_event()
+    match = ECHO_TIME.search(user_text)
+    if match:
+        event["startTime"] = f"{int(match.group(1)):02d}:{match.group(2)} {match.group(3).upper()}"
+        words = re.findall(r"[A-Za-z][A-Za-z'-]*", user_text[match.end():].split("\n", 1)[0])
+        event["title"] = " ".join(w for w in words if w.upper() not in ("AM", "PM"))[:40] or event["title"]
+    return event
+
+
+def canned_event():
+    """Event arguments the stub returns for every extraction"""
+    tomorrow = (datetime.now() + timedelta(days=1)).strftime('%Y-%m-%d')
+    return {
+        "title": "Team Sync",
+        "date": tomorrow,
+        "startTime": "10:00 AM",
+        "endTime": "11:00 AM",
+        "location": "Room 4",
+        "attendees": [],
+        "description": "Weekly team sync"
+    }
+
+
+@app.get("/v1/models")
+async def list_models():
+    return {"object": "list", "data": [{"id": "gpt-3.5-turbo", "object": "model", "created": 0, "owned_by": "stub"}]}
+
+
+def function_call_for(body: dict, invalid: bool = False):
+    """Answer createEvent with one canned event, createEvents with one per numbered text"""
+    name = (body.get("function_call") or {}).get("name", "createEvent")
+    if name == "createEvents":
+        user_text = body["messages"][-1]["content"]
+        count = len(re.findall(r"^\[\d+\] ", user_text, re.MULTILINE))
+        events = [dict(canned_event(), index=i) for i in range(count)]
+        return {"name": name, "arguments": json.dumps({"events": events})}
+    event = echo_event(body["messages"][-1]["content"]) if config.echo else canned_event()
+    if invalid:
+        event["startTime"] = "10 AM"  # not HH:MM AM/PM
+    return {"name": name, "arguments": json.dumps(event)}
+
+
+def parse_model_latency(spec: str) -> dict:
+    """'fast=60,strong=300' -> {'fast': 60.0, 'strong': 300.0}"""
+    latency = {}
+    for part in (spec or '').split(','):
+        if part.strip():
+            model, _, ms = part.partition('=')
+            latency[model.strip()] = float(ms)
+    return latency
+
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+    try:
+        body = await request.json()
+    except ClientDisconnect:
+        # The caller cancelled (e.g. a hedge lost) before the body was read
+        return Response(status_code=499)
+    model = body.get("model", "")
+    stats["requests"] += 1
+    stats["by_model"][model] = stats["by_model"].get(model, 0) + 1
+    delay = config.model_latency_ms.get(model, config.latency_ms)
+    if config.pareto_alpha:
+        delay *= random.paretovariate(config.pareto_alpha)
+    delay += random.uniform(-config.jitter_ms, config.jitter_ms)
+    if config.slow_rate and random.random() < config.slow_rate:
+        delay += config.slow_ms
+    await asyncio.sleep(max(delay, 0) / 1000)
+
+    if config.error_rate and random.random() < config.error_rate:
+        stats["errors"] += 1
+        headers = {"retry-after-ms": str(config.retry_after_ms)} if config.retry_after_ms is not None else None
+        return JSONResponse(status_code=429, headers=headers,
+                            content={"error": {"message": "Rate limit reached", "type": "requests", "code": "rate_limit_exceeded"}})
+
+    invalid = (config.invalid_rate and (not config.invalid_models or model in config.invalid_models)
+               and random.random() < config.invalid_rate)
+    if invalid:
+        stats["invalid"] += 1
+
+    if body.get("stream"):
+        return StreamingResponse(stream_chunks(function_call_for(body, invalid)), media_type="text/event-stream")
+
+    return {
+        "id": "chatcmpl-stub",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": "gpt-3.5-turbo",
+        "choices": [{
+            "index": 0,
+            "finish_reason": "stop",
+            "message": {
+                "role": "assistant",
+                "content": None,
+                "function_call": function_call_for(body, invalid)
+            }
+        }],
+        "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0}
+    }
+
+
+async def stream_chunks(function_call: dict, chunk_size: int = 8):
+    """Stream the function call as OpenAI delta chunks; the latency above acts as time-to-first-token"""
+    def chunk(delta, finish_reason=None):
+        payload = {
+            "id": "chatcmpl-stub",
+            "object": "chat.completion.chunk",
+            "created": int(time.time()),
+            "model": "gpt-3.5-turbo",
+            "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}]
+        }
+        return f"data: {json.dumps(payload)}\n\n"
+
+    arguments = function_call["arguments"]
+    yield chunk({"role": "assistant", "content": None, "function_call": {"name": function_call["name"], "arguments": ""}})
+    for start in range(0, len(arguments), chunk_size):
+        await asyncio.sleep(0.005)
+        yield chunk({"function_call": {"arguments": arguments[start:start + chunk_size]}})
+    yield chunk({}, finish_reason="stop")
+    yield "data: [DONE]\n\n"
+
+
+def start_in_thread(port: int, latency_ms: float = 300.0, jitter_ms: float = 0.0, error_rate: float = 0.0,
+                    slow_rate: float = 0.0, slow_ms: float = 0.0, model_latency_ms: dict = None,
+                    invalid_rate: float = 0.0, invalid_models=(), pareto_alpha: float = None, echo: bool = False):
+    """Run the stub on its own event loop in a daemon thread; returns the uvicorn Server"""
+    config.latency_ms = latency_ms
+    config.jitter_ms = jitter_ms
+    config.error_rate = error_rate
+    config.slow_rate = slow_rate
+    config.slow_ms = slow_ms
+    config.model_latency_ms = dict(model_latency_ms or {})
+    config.invalid_rate = invalid_rate
+    config.invalid_models = set(invalid_models)
+    config.pareto_alpha = pareto_alpha
+    config.echo = echo
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.01)
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=9100)
+    parser.add_argument("--latency-ms", type=float, default=300.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--retry-after-ms", type=int, default=None)
+    parser.add_argument("--slow-rate", type=float, default=0.0)
+    parser.add_argument("--slow-ms", type=float, default=0.0)
+    parser.add_argument("--model-latency", default="", help="per-model base latency, e.g. fast=60,strong=300")
+    parser.add_argument("--invalid-rate", type=float, default=0.0)
+    parser.add_argument("--invalid-models", default="", help="comma-separated; empty means every model")
+    parser.add_argument("--pareto-alpha", type=float, default=None, help="heavy-tailed latency multiplier")
+    parser.add_argument("--echo", action="store_true", help="title and start time from the text")
+    args = parser.parse_args()
+    config.latency_ms = args.latency_ms
+    config.jitter_ms = args.jitter_ms
+    config.error_rate = args.error_rate
+    config.retry_after_ms = args.retry_after_ms
+    config.slow_rate = args.slow_rate
+    config.slow_ms = args.slow_ms
+    config.model_latency_ms = parse_model_latency(args.model_latency)
+    config.invalid_rate = args.invalid_rate
+    config.invalid_models = {m for m in args.invalid_models.split(",") if m}
+    config.pareto_alpha = args.pareto_alpha
+    config.echo = args.echo
+    uvicorn.run(app, host="127.0.0.1", port=args.port, log_level="warning")
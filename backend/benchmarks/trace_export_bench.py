@@ -0,0 +1,75 @@
+"""
+Request latency with trace export against a slow collector.
+
+Runs /process_event load (stub LLM) with TRACE_EXPORTER=http pointed at the
+local stub collector, which answers each batch after --collector-latency-ms.
+Request latency should not depend on collector latency; the trace counters
+show how many runs were queued, sent and dropped under backpressure.
+
+Usage: python benchmarks/trace_export_bench.py --collector-latency-ms 1000 --queue-size 200
+"""
+import argparse
+import asyncio
+import contextlib
+import os
+import statistics
+import time
+from datetime import datetime, timezone
+
+import stub_collector
+from _harness import asgi_client, import_main, percentile, start_stub
+
+STUB_PORT = 9108
+COLLECTOR_PORT = 9300
+
+
+async def run_load(app, requests: int, concurrency: int):
+    latencies = []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(http, i):
+        payload = {
+            "text": f"Planning session #{i} with jane.doe@example.com tomorrow at 10am",
+            "current_time": datetime.now(timezone.utc).isoformat(),
+        }
+        async with semaphore:
+            t0 = time.perf_counter()
+            await http.post("/process_event", json=payload)
+            latencies.append((time.perf_counter() - t0) * 1000)
+
+    async with asgi_client(app) as http:
+        await asyncio.gather(*(one(http, i) for i in range(requests)))
+    return statistics.median(latencies), percentile(latencies, 0.95)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--latency-ms", type=float, default=50.0, help="stub LLM latency")
+    parser.add_argument("--collector-latency-ms", type=float, default=1000.0)
+    parser.add_argument("--queue-size", type=int, default=200)
+    parser.add_argument("--drop-policy", default="drop_newest")
+    args = parser.parse_args()
+
+    start_stub(STUB_PORT, latency_ms=args.latency_ms)
+    stub_collector.start_in_thread(COLLECTOR_PORT, latency_ms=args.collector_latency_ms)
+    os.environ.update(
+        TRACE_EXPORTER=os.environ.get("TRACE_EXPORTER", "http"),
+        TRACE_COLLECTOR_URL=f"http://127.0.0.1:{COLLECTOR_PORT}/runs",
+        TRACE_QUEUE_MAX_SIZE=str(args.queue_size),
+        TRACE_DROP_POLICY=args.drop_policy,
+        EXTRACTION_CACHE_BACKEND="off",
+        RATE_LIMIT_BACKEND="off",
+        PREPARSER_MODE="off",
+    )
+
+    main = import_main()
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        p50, p95 = asyncio.run(run_load(main.app, args.requests, args.concurrency))
+        if main.tracer.queue is not None:
+            main.tracer.queue.flush(timeout=30)
+
+    print(f"request latency: p50 {p50:.1f} ms, p95 {p95:.1f} ms (stub LLM {args.latency_ms:.0f} ms)")
+    print(f"trace queue: {main.tracer.stats()}")
+    print(f"collector: {stub_collector.stats}")
@@ -0,0 +1,97 @@
+"""
+Upstream resilience under injected faults: retries, deadlines and the breaker.
+
+Runs /process_event in-process against the local stub LLM for a series of
+fault scenarios (429 bursts, a slow tail, a full outage) and reports request
+latency, how many answers fell back, and the upstream counters: attempts,
+retries, budget exhaustion and circuit-breaker opens/rejections.
+
+What to look for:
+- with retries, 429s mostly turn into successes instead of fallbacks
+- with a slow tail, the worst request stays near the budget, not the tail
+- during an outage, the breaker opens and fallbacks return in milliseconds
+
+Usage: python benchmarks/upstream_bench.py --requests 200 --concurrency 16
+"""
+import argparse
+import asyncio
+import contextlib
+import os
+import statistics
+import time
+from datetime import datetime, timezone
+
+import stub_llm
+from _harness import asgi_client, import_main, percentile, start_stub
+
+STUB_PORT = 9110
+
+SCENARIOS = [
+    # name, stub settings, upstream settings
+    ("healthy", {}, {}),
+    ("429 x30%, no retries", {"error_rate": 0.3}, {"max_retries": 0}),
+    ("429 x30%, retries", {"error_rate": 0.3}, {}),
+    ("slow tail 10% +5s", {"slow_rate": 0.1, "slow_ms": 5000},
+     {"attempt_timeout_seconds": 1.0, "budget_seconds": 2.5}),
+    ("outage (all 429)", {"error_rate": 1.0}, {"breaker_failures": 5}),
+]
+
+
+async def run_scenario(main, requests: int, concurrency: int):
+    latencies = []
+    fallbacks = 0
+    counter = iter(range(requests))
+
+    async def worker(http):
+        nonlocal fallbacks
+        for i in counter:
+            payload = {
+                # Distinct texts so single-flight doesn't coalesce them
+                "text": f"Team sync #{i} tomorrow at 10am in Room 4",
+                "current_time": datetime.now(timezone.utc).isoformat(),
+                "user_timezone": "Europe/Berlin",
+            }
+            t0 = time.perf_counter()
+            resp = await http.post("/process_event", json=payload)
+            latencies.append((time.perf_counter() - t0) * 1000)
+            fallbacks += "error_code" in resp.json()
+
+    async with asgi_client(main.app) as http:
+        await asyncio.gather(*(worker(http) for _ in range(concurrency)))
+    latencies.sort()
+    return latencies, fallbacks
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--latency-ms", type=float, default=100.0)
+    args = parser.parse_args()
+
+    start_stub(STUB_PORT, latency_ms=args.latency_ms, jitter_ms=args.latency_ms / 5)
+    os.environ["EXTRACTION_CACHE_BACKEND"] = "off"
+    os.environ["RATE_LIMIT_BACKEND"] = "off"
+    os.environ["PREPARSER_MODE"] = "off"
+
+    main = import_main()
+    from upstream import UpstreamCaller, UpstreamConfig
+
+    print(f"{'scenario':<22} {'p50 ms':>8} {'p95 ms':>8} {'max ms':>8} {'fallback':>8} "
+          f"{'attempts':>8} {'retries':>7} {'budget':>6} {'opens':>5} {'reject':>6}")
+    for name, stub_settings, upstream_settings in SCENARIOS:
+        stub_llm.config.error_rate = stub_settings.get("error_rate", 0.0)
+        stub_llm.config.slow_rate = stub_settings.get("slow_rate", 0.0)
+        stub_llm.config.slow_ms = stub_settings.get("slow_ms", 0.0)
+        main.upstream_caller = UpstreamCaller(UpstreamConfig(**upstream_settings))
+
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            latencies, fallbacks = asyncio.run(run_scenario(main, args.requests, args.concurrency))
+
+        stats = main.upstream_caller.stats()
+        breaker = stats["breaker"]
+        print(f"{name:<22} {statistics.median(latencies):>8.1f} {percentile(latencies, 0.95):>8.1f} {latencies[-1]:>8.1f} "
+              f"{fallbacks:>8} {stats['attempts']:>8} {stats['retries']:>7} {stats['budget_exhausted']:>6} "
+              f"{breaker['opens']:>5} {breaker['rejected']:>6}")
+        # Each scenario gets a fresh OpenAI client bound to its own event loop
+        main.client = None
@@ -0,0 +1,191 @@
+"""
+Server-side cache for extraction results.
+
+Entries are keyed on whitespace-normalized text, the user's timezone and the
+resolved local date ("tomorrow" means something different every day), so a
+shared invite selected by many users only costs one LLM call per day/timezone.
+The system prompt and the model the text is routed to are part of the key too,
+so switching PROMPT_VARIANT, editing a prompt or changing MODEL_TIERS never
+serves results extracted under the old configuration.
+
+The SQLite backend can wait on another worker's write lock, so ExtractionCache
+runs its calls in a thread instead of on the event loop.
+"""
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+
+def normalize_text(text: str) -> str:
+    """Collapse all runs of whitespace so re-selections of the same text match"""
+    return " ".join(text.split())
+
+
+def make_cache_key(text: str, user_timezone: str, current_date: str, prompt: str, model: str) -> str:
+    """Build the cache key from everything that shapes the answer; prompt identifies the prompt and schema"""
+    raw = "\x1f".join((normalize_text(text), user_timezone or 'UTC', current_date, prompt, model))
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+class InMemoryCacheBackend:
+    """Per-process LRU cache with a TTL on every entry"""
+
+    blocking = False
+
+    def __init__(self, max_entries: int = 1024, ttl_seconds: float = 3600):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+
+    def get(self, key: str) -> Optional[str]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at <= time.time():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: str, value: str):
+        self._entries[key] = (time.time() + self.ttl_seconds, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class SQLiteCacheBackend:
+    """LRU + TTL cache in a local SQLite file, shared by all workers on the machine"""
+
+    # Queries can wait up to the busy timeout for another worker's write lock
+    blocking = True
+
+    def __init__(self, path: str, max_entries: int = 10000, ttl_seconds: float = 3600):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._connect()
+
+    def _connect(self):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, timeout=5, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS extraction_cache ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+            "expires_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_accessed_at ON extraction_cache(accessed_at)")
+
+    def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, expires_at FROM extraction_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            if row[1] <= now:
+                self._conn.execute("DELETE FROM extraction_cache WHERE key = ?", (key,))
+                return None
+            self._conn.execute("UPDATE extraction_cache SET accessed_at = ? WHERE key = ?", (now, key))
+            return row[0]
+
+    def set(self, key: str, value: str):
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO extraction_cache (key, value, expires_at, accessed_at) VALUES (?, ?, ?, ?)",
+                (key, value, now + self.ttl_seconds, now)
+            )
+            # Drop expired rows, then anything beyond max_entries by least recent access
+            self._conn.execute("DELETE FROM extraction_cache WHERE expires_at <= ?", (now,))
+            self._conn.execute(
+                "DELETE FROM extraction_cache WHERE key IN ("
+                "SELECT key FROM extraction_cache ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,)
+            )
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM extraction_cache")
+
+    def after_fork(self):
+        """SQLite connections must not cross fork(); abandon the parent's and open a new one"""
+        self._connect()
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM extraction_cache").fetchone()[0]
+
+
+class ExtractionCache:
+    """Stores extraction results as JSON and counts hits and misses"""
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+
+    async def get(self, key: str) -> Optional[dict]:
+        if self.backend.blocking:
+            value = await asyncio.to_thread(self.backend.get, key)
+        else:
+            value = self.backend.get(key)
+        if value is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return json.loads(value)
+
+    async def set(self, key: str, result: dict):
+        value = json.dumps(result)
+        if self.backend.blocking:
+            await asyncio.to_thread(self.backend.set, key, value)
+        else:
+            self.backend.set(key, value)
+
+    def after_fork(self):
+        """Re-open per-process resources in a forked worker (the in-memory backend has none)"""
+        if hasattr(self.backend, 'after_fork'):
+            self.backend.after_fork()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "backend": type(self.backend).__name__,
+            "entries": len(self.backend),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0
+        }
+
+
+def create_cache_from_env() -> Optional[ExtractionCache]:
+    """Build the cache configured by EXTRACTION_CACHE_* env vars, or None if disabled"""
+    backend_name = os.getenv('EXTRACTION_CACHE_BACKEND', 'memory').lower()
+    max_entries = int(os.getenv('EXTRACTION_CACHE_MAX_ENTRIES', '1024'))
+    ttl_seconds = float(os.getenv('EXTRACTION_CACHE_TTL_SECONDS', '3600'))
+
+    if backend_name in ('off', 'none', ''):
+        return None
+    if backend_name == 'sqlite':
+        path = os.getenv('EXTRACTION_CACHE_PATH', 'extraction_cache.sqlite3')
+        return ExtractionCache(SQLiteCacheBackend(path, max_entries, ttl_seconds))
+    if backend_name == 'memory':
+        return ExtractionCache(InMemoryCacheBackend(max_entries, ttl_seconds))
+    raise ValueError(f"Unknown EXTRACTION_CACHE_BACKEND: {backend_name}")
@@ -0,0 +1,80 @@
+"""
+Production serving profile: gunicorn -c gunicorn.conf.py main:app
+
+Every setting can be overridden from the environment:
+
+- WEB_CONCURRENCY: worker processes. The default is the container's cgroup
+  CPU quota rounded up (capped at the cores the process may run on), or 2
+  when there is no quota: in a container, the visible core count is often
+  the host's. Each worker runs its own event loop with up to
+  MAX_CONCURRENT_EXTRACTIONS LLM calls in flight, so one per core is enough
+  for this I/O-bound app.
+- SERVER_PRELOAD (true): import the app once in the master and fork workers
+  from it. Shared read-only state (SDK imports, tokenizer, compiled patterns,
+  schemas) is built once and shared copy-on-write; logging and the SQLite
+  cache are re-opened in each worker after the fork.
+- SERVER_KEEPALIVE_SECONDS (75): idle keep-alive, longer than the 60 s idle
+  timeout of typical load balancers so they don't reuse a closed connection.
+- SERVER_BACKLOG (2048): pending connections the listen socket queues.
+- SERVER_GRACEFUL_TIMEOUT_SECONDS (30): time a worker has on SIGTERM to finish
+  requests and drain extractions before it is killed (see serving.py).
+- SERVER_MAX_REQUESTS (0 = off): recycle workers after this many requests,
+  with up to 10% jitter so they don't all restart together.
+"""
+import math
+import os
+
+DEFAULT_WORKERS = 2
+
+
+def cgroup_cpu_quota():
+    """CPUs allowed by the cgroup (v2 cpu.max or v1 cfs quota), None when unlimited or unknown"""
+    try:
+        with open('/sys/fs/cgroup/cpu.max') as f:
+            quota, period = f.read().split()[:2]
+    except (OSError, ValueError):
+        try:
+            with open('/sys/fs/cgroup/cpu/cpu.cfs_quota_us') as f, open('/sys/fs/cgroup/cpu/cpu.cfs_period_us') as g:
+                quota, period = f.read().strip(), g.read().strip()
+        except OSError:
+            return None
+    if quota in ('max', '-1'):
+        return None
+    try:
+        return int(quota) / int(period)
+    except (ValueError, ZeroDivisionError):
+        return None
+
+
+def default_workers() -> int:
+    quota = cgroup_cpu_quota()
+    if quota is None:
+        return DEFAULT_WORKERS
+    cores = len(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else os.cpu_count() or 1
+    return max(1, min(cores, math.ceil(quota)))
+
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+workers = int(os.getenv('WEB_CONCURRENCY') or default_workers())
+worker_class = "serving.ServingWorker"
+preload_app = os.getenv('SERVER_PRELOAD', 'true').lower() != 'false'
+keepalive = int(os.getenv('SERVER_KEEPALIVE_SECONDS', '75'))
+backlog = int(os.getenv('SERVER_BACKLOG', '2048'))
+graceful_timeout = int(os.getenv('SERVER_GRACEFUL_TIMEOUT_SECONDS', '30'))
+timeout = int(os.getenv('SERVER_WORKER_TIMEOUT_SECONDS', '60'))
+max_requests = int(os.getenv('SERVER_MAX_REQUESTS', '0'))
+max_requests_jitter = max_requests // 10
+# Requests are logged by the app as JSON (logs.py)
+accesslog = None
+
+
+def when_ready(server):
+    if preload_app:
+        import main
+        main.preload_shared_state()
+
+
+def post_fork(server, worker):
+    if preload_app:
+        import main
+        main.after_fork()
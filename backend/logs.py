@@ -0,0 +1,250 @@
+"""
+Structured, non-blocking application logging.
+
+Records are JSON lines with a level, logger name, message, the request ID of
+the HTTP request that produced them and any structured fields. Loggers hand
+records to a bounded in-memory queue; a listener thread formats and writes
+them, so the request path never waits on stdout. When the queue is full,
+records are dropped and counted instead of blocking.
+
+Verbose per-request lines (parsed events, prompts, mock responses) are
+marked with verbose_fields() and kept for LOG_SAMPLE_RATE of requests. The
+sampling decision is per request ID, so a sampled request keeps all of its
+lines. Raw user text is controlled by LOG_USER_TEXT: 'drop' (default, only
+its length), 'redact' (PII-redacted, truncated) or 'full' (truncated).
+
+Env: LOG_LEVEL (INFO), LOG_SAMPLE_RATE (0.1), LOG_USER_TEXT (drop),
+LOG_QUEUE_SIZE (10000), LOG_HANDLER (queue | sync, sync writes inline).
+"""
+import contextvars
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import re
+import sys
+import uuid
+import zlib
+from datetime import datetime, timezone
+from typing import Optional
+
+# Request ID of the HTTP request being handled, set by RequestIdMiddleware
+request_id = contextvars.ContextVar('request_id', default=None)
+
+_VALID_REQUEST_ID = re.compile(r'^[A-Za-z0-9._-]{1,64}$')
+# Event fields that are safe to log whatever LOG_USER_TEXT says
+_EVENT_SAFE_FIELDS = ('date', 'startTime', 'endTime', 'error_code')
+# Max characters of user text kept in 'redact' and 'full' modes
+MAX_LOGGED_TEXT = 100
+
+# How user text appears in logs; set from LOG_USER_TEXT by configure_logging()
+_user_text_policy = 'drop'
+
+
+def log_fields(**fields) -> dict:
+    """extra= for a log call carrying structured fields"""
+    return {"fields": fields}
+
+
+def verbose_fields(**fields) -> dict:
+    """extra= for a verbose per-request line, subject to LOG_SAMPLE_RATE"""
+    return {"fields": fields, "verbose": True}
+
+
+def loggable_text(text: Optional[str]) -> dict:
+    """Fields describing user text under the LOG_USER_TEXT policy"""
+    if not isinstance(text, str):
+        return {}
+    fields = {"text_length": len(text)}
+    if _user_text_policy == 'full':
+        fields["text"] = text[:MAX_LOGGED_TEXT]
+    elif _user_text_policy == 'redact':
+        from anonymizer import redact
+        fields["text"] = redact(text[:MAX_LOGGED_TEXT])
+    return fields
+
+
+def loggable_event(event) -> Optional[dict]:
+    """An extracted event for logging; titles and descriptions echo user text, so they follow LOG_USER_TEXT"""
+    if not isinstance(event, dict):
+        return None
+    if _user_text_policy == 'full':
+        return event
+    if _user_text_policy == 'redact':
+        from anonymizer import anonymize
+        return anonymize(event)
+    return {key: event[key] for key in _EVENT_SAFE_FIELDS if key in event}
+
+
+class JSONFormatter(logging.Formatter):
+    """One JSON object per line: ts, level, logger, msg, request_id and structured fields"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage()
+        }
+        if getattr(record, 'request_id', None):
+            entry["request_id"] = record.request_id
+        entry.update(getattr(record, 'fields', None) or {})
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        elif getattr(record, 'exc_text', None):
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+class RequestContextFilter(logging.Filter):
+    """Stamp the request ID on records and apply per-request sampling to verbose lines"""
+
+    def __init__(self, sample_rate: float = 1.0):
+        super().__init__()
+        self.sample_rate = sample_rate
+        self.sampled_out = 0
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        rid = request_id.get()
+        record.request_id = rid
+        if getattr(record, 'verbose', False) and self.sample_rate < 1.0:
+            # Same decision for every line of a request, so sampled requests are complete
+            key = zlib.crc32(rid.encode()) if rid else zlib.crc32(uuid.uuid4().bytes)
+            if (key % 10000) >= self.sample_rate * 10000:
+                self.sampled_out += 1
+                return False
+        return True
+
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that drops (and counts) records instead of blocking when the queue is full.
+
+    Formatting is left to the listener thread; only the message arguments and
+    exception text are resolved here, while the record's state is current.
+    """
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class _QueueListener(logging.handlers.QueueListener):
+    def enqueue_sentinel(self):
+        # Shutdown may wait for room in a full queue; everything queued gets written
+        self.queue.put(self._sentinel)
+
+
+_listener: Optional[_QueueListener] = None
+_queue_handler: Optional[NonBlockingQueueHandler] = None
+_context_filter: Optional[RequestContextFilter] = None
+
+
+def configure_logging(stream=None, handler_kind: Optional[str] = None, sample_rate: Optional[float] = None):
+    """Route the 'ai_calendar' loggers to JSON lines on stream (stdout by default).
+
+    handler_kind and sample_rate override LOG_HANDLER and LOG_SAMPLE_RATE.
+    """
+    global _listener, _queue_handler, _context_filter, _user_text_policy
+    shutdown_logging()
+    _user_text_policy = os.getenv('LOG_USER_TEXT', 'drop').lower()
+    if sample_rate is None:
+        sample_rate = float(os.getenv('LOG_SAMPLE_RATE', '0.1'))
+
+    output = logging.StreamHandler(stream or sys.stdout)
+    output.setFormatter(JSONFormatter())
+    _context_filter = RequestContextFilter(sample_rate)
+
+    logger = logging.getLogger('ai_calendar')
+    logger.handlers.clear()
+    logger.setLevel(os.getenv('LOG_LEVEL', 'INFO').upper())
+    logger.propagate = False
+
+    if (handler_kind or os.getenv('LOG_HANDLER', 'queue')).lower() == 'sync':
+        output.addFilter(_context_filter)
+        logger.addHandler(output)
+        return logger
+
+    log_queue = queue.Queue(maxsize=int(os.getenv('LOG_QUEUE_SIZE', '10000')))
+    _queue_handler = NonBlockingQueueHandler(log_queue)
+    _queue_handler.addFilter(_context_filter)
+    logger.addHandler(_queue_handler)
+    _listener = _QueueListener(log_queue, output)
+    _listener.start()
+    return logger
+
+
+def shutdown_logging():
+    """Stop the listener thread after writing everything already queued"""
+    global _listener, _queue_handler
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+    _queue_handler = None
+
+
+def reinit_after_fork():
+    """Restart logging in a forked worker.
+
+    The listener thread stays behind in the parent, so the inherited queue
+    would never drain; drop it without stopping it (its lock may have been
+    held at fork time) and start a fresh queue and listener.
+    """
+    global _listener, _queue_handler
+    _listener = None
+    _queue_handler = None
+    configure_logging()
+
+
+def get_logger(name: str) -> logging.Logger:
+    return logging.getLogger(f'ai_calendar.{name}')
+
+
+def stats() -> dict:
+    return {
+        "dropped": _queue_handler.dropped if _queue_handler else 0,
+        "sampled_out": _context_filter.sampled_out if _context_filter else 0,
+        "queue_depth": _queue_handler.queue.qsize() if _queue_handler else 0
+    }
+
+
+class RequestIdMiddleware:
+    """ASGI middleware: adopt X-Request-ID (or make one), expose it to logs and echo it back"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        rid = None
+        for name, value in scope.get("headers", ()):
+            if name == b"x-request-id":
+                rid = value.decode('latin-1')
+                break
+        if not rid or not _VALID_REQUEST_ID.match(rid):
+            rid = uuid.uuid4().hex[:16]
+        request_id.set(rid)
+
+        async def send_with_id(message):
+            if message["type"] == "http.response.start":
+                message.setdefault("headers", [])
+                message["headers"] = list(message["headers"]) + [(b"x-request-id", rid.encode('latin-1'))]
+            await send(message)
+
+        await self.app(scope, receive, send_with_id)
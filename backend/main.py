@@ -1,16 +1,38 @@
 from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from openai import OpenAI, OpenAIError
-from datetime import datetime, timedelta
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from contextlib import asynccontextmanager
+from datetime import date, datetime, timedelta
+import asyncio
+import functools
 import os
+import time
+import threading
 import json
 import pytz
-from pydantic import BaseModel, validator
-from typing import List, Optional
-import re
+from pydantic import BaseModel, ValidationError, ValidationInfo, field_validator
+from typing import List, Optional, Union
 from dotenv import load_dotenv
-from langsmith import traceable, Client
-from langsmith.anonymizer import create_anonymizer
+from cache import create_cache_from_env, make_cache_key
+from singleflight import SingleFlight
+from partial_json import PartialObjectParser
+from preparser import TIME_FORMAT, PreParserStats, add_one_hour, preparse_event
+from anonymizer import create_pii_anonymizer
+from prompt_context import create_prompt_context_cache, resolve_timezone
+from prompts import create_prompt_variant_from_env
+from recorder import create_recorder_from_env, note_upstream_call, prompt_fingerprint
+from router import create_router_from_env
+from segmenter import dedupe_events, segment_text
+from tokens import account_call, schema_tokens, uses_tokenizer
+from admission import AdmissionRejected, client_key, create_admission_from_env, create_rate_limiter_from_env
+from upstream import UpstreamCaller, UpstreamConfig, UpstreamUnavailableError, build_http_client, create_hedger_from_env
+from metrics import (LLM_CALLS_IN_FLIGHT, LLM_HEDGE_LOST_TOTAL, LLM_TOKENS_TOTAL, RESULTS_TOTAL, STAGE_SECONDS, MetricsMiddleware,
+                     record_result, timed)
+from metrics import registry as metrics_registry
+from tracing import LangSmithExporter, TraceEndpointMiddleware, add_run_metadata, create_tracer_from_env
+from logs import (RequestIdMiddleware, configure_logging, get_logger, log_fields, loggable_event, loggable_text,
+                  reinit_after_fork, shutdown_logging, verbose_fields)
+from logs import stats as log_stats
 
 # Error codes matching frontend errors.js
 class ErrorCodes:
@@ -25,17 +47,183 @@ class ErrorCodes:
     TEXT_TOO_LONG = 'TEXT_TOO_LONG'
     UNKNOWN_ERROR = 'UNKNOWN_ERROR'
 
+# Per-stage latency histograms, exported on /metrics
+STAGE_JSON_PARSE = STAGE_SECONDS.labels('json_parse')
+STAGE_VALIDATION = STAGE_SECONDS.labels('validation')
+STAGE_PROMPT_BUILD = STAGE_SECONDS.labels('prompt_build')
+STAGE_LLM_QUEUE = STAGE_SECONDS.labels('llm_queue_wait')
+STAGE_LLM_CALL = STAGE_SECONDS.labels('llm_call')
+STAGE_EVENT_VALIDATION = STAGE_SECONDS.labels('event_validation')
+STAGE_PAST_DATE = STAGE_SECONDS.labels('past_date_correction')
+STAGE_FALLBACK = STAGE_SECONDS.labels('fallback')
+RESULTS_TOTAL.declare('none', *(value for name, value in vars(ErrorCodes).items() if name.isupper()))
+LLM_TOKENS_TOTAL.declare('system_prompt', 'user_text', 'schema', 'completion')
+LLM_HEDGE_LOST_TOTAL.declare('finished', 'cancelled')
+
 # Load environment variables from .env file
 load_dotenv()
 
+# JSON lines through a background writer; see logs.py for LOG_* settings
+configure_logging()
+logger = get_logger('main')
+
 # Check for API key
 api_key = os.getenv('OPENAI_API_KEY')
 if not api_key:
-    print("WARNING: OPENAI_API_KEY not found in environment variables.")
-    print("Please set your OpenAI API key in the .env file or as an environment variable.")
-    print("Using mock response mode for testing.")
+    logger.warning("OPENAI_API_KEY not found in environment variables. Set it in the .env file or "
+                   "as an environment variable. Using mock response mode for testing.")
+
+# openai and langsmith are heavy imports; they are loaded on first use or by the
+# warm-up task started after the server begins accepting traffic
+client = None
+_client_disabled = False
+_client_lock = threading.Lock()
+
+def get_openai_client():
+    """Return the shared AsyncOpenAI client, or None in mock mode (no key, or key rejected)"""
+    global client
+    if client is None and api_key and not _client_disabled:
+        with _client_lock:
+            if client is None:
+                from openai import AsyncOpenAI
+                # Async client so in-flight LLM calls don't block the event loop. Retries
+                # and timeouts are handled by upstream_caller, not the SDK.
+                client = AsyncOpenAI(
+                    api_key=api_key,
+                    http_client=build_http_client(upstream_config),
+                    max_retries=0
+                )
+    return client
+
+# Max number of upstream LLM calls in flight per worker process
+MAX_CONCURRENT_EXTRACTIONS = int(os.getenv('MAX_CONCURRENT_EXTRACTIONS', '32'))
+
+# Upstream slots with a bounded, deadline-aware wait queue (ADMISSION_* env vars)
+admission = create_admission_from_env(MAX_CONCURRENT_EXTRACTIONS)
+
+# Per-client token buckets (RATE_LIMIT_* env vars); None unless RATE_LIMIT_BACKEND is set
+rate_limiter = create_rate_limiter_from_env()
+# Proxies in front of the app that append to X-Forwarded-For (1 on Render); required with a limiter
+RATE_LIMIT_PROXY_HOPS = int(os.getenv('RATE_LIMIT_PROXY_HOPS', '0'))
+
+def request_client_key(request: Request) -> str:
+    return client_key(request.headers, request.client.host if request.client else None, RATE_LIMIT_PROXY_HOPS)
+
+async def check_client_rate(client: Optional[str], cost: float = 1.0):
+    """Charge a client for extractions that missed the cache; raises AdmissionRejected when over its rate"""
+    if rate_limiter is not None and client is not None and get_openai_client():
+        await rate_limiter.check(client, cost)
+
+# Connection pool, request budget, retries and circuit breaker for LLM calls (UPSTREAM_* env vars)
+upstream_config = UpstreamConfig.from_env(MAX_CONCURRENT_EXTRACTIONS)
+upstream_caller = UpstreamCaller(upstream_config)
+# Tail-latency hedging of non-streaming calls (HEDGE_* env vars, off by default)
+upstream_hedger = create_hedger_from_env()
+
+langsmith_client = None
+_langsmith_lock = threading.Lock()
+
+def get_langsmith_client():
+    """Return the LangSmith client, building it on first use"""
+    global langsmith_client
+    if langsmith_client is None:
+        with _langsmith_lock:
+            if langsmith_client is None:
+                from langsmith import Client
+                langsmith_client = Client()
+                logger.info("LangSmith client initialized.")
+    return langsmith_client
+
+# Traces are queued on the request path and exported in batches by a background thread.
+# PII is redacted (anonymizer.py) on the export worker, keeping AI-extracted event
+# details for quality monitoring.
+tracer = create_tracer_from_env(get_langsmith_client, create_pii_anonymizer)
+traceable = tracer.traceable
+
+def preload_shared_state():
+    """Build read-only state in the gunicorn master before workers fork (gunicorn.conf.py).
+    
+    Workers share these pages copy-on-write instead of each importing the
+    SDKs and loading the tokenizer during warm-up. Nothing here may hold a
+    socket, thread or event loop: those are per worker.
+    """
+    import openai  # noqa: F401 - the SDK import is most of a worker's warm-up
+    if tracer.queue is not None and isinstance(tracer.queue.exporter, LangSmithExporter):
+        import langsmith  # noqa: F401
+    uses_tokenizer()
+    for function in (prompt_variant.event_function, prompt_variant.events_function):
+        schema_tokens(function)
+
+def after_fork():
+    """Re-create per-process resources inherited from a preloading master"""
+    reinit_after_fork()
+    if extraction_cache is not None:
+        extraction_cache.after_fork()
+    if rate_limiter is not None:
+        rate_limiter.after_fork()
+
+# Graceful shutdown: how long the lifespan waits for in-flight extractions after the server stops
+SHUTDOWN_DRAIN_SECONDS = float(os.getenv('SHUTDOWN_DRAIN_SECONDS', '5'))
+
+# Startup readiness, reported by /ready (separate from the /health liveness check)
+READINESS_TIMEOUT_SECONDS = float(os.getenv('READINESS_TIMEOUT_SECONDS', '10'))
+readiness = {"status": "starting", "openai": "pending", "langsmith": "pending"}
+
+async def warm_up():
+    """Load heavy dependencies and validate the OpenAI key off the request path"""
+    global _client_disabled, client
+    # tiktoken downloads its encoding on first use
+    await asyncio.to_thread(uses_tokenizer)
+    if tracer.queue is None or not isinstance(tracer.queue.exporter, LangSmithExporter):
+        readiness['langsmith'] = 'disabled'
+    else:
+        try:
+            await asyncio.to_thread(get_langsmith_client)
+            readiness['langsmith'] = 'ok'
+        except Exception as e:
+            logger.error("LangSmith client could not be initialized", extra=log_fields(error=str(e)))
+            readiness['langsmith'] = 'error'
+    
+    if not api_key:
+        readiness['openai'] = 'mock'
+    else:
+        openai_client = await asyncio.to_thread(get_openai_client)
+        from openai import AuthenticationError
+        try:
+            # Simple test to validate API key
+            await asyncio.wait_for(openai_client.models.list(), READINESS_TIMEOUT_SECONDS)
+            logger.info("OpenAI API key is valid.")
+            readiness['openai'] = 'ok'
+        except AuthenticationError as e:
+            logger.error("OpenAI API key is invalid, using mock response mode for testing",
+                         extra=log_fields(error=str(e)))
+            _client_disabled = True
+            client = None
+            readiness['openai'] = 'invalid_key'
+        except Exception as e:
+            # Keep the client: the upstream may just be slow or briefly unreachable
+            logger.warning("OpenAI API could not be reached during startup", extra=log_fields(error=str(e)))
+            readiness['openai'] = 'unreachable'
+    
+    readiness['status'] = 'ready' if readiness['openai'] in ('ok', 'mock') else 'degraded'
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    warm_up_task = asyncio.create_task(warm_up())
+    yield
+    warm_up_task.cancel()
+    # Extractions can outlive their request (a single-flight leader whose client left) and
+    # write the cache when they finish; give them time to do so before the worker exits
+    still_running = await inflight_extractions.drain(SHUTDOWN_DRAIN_SECONDS)
+    if still_running:
+        logger.warning("Shutting down with extractions in flight", extra=log_fields(in_flight=still_running))
+    # Deliver traces still queued before the worker exits
+    if tracer.queue is not None:
+        await asyncio.to_thread(tracer.queue.flush)
+    await asyncio.to_thread(recorder.flush)
+    shutdown_logging()
 
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 
 # Enable CORS
 app.add_middleware(
@@ -45,97 +233,29 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(TraceEndpointMiddleware)
+app.add_middleware(RequestIdMiddleware)
+app.add_middleware(MetricsMiddleware, endpoints=lambda: {route.path for route in app.routes})
 
-# Initialize OpenAI client if API key is available
-try:
-    client = OpenAI(api_key=api_key) if api_key else None
-    # Test the client with a simple request if it exists
-    if client:
-        # Simple test to validate API key
-        client.models.list()
-        print("OpenAI API key is valid.")
-except OpenAIError as e:
-    print(f"OpenAI API key is invalid or there was an error: {str(e)}")
-    client = None
-    print("Using mock response mode for testing.")
-
-# Initialize LangSmith client with PII anonymization
-# This redacts sensitive user data while keeping AI-extracted event details for quality monitoring
-anonymizer = create_anonymizer([
-    # Email addresses
-    {"pattern": r"[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}", 
-     "replace": "[EMAIL_REDACTED]"},
-    
-    # Phone numbers (various formats)
-    {"pattern": r"\b(?:\+?1[-\.\s]?)?\(?\d{3}\)?[-\.\s]?\d{3}[-\.\s]?\d{4}\b", 
-     "replace": "[PHONE_REDACTED]"},
-    
-    # Names (basic pattern - capitalized words)
-    {"pattern": r"\b([A-Z][a-z]+\s[A-Z][a-z]+)\b", 
-     "replace": "[NAME_REDACTED]"},
-    
-    # Street addresses
-    {"pattern": r"\d+\s+[\w\s]+(?:Street|St|Avenue|Ave|Road|Rd|Boulevard|Blvd|Lane|Ln|Drive|Dr|Court|Ct|Circle|Cir|Way|Parkway|Pkwy)", 
-     "replace": "[ADDRESS_REDACTED]"},
-    
-    # Credit card numbers
-    {"pattern": r"\b(?:\d[ -]*?){13,16}\b", 
-     "replace": "[CARD_REDACTED]"},
-    
-    # Social Security Numbers
-    {"pattern": r"\b\d{3}-\d{2}-\d{4}\b", 
-     "replace": "[SSN_REDACTED]"}
-])
-
-langsmith_client = Client(anonymizer=anonymizer)
-print("LangSmith client initialized with PII anonymization for user input.")
-
-# Time format regex
-TIME_FORMAT = re.compile(r'^(1[0-2]|0?[1-9]):([0-5][0-9])\s*(AM|PM)$', re.IGNORECASE)
-
-# Event schema for function calling
-CREATE_EVENT_FUNCTION = {
-    "name": "createEvent",
-    "description": "Extracts a calendar event from user text, resolving times and dates based on current date and timezone.",
-    "parameters": {
-        "type": "object",
-        "properties": {
-            "title": {
-                "type": "string",
-                "description": "The event title"
-            },
-            "date": {
-                "type": "string",
-                "description": "The date in YYYY-MM-DD format, resolved from the user's text using their current date and timezone"
-            },
-            "startTime": {
-                "type": "string",
-                "description": "Start time in 'HH:MM AM/PM' format with two-digit minutes (e.g., '10:00 AM', not '10 AM')"
-            },
-            "endTime": {
-                "type": "string",
-                "description": "End time in 'HH:MM AM/PM' format with two-digit minutes. If missing, should be 1 hour after startTime"
-            },
-            "location": {
-                "type": ["string", "null"],
-                "description": "Event location (virtual or physical), or null if not specified"
-            },
-            "attendees": {
-                "type": "array",
-                "items": {
-                    "type": "string",
-                    "format": "email"
-                },
-                "description": "List of email addresses mentioned in the text"
-            },
-            "description": {
-                "type": ["string", "null"],
-                "description": "A detailed description of the event extracted from the text, including purpose, agenda, or any other relevant details"
-            }
-        },
-        "required": ["title", "date", "startTime", "endTime", "location", "attendees", "description"]
-    }
-}
+# Server-side extraction cache (EXTRACTION_CACHE_BACKEND=memory|sqlite|off)
+extraction_cache = create_cache_from_env()
+
+# Coalesces identical in-flight extractions into one upstream call
+inflight_extractions = SingleFlight()
+
+# Rule-based pre-parser: off, shadow (compare with the LLM) or primary (skip the LLM when confident)
+PREPARSER_MODE = os.getenv('PREPARSER_MODE', 'off').lower()
+PREPARSER_CONFIDENCE_THRESHOLD = float(os.getenv('PREPARSER_CONFIDENCE_THRESHOLD', '0.9'))
+preparser_stats = PreParserStats()
+
+# System prompt and function schemas (PROMPT_VARIANT=standard|compact)
+prompt_variant = create_prompt_variant_from_env()
+
+# Model tiers (MODEL_TIERS), per-request routing and escalation; see router.py
+model_router = create_router_from_env()
+
+# Local JSONL corpus of extractions and their upstream responses for benchmarks/replay.py (RECORD_PATH)
+recorder = create_recorder_from_env(create_pii_anonymizer, {"prompt_variant": prompt_variant.name})
 
 class EventDetails(BaseModel):
     title: str
@@ -146,56 +266,64 @@ class EventDetails(BaseModel):
     attendees: List[str] = []
     description: Optional[str] = None
 
-    @validator('startTime', 'endTime')
-    def validate_time(cls, v):
+    @field_validator('startTime', 'endTime')
+    @classmethod
+    def validate_time(cls, v: str) -> str:
         if not TIME_FORMAT.match(v):
             raise ValueError(f"Time must be in 'HH:MM AM/PM' format with two-digit minutes (e.g., '10:00 AM')")
         return v
 
-    @validator('date')
-    def validate_date(cls, v):
+    @field_validator('date')
+    @classmethod
+    def validate_date(cls, v: str) -> str:
         try:
-            datetime.strptime(v, '%Y-%m-%d')
+            parse_event_date(v)
             return v
         except ValueError:
             raise ValueError("Date must be in YYYY-MM-DD format")
 
-def add_one_hour(time_str: str) -> str:
-    """Add one hour to a time string in HH:MM AM/PM format"""
-    match = TIME_FORMAT.match(time_str)
-    if not match:
-        raise ValueError(f"Invalid time format: {time_str}")
-    
-    hour = int(match.group(1))
-    minute = int(match.group(2))
-    period = match.group(3).upper()
-    
-    # Convert to 24-hour
-    if period == 'PM' and hour != 12:
-        hour += 12
-    elif period == 'AM' and hour == 12:
-        hour = 0
-        
-    # Add one hour
-    hour = (hour + 1) % 24
-    
-    # Convert back to 12-hour
-    if hour == 0:
-        hour = 12
-        period = 'AM'
-    elif hour == 12:
-        period = 'PM'
-    elif hour > 12:
-        hour -= 12
-        period = 'PM'
-    else:
-        period = 'AM'
-        
-    return f"{hour}:{str(minute).zfill(2)} {period}"
+class EventResponse(EventDetails):
+    """/process_event response: the event, plus error flags when extraction fell short.
+    
+    Documents the response in OpenAPI; results are already validated
+    EventDetails dumps, so they are serialized as-is rather than re-validated.
+    """
+    error_code: Optional[str] = None
+    extraction_error: Optional[str] = None
+
+class InputRejectedResponse(BaseModel):
+    """/process_event response when the text is rejected before extraction (too short, too long)"""
+    error_code: str
+    extraction_error: str
+
+class ProcessEventRequest(BaseModel):
+    """Body of /process_event"""
+    text: Optional[str] = ''
+    current_time: Optional[str] = None  # ISO string from the frontend
+    user_timezone: Optional[str] = 'UTC'  # IANA timezone from the browser
+
+    @field_validator('text', 'user_timezone')
+    @classmethod
+    def null_as_default(cls, v: Optional[str], info: ValidationInfo) -> str:
+        # null means not sent, as it did before typed validation: no text is TEXT_TOO_SHORT
+        if v is None:
+            return '' if info.field_name == 'text' else 'UTC'
+        return v
+
+@functools.lru_cache(maxsize=1024)
+def parse_event_date(value: str) -> date:
+    """Parse a YYYY-MM-DD event date; cached since the same few dates recur across requests"""
+    return datetime.strptime(value, '%Y-%m-%d').date()
+
+try:
+    from fastapi.responses import ORJSONResponse as EventJSONResponse
+    import orjson  # noqa: F401 - ORJSONResponse only imports it when rendering
+except ImportError:
+    EventJSONResponse = JSONResponse
 
 def get_mock_response(text: str, current_time: str):
     """Return a mock response for testing when no API key is available"""
-    print(f"Generating mock response for text: '{text}'")
+    logger.debug("Generating mock response", extra=verbose_fields(**loggable_text(text)))
     
     try:
         user_tz = pytz.timezone('Europe/Berlin')
@@ -245,10 +373,10 @@ def get_mock_response(text: str, current_time: str):
             "description": ""
         }
         
-        print(f"Generated mock response: {mock_response}")
+        logger.debug("Generated mock response", extra=verbose_fields(event=loggable_event(mock_response)))
         return mock_response
     except Exception as e:
-        print(f"Error generating mock response: {str(e)}")
+        logger.exception("Error generating mock response")
         # Return a fallback response
         return {
             "title": "Meeting",
@@ -260,131 +388,380 @@ def get_mock_response(text: str, current_time: str):
             "description": ""
         }
 
-@traceable(run_type="llm", client=langsmith_client)
-def call_openai_extraction(system_prompt: str, user_text: str):
+def get_user_now(current_time: str, user_timezone: str = 'UTC') -> datetime:
+    """Parse the client's ISO timestamp into the user's timezone (UTC if unknown)"""
+    user_tz = resolve_timezone(user_timezone)
+    if user_tz is None:
+        logger.warning("Unknown timezone, falling back to UTC", extra=log_fields(timezone=user_timezone))
+        user_tz = pytz.UTC
+    return datetime.fromisoformat(current_time.replace('Z', '+00:00')).astimezone(user_tz)
+
+@traceable(run_type="llm")
+async def call_openai_extraction(system_prompt: str, user_text: str, function: Optional[dict] = None, tier: int = 0):
     """Call OpenAI API for event extraction with LangSmith tracing.
     
+    function defaults to the configured prompt variant's createEvent schema;
+    tier indexes model_router.tiers.
+    
     Note: User input text is anonymized (PII redacted) before being sent to LangSmith.
     AI-extracted event details are NOT anonymized to enable quality monitoring.
     """
-    return client.chat.completions.create(
-        model="gpt-3.5-turbo",
-        messages=[
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": user_text}
-        ],
-        functions=[CREATE_EVENT_FUNCTION],
-        function_call={"name": "createEvent"}
-    )
+    function = function or prompt_variant.event_function
+    openai_client = get_openai_client()
+    model = model_router.tiers[tier].model
+    queued = time.perf_counter()
+    
+    def count_lost(completion):
+        count_hedge_loser(model, function, system_prompt, user_text, completion, time.perf_counter() - started)
+    
+    async with admission.slot():
+        started = time.perf_counter()
+        STAGE_LLM_QUEUE.observe(started - queued)
+        LLM_CALLS_IN_FLIGHT.inc()
+        try:
+            completion = await upstream_hedger.run(f"{model}:{function['name']}", lambda: upstream_caller.call(
+                lambda timeout: openai_client.chat.completions.create(
+                    model=model,
+                    messages=[
+                        {"role": "system", "content": system_prompt},
+                        {"role": "user", "content": user_text}
+                    ],
+                    functions=[function],
+                    function_call={"name": function["name"]},
+                    timeout=timeout
+                )
+            ), admission, count_lost)
+        finally:
+            LLM_CALLS_IN_FLIGHT.dec()
+            elapsed = time.perf_counter() - started
+            STAGE_LLM_CALL.observe(elapsed)
+            model_router.observe_latency(tier, elapsed)
+    function_call = completion.choices[0].message.function_call if completion.choices else None
+    note_upstream_call(model, function, system_prompt, function_call.arguments if function_call else None, elapsed,
+                       getattr(completion, 'usage', None))
+    record_token_usage(account_call(
+        system_prompt, user_text, function, function_call.arguments if function_call else None,
+        getattr(completion, 'usage', None), prompt_variant.name
+    ))
+    return completion
 
-@traceable(run_type="chain", client=langsmith_client)
-def process_text(text: str, current_time: str, user_timezone: str = 'UTC'):
+@traceable(run_type="llm")
+async def stream_openai_extraction(system_prompt: str, user_text: str, tier: int = 0):
+    """Stream createEvent function-call argument fragments from OpenAI as they arrive."""
+    openai_client = get_openai_client()
+    queued = time.perf_counter()
+    async with admission.slot():
+        started = time.perf_counter()
+        STAGE_LLM_QUEUE.observe(started - queued)
+        LLM_CALLS_IN_FLIGHT.inc()
+        try:
+            # Only opening the stream is retried; once fields are flowing a failure ends it
+            function = prompt_variant.event_function
+            fragments = []
+            stream = await upstream_caller.call(lambda timeout: openai_client.chat.completions.create(
+                model=model_router.tiers[tier].model,
+                messages=[
+                    {"role": "system", "content": system_prompt},
+                    {"role": "user", "content": user_text}
+                ],
+                functions=[function],
+                function_call={"name": function["name"]},
+                stream=True,
+                timeout=timeout
+            ))
+            async for chunk in stream:
+                if not chunk.choices:
+                    continue
+                function_call = chunk.choices[0].delta.function_call
+                if function_call and function_call.arguments:
+                    fragments.append(function_call.arguments)
+                    yield function_call.arguments
+        finally:
+            LLM_CALLS_IN_FLIGHT.dec()
+            elapsed = time.perf_counter() - started
+            STAGE_LLM_CALL.observe(elapsed)
+            model_router.observe_latency(tier, elapsed)
+    # Streams carry no usage, so the completion is counted from the arguments received
+    record_token_usage(account_call(system_prompt, user_text, function, "".join(fragments),
+                                    variant=prompt_variant.name))
+
+def record_token_usage(counts: dict):
+    """Export one call's token breakdown to /metrics and its trace"""
+    for part in ('system_prompt', 'user_text', 'schema', 'completion'):
+        LLM_TOKENS_TOTAL.inc(part, counts[part])
+    add_run_metadata(tokens=counts)
+
+def count_hedge_loser(model: str, function: dict, system_prompt: str, user_text: str, completion, seconds: float):
+    """Count the unused call of a hedged pair: its response if it finished, else its prompt, which was still sent"""
+    LLM_HEDGE_LOST_TOTAL.inc('finished' if completion is not None else 'cancelled')
+    function_call = completion.choices[0].message.function_call if completion is not None and completion.choices else None
+    arguments = function_call.arguments if function_call else None
+    usage = getattr(completion, 'usage', None)
+    note_upstream_call(model, function, system_prompt, arguments, seconds, usage, hedge=True)
+    counts = account_call(system_prompt, user_text, function, arguments, usage, prompt_variant.name)
+    for part in ('system_prompt', 'user_text', 'schema', 'completion'):
+        LLM_TOKENS_TOTAL.inc(part, counts[part])
+
+# Reference dates, prompts and prompt fingerprints per (timezone, local date), rebuilt after local midnight
+prompt_contexts = create_prompt_context_cache(prompt_variant.render, lambda prompt, multi_event: prompt_fingerprint(
+    prompt, prompt_variant.events_function if multi_event else prompt_variant.event_function))
+
+@timed(STAGE_PROMPT_BUILD)
+def build_system_prompt(user_now: datetime, multi_event: bool = False) -> str:
+    """Extraction system prompt for the user's local date"""
+    return prompt_contexts.get(user_now).system_prompt(multi_event)
+
+def extraction_cache_key(text: str, user_timezone: str, user_now: datetime, tier: int,
+                         multi_event: bool = False) -> str:
+    """Cache key for a text: the prompt inputs plus the prompt, schema and model (tier) it is extracted with"""
+    context = prompt_contexts.get(user_now)
+    return make_cache_key(text, user_timezone, context.current_date, context.prompt_fingerprint(multi_event),
+                          model_router.tiers[tier].model)
+
+def finalize_event(event_details: dict, user_now: datetime) -> dict:
+    """Fill defaults, validate and correct past dates on raw createEvent arguments"""
+    started = time.perf_counter()
+    # If no end time, add one hour to start time
+    if not event_details.get('endTime'):
+        event_details['endTime'] = add_one_hour(event_details['startTime'])
+        
+    # Convert null location to empty string
+    if event_details.get('location') is None:
+        event_details['location'] = ""
+    
+    # Check if date is in the past - if so, auto-correct to tomorrow before validating,
+    # so the model is built once. Malformed dates are left for the validator to reject.
+    date_was_corrected = False
+    try:
+        event_date = parse_event_date(event_details.get('date'))
+    except (TypeError, ValueError):
+        event_date = None
+    if event_date is not None and event_date < user_now.date():
+        corrected = time.perf_counter()
+        tomorrow_date = prompt_contexts.get(user_now).tomorrow_date
+        logger.info("Date is in the past, correcting to tomorrow",
+                    extra=log_fields(date=event_details['date'], corrected_date=tomorrow_date))
+        event_details['date'] = tomorrow_date
+        date_was_corrected = True
+        STAGE_PAST_DATE.observe(time.perf_counter() - corrected)
+    
+    # Validate using Pydantic model
+    result = EventDetails.model_validate(event_details).model_dump()
+    STAGE_EVENT_VALIDATION.observe(time.perf_counter() - started)
+    
+    # Add a flag if date was auto-corrected so UI can show a warning
+    if date_was_corrected:
+        result['error_code'] = ErrorCodes.PAST_DATE
+        result['extraction_error'] = "Date/Time could not be extracted properly. Please select the correct ones manually."
+    
+    return result
+
+def run_preparser(text: str, user_now: datetime):
+    """Run the rule-based pre-parser if enabled.
+    
+    Returns (preparsed, answer): answer is a finalized event only in primary
+    mode when the parse is confident enough to skip the LLM.
+    """
+    if PREPARSER_MODE not in ('shadow', 'primary'):
+        return None, None
+    preparsed = preparse_event(text, user_now)
+    preparser_stats.attempts += 1
+    if not preparsed or preparsed.confidence < PREPARSER_CONFIDENCE_THRESHOLD:
+        return preparsed, None
+    preparser_stats.confident += 1
+    if PREPARSER_MODE != 'primary':
+        return preparsed, None
+    preparser_stats.answered += 1
+    answer = finalize_event(dict(preparsed.event), user_now)
+    logger.info("Pre-parser answered",
+                extra=verbose_fields(confidence=preparsed.confidence, event=loggable_event(answer)))
+    return preparsed, answer
+
+def route_extraction(text: str, decided: Optional[tuple] = None):
+    """Pick the model tier for a text, or count an earlier model_router.decide; it goes to logs and the trace"""
+    tier, route = model_router.choose(text, decided)
+    add_run_metadata(route=route)
+    if model_router.enabled:
+        logger.debug("Routed extraction", extra=verbose_fields(**route))
+    return tier, route
+
+def function_call_arguments(completion) -> Optional[str]:
+    """createEvent arguments from a completion, None if the model didn't call it"""
+    function_call = completion.choices[0].message.function_call
+    logger.debug("Function call response", extra=verbose_fields(
+        function=getattr(function_call, 'name', None),
+        arguments_length=len(function_call.arguments) if function_call else 0
+    ))
+    if not function_call or function_call.name != "createEvent":
+        return None
+    return function_call.arguments
+
+def check_extraction(arguments: Optional[str], user_now: datetime):
+    """Finalize raw createEvent arguments.
+    
+    Returns (result, escalation reason, error): reason is 'invalid' when the
+    arguments don't parse or fail EventDetails validation (result is None and
+    error says why), 'past_date' when the date had to be corrected, else None.
+    """
+    try:
+        if arguments is None:
+            raise ValueError("Invalid response from GPT-4")
+        event_details = json.loads(arguments)
+        logger.debug("Parsed event details", extra=verbose_fields(event=loggable_event(event_details)))
+        result = finalize_event(event_details, user_now)
+    except (ValueError, KeyError, TypeError, AttributeError) as e:
+        return None, 'invalid', e
+    return result, ('past_date' if result.get('error_code') == ErrorCodes.PAST_DATE else None), None
+
+async def escalate_extraction(system_prompt: str, text: str, user_now: datetime, tier: int, route: dict,
+                              result: Optional[dict], reason: Optional[str], error: Optional[Exception]) -> dict:
+    """Re-extract on stronger tiers while the answer is invalid or past-dated.
+    
+    Returns the last tier's result (a past-date correction is kept when no
+    stronger tier is left) or raises the last validation error.
+    """
+    while reason:
+        next_tier = model_router.next_tier(tier)
+        if next_tier is None:
+            break
+        model_router.record_escalation(reason)
+        route.setdefault('escalations', []).append(
+            {"from": model_router.tiers[tier].name, "to": model_router.tiers[next_tier].name, "reason": reason}
+        )
+        logger.info("Escalating extraction", extra=log_fields(**route['escalations'][-1]))
+        tier = next_tier
+        completion = await call_openai_extraction(system_prompt, text, tier=tier)
+        result, reason, error = check_extraction(function_call_arguments(completion), user_now)
+    if result is None:
+        raise error
+    return result
+
+@traceable(run_type="chain")
+@recorder.records('text', 'current_time', 'user_timezone')
+async def process_text(text: str, current_time: str, user_timezone: str = 'UTC', user_now: Optional[datetime] = None,
+                       decided: Optional[tuple] = None):
+    """Extract one event from text.
+    
+    user_now is the already parsed current_time and decided the routing
+    decision (model_router.decide), if the caller has them.
+    """
     try:
         # If no API key or client is invalid, use mock response
-        if not client:
-            print("Using mock response (no API key available)")
+        if not get_openai_client():
+            logger.debug("Using mock response (no API key available)", extra=verbose_fields())
             mock_result = get_mock_response(text, current_time)
             # Validate using Pydantic model
-            event = EventDetails(**mock_result)
-            print(f"Validated mock event details: {event.model_dump()}")
-            return event.model_dump()
+            result = EventDetails.model_validate(mock_result).model_dump()
+            logger.debug("Validated mock event details", extra=verbose_fields(event=loggable_event(result)))
+            return result
         
         # Parse the current time from ISO string using user's timezone
-        try:
-            user_tz = pytz.timezone(user_timezone)
-        except pytz.UnknownTimeZoneError:
-            print(f"Unknown timezone: {user_timezone}, falling back to UTC")
-            user_tz = pytz.UTC
-        user_now = datetime.fromisoformat(current_time.replace('Z', '+00:00')).astimezone(user_tz)
-        current_date = user_now.strftime('%Y-%m-%d')
+        if user_now is None:
+            user_now = get_user_now(current_time, user_timezone)
         
-        # Pre-calculate common relative dates
-        tomorrow_date = (user_now + timedelta(days=1)).strftime('%Y-%m-%d')
-        next_week_date = (user_now + timedelta(weeks=1)).strftime('%Y-%m-%d')
+        # Simple inputs can be answered locally without an LLM round trip
+        preparsed, answer = run_preparser(text, user_now)
+        if answer:
+            return answer
         
-        system_prompt = f'''Extract calendar event details from text.
-
-Current date: {current_date}
-Reference: "today" = {current_date}, "tomorrow" = {tomorrow_date}, "next week" = {next_week_date}
-
-RULES:
-1. DATES: If year not specified and date has passed this year, use next year.
-2. TIMES: Extract the time exactly as written. DO NOT convert timezones. Ignore timezone labels like (CET), (PT), etc.
-3. If multiple times mentioned, pick the first/primary one (ignore fallback times like "or we could do X").
-4. TITLE: Short (3-5 words), no dates/times in title.
-5. FORMAT: Times must be "HH:MM AM/PM" (e.g., "10:00 AM" not "10 AM"). Dates must be YYYY-MM-DD.
-6. END TIME: If not specified, set to 1 hour after start time.
-7. LOCATION: Use empty string "" if not specified.
-8. DESCRIPTION: Brief summary, not raw text.
-
-Call createEvent with the extracted details.'''
+        system_prompt = build_system_prompt(user_now)
+        tier, route = route_extraction(text, decided)
         
         # Get completion from OpenAI with function calling
-        completion = call_openai_extraction(system_prompt, text)
-        
-        # Get the function call
-        function_call = completion.choices[0].message.function_call
-        print(f"Function call response: {function_call}")
-        
-        if not function_call or function_call.name != "createEvent":
-            raise ValueError("Invalid response from GPT-4")
-            
-        # Parse the arguments
-        event_details = json.loads(function_call.arguments)
-        print(f"Parsed event details: {event_details}")
-        
-        # If no end time, add one hour to start time
-        if not event_details.get('endTime'):
-            event_details['endTime'] = add_one_hour(event_details['startTime'])
-            
-        # Convert null location to empty string
-        if event_details.get('location') is None:
-            event_details['location'] = ""
-        
-        # Validate using Pydantic model
-        event = EventDetails(**event_details)
-        
-        # Check if date is in the past - if so, auto-correct to tomorrow
-        event_date = datetime.strptime(event.date, '%Y-%m-%d').date()
-        date_was_corrected = False
-        if event_date < user_now.date():
-            print(f"Date {event.date} is in the past, correcting to tomorrow: {tomorrow_date}")
-            event_details['date'] = tomorrow_date
-            date_was_corrected = True
-            # Re-validate with corrected date
-            event = EventDetails(**event_details)
-        
-        result = event.model_dump()
-        
-        # Add a flag if date was auto-corrected so UI can show a warning
-        if date_was_corrected:
-            result['error_code'] = ErrorCodes.PAST_DATE
-            result['extraction_error'] = "Date/Time could not be extracted properly. Please select the correct ones manually."
+        completion = await call_openai_extraction(system_prompt, text, tier=tier)
+        result, reason, error = check_extraction(function_call_arguments(completion), user_now)
+        result = await escalate_extraction(system_prompt, text, user_now, tier, route, result, reason, error)
+        logger.info("Validated event details", extra=verbose_fields(event=loggable_event(result)))
         
-        print(f"Validated event details: {result}")
+        if preparsed and PREPARSER_MODE == 'shadow':
+            agreed = preparser_stats.record_shadow(preparsed, result, PREPARSER_CONFIDENCE_THRESHOLD)
+            logger.info("Pre-parser shadow comparison",
+                        extra=log_fields(confidence=preparsed.confidence, agreed=agreed))
         return result
-            
+    
+    except AdmissionRejected:
+        raise
     except Exception as e:
-        print(f"Error processing text: {str(e)}")
+        logger.error("Error processing text", extra=log_fields(error=str(e)))
         # Re-raise to be handled by the endpoint with partial data preservation
         raise
 
-@traceable(client=langsmith_client)
-def create_fallback_response(text: str, current_time: str, error_message: str, user_timezone: str = 'UTC', error_code: str = None):
+@traceable(run_type="chain")
+async def process_text_batch(texts: List[str], current_time: str, user_timezone: str = 'UTC'):
+    """Extract one event per text with a single createEvents call.
+    
+    All texts must share the same timezone and current time, since the prompt
+    depends on them. Returns a list aligned with texts; entries the model
+    skipped or got wrong are None so the caller can extract them one by one.
+    """
+    user_now = get_user_now(current_time, user_timezone)
+    system_prompt = build_system_prompt(user_now, multi_event=True)
+    user_text = "\n\n".join(f"[{i}] {text}" for i, text in enumerate(texts))
+    
+    completion = await call_openai_extraction(system_prompt, user_text, prompt_variant.events_function)
+    
+    function_call = completion.choices[0].message.function_call
+    if not function_call or function_call.name != "createEvents":
+        raise ValueError("Invalid response from GPT-4")
+    
+    results = [None] * len(texts)
+    for event_details in json.loads(function_call.arguments).get('events', []):
+        index = event_details.pop('index', None)
+        if not isinstance(index, int) or not 0 <= index < len(texts) or results[index] is not None:
+            continue
+        try:
+            results[index] = finalize_event(event_details, user_now)
+        except Exception as e:
+            logger.warning("Error in packed event", extra=log_fields(index=index, error=str(e)))
+    
+    logger.info("Packed extraction finished",
+                extra=log_fields(events=sum(r is not None for r in results), texts=len(texts)))
+    return results
+
+async def process_text_stream(text: str, current_time: str, user_timezone: str = 'UTC',
+                              user_now: Optional[datetime] = None, decided: Optional[tuple] = None):
+    """Streaming variant of process_text.
+    
+    Yields ('field', {"field", "value"}) for each createEvent argument as soon
+    as it is complete, then ('result', result) with the same validation and
+    past-date correction as process_text. Only the routed tier streams; an
+    escalated retry replaces the result without re-sending fields.
+    """
+    if user_now is None:
+        user_now = get_user_now(current_time, user_timezone)
+    _, answer = run_preparser(text, user_now)
+    if answer:
+        yield 'result', answer
+        return
+    
+    system_prompt = build_system_prompt(user_now)
+    tier, route = route_extraction(text, decided)
+    parser = PartialObjectParser()
+    async for fragment in stream_openai_extraction(system_prompt, text, tier=tier):
+        for field, value in parser.feed(fragment):
+            yield 'field', {"field": field, "value": value}
+    
+    result, reason, error = check_extraction(parser.buffer, user_now)
+    result = await escalate_extraction(system_prompt, text, user_now, tier, route, result, reason, error)
+    logger.info("Validated event details", extra=verbose_fields(event=loggable_event(result)))
+    yield 'result', result
+
+@traceable()
+@timed(STAGE_FALLBACK)
+async def create_fallback_response(text: str, current_time: str, error_message: str, user_timezone: str = 'UTC',
+                                   error_code: str = None, user_now: Optional[datetime] = None):
     """
     Create a fallback response that preserves any extractable information.
     Returns partial data with an extraction_error flag for the frontend.
+    user_now is the already parsed current_time, if the caller got that far.
     """
-    print(f"Creating fallback response for error: {error_message}, code: {error_code}")
+    logger.warning("Creating fallback response", extra=log_fields(error=error_message, error_code=error_code))
     
     # Get current date as fallback using user's timezone
     try:
-        user_tz = pytz.timezone(user_timezone)
-    except:
-        user_tz = pytz.UTC
-    try:
-        user_now = datetime.fromisoformat(current_time.replace('Z', '+00:00')).astimezone(user_tz)
-        default_date = user_now.strftime('%Y-%m-%d')
+        if user_now is None:
+            user_now = get_user_now(current_time, user_timezone)
+        default_date = prompt_contexts.get(user_now).current_date
     except:
         default_date = datetime.now().strftime('%Y-%m-%d')
     
@@ -451,67 +828,430 @@ def create_fallback_response(text: str, current_time: str, error_message: str, u
         "extraction_error": "Could not fully extract event details. Please verify and adjust as needed."
     }
     
-    print(f"Fallback response: {fallback_response}")
+    logger.debug("Fallback response", extra=verbose_fields(event=loggable_event(fallback_response)))
     return fallback_response
 
 
-@app.post("/process_event")
-async def process_event(request: Request):
-    text = ''
-    current_time = None
-    user_timezone = 'UTC'
+@timed(STAGE_VALIDATION)
+def validate_text(text: str) -> Optional[dict]:
+    """Return an error response if the selected text can't be extracted, else None"""
+    if not text or len(text.strip()) == 0:
+        logger.info("Rejected input: no text provided", extra=log_fields(error_code=ErrorCodes.TEXT_TOO_SHORT))
+        return {
+            "error_code": ErrorCodes.TEXT_TOO_SHORT,
+            "extraction_error": "No text provided. Please select some text containing event details."
+        }
     
+    if len(text.strip()) < 10:
+        logger.info("Rejected input: text too short",
+                    extra=log_fields(error_code=ErrorCodes.TEXT_TOO_SHORT, text_length=len(text.strip())))
+        return {
+            "error_code": ErrorCodes.TEXT_TOO_SHORT,
+            "extraction_error": "Please select more text that includes event details like date, time, and description."
+        }
+    
+    if len(text) > 5000:
+        logger.info("Rejected input: text too long",
+                    extra=log_fields(error_code=ErrorCodes.TEXT_TOO_LONG, text_length=len(text)))
+        return {
+            "error_code": ErrorCodes.TEXT_TOO_LONG,
+            "extraction_error": "Please select a shorter portion of text containing just the event details."
+        }
+    
+    return None
+
+def invalid_item_response(e: ValidationError) -> dict:
+    """Error response for a batch item whose fields have the wrong type"""
+    fields = ", ".join(".".join(str(part) for part in error['loc']) or 'item' for error in e.errors())
+    logger.info("Rejected batch item", extra=log_fields(error_code=ErrorCodes.UNKNOWN_ERROR, fields=fields))
+    return {
+        "error_code": ErrorCodes.UNKNOWN_ERROR,
+        "extraction_error": f"Invalid batch item: wrong type for {fields}."
+    }
+
+def error_code_for_exception(e: Exception) -> str:
+    """Map an extraction exception to the error code shown by the frontend"""
+    if isinstance(e, AdmissionRejected):
+        return ErrorCodes.RATE_LIMITED
+    if isinstance(e, UpstreamUnavailableError):
+        return ErrorCodes.BACKEND_ERROR
+    if isinstance(e, asyncio.TimeoutError):
+        return ErrorCodes.BACKEND_TIMEOUT
+    error_str = str(e).lower()
+    if 'timeout' in error_str or 'timed out' in error_str:
+        return ErrorCodes.BACKEND_TIMEOUT
+    if 'rate limit' in error_str or '429' in error_str:
+        return ErrorCodes.RATE_LIMITED
+    return ErrorCodes.UNKNOWN_ERROR
+
+async def extract_event(text: str, current_time: Optional[str], user_timezone: str = 'UTC', bypass_cache: bool = False,
+                        client: Optional[str] = None):
+    """Validate, look up and extract a single text.
+    
+    Returns (result, cache_status) where cache_status is 'HIT', 'MISS',
+    'BYPASS' or None when the cache wasn't consulted. client is the rate
+    limiting key; it is charged only on a cache miss.
+    """
+    user_now = None
     try:
-        data = await request.json()
-        text = data.get('text', '')
-        current_time = data.get('current_time')  # ISO string from frontend
-        user_timezone = data.get('user_timezone', 'UTC')  # User's timezone from browser
-        
-        # Validate text length
-        if not text or len(text.strip()) == 0:
-            print("Error: No text provided")
-            return {
-                "error_code": ErrorCodes.TEXT_TOO_SHORT,
-                "extraction_error": "No text provided. Please select some text containing event details."
-            }
-        
-        if len(text.strip()) < 10:
-            print(f"Error: Text too short ({len(text.strip())} chars)")
-            return {
-                "error_code": ErrorCodes.TEXT_TOO_SHORT,
-                "extraction_error": "Please select more text that includes event details like date, time, and description."
-            }
-        
-        if len(text) > 5000:
-            print(f"Error: Text too long ({len(text)} chars)")
-            return {
-                "error_code": ErrorCodes.TEXT_TOO_LONG,
-                "extraction_error": "Please select a shorter portion of text containing just the event details."
-            }
+        error_response = validate_text(text)
+        if error_response:
+            return error_response, None
             
         if not current_time:
-            print("Error: No current time provided")
+            logger.warning("No current time provided, using server time")
             current_time = datetime.now().isoformat()  # Use server time as fallback
         
-        print(f"Processing text: '{text[:100]}...', current_time: '{current_time}', timezone: '{user_timezone}'")
-        return process_text(text, current_time, user_timezone)
+        # Same inputs as the extraction: text, timezone, the user's local date, prompt and model
+        user_now = get_user_now(current_time, user_timezone)
+        decided = model_router.decide(text)
+        extraction_key = extraction_cache_key(text, user_timezone, user_now, decided[0])
+        
+        # Serve repeated selections from the server-side cache
+        cache_status = None
+        if extraction_cache is not None:
+            if bypass_cache:
+                cache_status = 'BYPASS'
+            else:
+                cached = await extraction_cache.get(extraction_key)
+                if cached is not None:
+                    return cached, 'HIT'
+                cache_status = 'MISS'
+        
+        await check_client_rate(client)
+        logger.info("Processing text", extra=verbose_fields(
+            current_time=current_time, timezone=user_timezone, cache=cache_status, **loggable_text(text)
+        ))
+        
+        async def extract_and_cache():
+            # Cached inside the shared task, so the result is kept even if the leader's client has left
+            result = await process_text(text, current_time, user_timezone, user_now, decided)
+            if extraction_cache is not None:
+                await extraction_cache.set(extraction_key, result)
+            return result
+        
+        result = await inflight_extractions.do(extraction_key, extract_and_cache)
+        return result, cache_status
         
     except HTTPException:
         raise  # Re-raise HTTP exceptions as-is
+    
+    except AdmissionRejected as e:
+        logger.warning("Request not admitted", extra=log_fields(reason=e.reason))
+        fallback = await create_fallback_response(text, current_time, str(e), user_timezone,
+                                                  ErrorCodes.RATE_LIMITED, user_now)
+        return fallback, None
         
     except Exception as e:
-        print(f"Error in process_event: {str(e)}")
-        error_str = str(e).lower()
-        
-        # Determine specific error code
+        logger.error("Error in process_event", extra=log_fields(error=str(e)))
+        # Return partial extraction with error flag - preserve any extracted info
+        fallback = await create_fallback_response(text, current_time, str(e), user_timezone,
+                                                  error_code_for_exception(e), user_now)
+        return fallback, None
+
+def wants_cache_bypass(request: Request) -> bool:
+    return request.headers.get('x-cache-bypass', '').lower() in ('1', 'true')
+
+@app.post("/process_event", response_model=Union[EventResponse, InputRejectedResponse])
+async def process_event(request: Request):
+    # Parsed and validated in one pass by pydantic-core; a bad body gets the fallback, not a 422
+    try:
+        started = time.perf_counter()
+        body = ProcessEventRequest.model_validate_json(await request.body())
+        STAGE_JSON_PARSE.observe(time.perf_counter() - started)
+    except Exception as e:
+        logger.error("Error in process_event", extra=log_fields(error=str(e)))
+        fallback = await create_fallback_response('', None, str(e), 'UTC', error_code_for_exception(e))
+        record_result(fallback)
+        return EventJSONResponse(fallback)
+    
+    result, cache_status = await extract_event(body.text, body.current_time, body.user_timezone,
+                                               wants_cache_bypass(request), request_client_key(request))
+    record_result(result)
+    # Returned directly: FastAPI's encoder and response-model validation are skipped
+    return EventJSONResponse(result, headers={'X-Cache': cache_status} if cache_status else None)
+
+# Batch extraction limits
+MAX_BATCH_ITEMS = int(os.getenv('MAX_BATCH_ITEMS', '50'))
+BATCH_CONCURRENCY = int(os.getenv('BATCH_CONCURRENCY', '8'))
+# Texts up to this length may be packed into one createEvents call, this many per call
+PACK_MAX_TEXT_LENGTH = int(os.getenv('PACK_MAX_TEXT_LENGTH', '600'))
+PACK_MAX_ITEMS = int(os.getenv('PACK_MAX_ITEMS', '5'))
+
+@app.post("/process_events")
+async def process_events(request: Request):
+    """Extract events from several text selections in one request.
+    
+    Body: {"items": [{"text", "current_time", "user_timezone"}, ...], "pack": false}
+    Returns {"results": [...]} in item order, each shaped like a /process_event
+    response. Items are validated one by one like a /process_event body; an
+    invalid item gets an UNKNOWN_ERROR result and the others are still
+    extracted. With "pack": true, short texts sharing a timezone and date are
+    sent to the LLM together; anything a packed call misses is extracted
+    individually.
+    """
+    try:
+        started = time.perf_counter()
+        data = await request.json()
+        STAGE_JSON_PARSE.observe(time.perf_counter() - started)
+        items = data.get('items')
+        pack = bool(data.get('pack', False))
+    except Exception:
+        raise HTTPException(status_code=400, detail="Body must be a JSON object with an 'items' list")
+    if not isinstance(items, list):
+        raise HTTPException(status_code=400, detail="'items' must be a list of objects")
+    if len(items) > MAX_BATCH_ITEMS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BATCH_ITEMS} items per batch")
+    
+    bypass_cache = wants_cache_bypass(request)
+    client = request_client_key(request)
+    semaphore = asyncio.Semaphore(BATCH_CONCURRENCY)
+    results = [None] * len(items)
+    # Same typed validation as a /process_event body; None marks an invalid item
+    bodies = [None] * len(items)
+    for i, item in enumerate(items):
+        try:
+            bodies[i] = ProcessEventRequest.model_validate(item)
+        except ValidationError as e:
+            results[i] = invalid_item_response(e)
+    
+    async def run_single(i: int):
+        body = bodies[i]
+        async with semaphore:
+            results[i], _ = await extract_event(body.text, body.current_time, body.user_timezone, bypass_cache, client)
+    
+    singles = [i for i, body in enumerate(bodies) if body is not None]
+    packs, pack_keys = [], {}
+    # A packed call runs at the default tier without escalation, so with routing on every item goes on its own
+    if pack and get_openai_client() and not model_router.enabled:
+        singles, packs, pack_keys = await plan_packed_batches(bodies, bypass_cache, results)
+    
+    async def run_packed(indices: List[int], current_time: str, user_timezone: str):
+        try:
+            # A pack costs one token per text; if the client can't afford it all, the leftovers are charged one by one
+            await check_client_rate(client, len(indices))
+            async with semaphore:
+                packed = await process_text_batch([bodies[i].text for i in indices], current_time, user_timezone)
+        except Exception as e:
+            logger.warning("Packed extraction failed, extracting individually", extra=log_fields(error=str(e)))
+            packed = [None] * len(indices)
+        leftovers = []
+        for i, result in zip(indices, packed):
+            if result is None:
+                leftovers.append(i)
+                continue
+            results[i] = result
+            if extraction_cache is not None:
+                await extraction_cache.set(pack_keys[i], result)
+        await asyncio.gather(*(run_single(i) for i in leftovers))
+    
+    await asyncio.gather(*(run_single(i) for i in singles), *(run_packed(*p) for p in packs))
+    for result in results:
+        record_result(result)
+    return EventJSONResponse({"results": results})
+
+async def plan_packed_batches(bodies: List[Optional[ProcessEventRequest]], bypass_cache: bool, results: list):
+    """Split validated batch items into individually extracted indices and groups to pack.
+    
+    Invalid items (None) already have their result and are skipped. Cache
+    hits, whether from a single or a packed extraction, are written straight
+    into results. Returns (singles, packs, keys) where each pack is (indices,
+    current_time, user_timezone) and keys maps packed indices to the cache
+    keys of a packed extraction: the multi-event prompt at the default tier.
+    """
+    singles = []
+    groups = {}
+    keys = {}
+    for i, body in enumerate(bodies):
+        if body is None:
+            continue
+        text = body.text
+        if validate_text(text) or len(text) > PACK_MAX_TEXT_LENGTH:
+            singles.append(i)
+            continue
+        current_time = body.current_time or datetime.now().isoformat()
+        user_timezone = body.user_timezone
+        try:
+            user_now = get_user_now(current_time, user_timezone)
+        except Exception:
+            singles.append(i)
+            continue
+        current_date = prompt_contexts.get(user_now).current_date
+        keys[i] = extraction_cache_key(text, user_timezone, user_now, 0, multi_event=True)
+        if extraction_cache is not None and not bypass_cache:
+            cached = await extraction_cache.get(extraction_cache_key(text, user_timezone, user_now, 0))
+            if cached is None:
+                cached = await extraction_cache.get(keys[i])
+            if cached is not None:
+                results[i] = cached
+                continue
+        # The prompt depends on the user's local date, so only pack texts that share it
+        group = groups.setdefault((current_date, user_timezone), (current_time, []))
+        group[1].append(i)
+    
+    packs = []
+    for (_, user_timezone), (current_time, indices) in groups.items():
+        for start in range(0, len(indices), PACK_MAX_ITEMS):
+            chunk = indices[start:start + PACK_MAX_ITEMS]
+            if len(chunk) == 1:
+                singles.extend(chunk)
+            else:
+                packs.append((chunk, current_time, user_timezone))
+    return singles, packs, keys
+
+# Multi-event extraction: spans beyond this many per text are skipped
+MULTI_EVENT_MAX_SEGMENTS = int(os.getenv('MULTI_EVENT_MAX_SEGMENTS', '10'))
+# Error codes a result can carry and still hold an extracted event; any other code marks a fallback
+EXTRACTED_ERROR_CODES = (None, ErrorCodes.PAST_DATE)
+
+@app.post("/process_event/multi")
+async def process_event_multi(request: Request):
+    """Extract every event in a long text, such as a schedule or a thread listing several sessions.
+    
+    Body: same as /process_event. The text is split into candidate event spans
+    (segmenter.py) that are extracted concurrently, each like a /process_event
+    call (cache, single-flight), then deduplicated. The whole request costs one
+    rate limit token, however many spans it has.
+    Returns {"events": [...], "segments": n, "skipped_segments": k,
+    "failed_segments": [{"index", "text", "error_code", "extraction_error"}, ...]}:
+    spans whose extraction fell back (rate limited, upstream errors, no event)
+    are reported in failed_segments rather than as placeholder events. Text
+    holding at most one event is extracted whole. A rejected request (bad body,
+    text too short or long, client over its rate) has no events and carries
+    error_code and extraction_error at the top level.
+    """
+    empty = {"events": [], "segments": 0, "skipped_segments": 0, "failed_segments": []}
+    try:
+        started = time.perf_counter()
+        body = ProcessEventRequest.model_validate_json(await request.body())
+        STAGE_JSON_PARSE.observe(time.perf_counter() - started)
+    except Exception as e:
+        logger.error("Error in process_event_multi", extra=log_fields(error=str(e)))
+        error_response = {"error_code": error_code_for_exception(e),
+                          "extraction_error": "Could not read the request. Please try again."}
+        record_result(error_response)
+        return EventJSONResponse({**empty, **error_response})
+    
+    error_response = validate_text(body.text)
+    if error_response:
+        record_result(error_response)
+        return EventJSONResponse({**empty, **error_response})
+    
+    segments = segment_text(body.text)
+    skipped = max(0, len(segments) - MULTI_EVENT_MAX_SEGMENTS)
+    segments = segments[:MULTI_EVENT_MAX_SEGMENTS]
+    try:
+        # One token for the whole text, charged up front, so segments aren't charged again
+        await check_client_rate(request_client_key(request))
+    except AdmissionRejected as e:
+        logger.warning("Request not admitted", extra=log_fields(reason=e.reason))
+        error_response = {"error_code": ErrorCodes.RATE_LIMITED,
+                          "extraction_error": "Too many requests. Please wait a moment and try again."}
+        record_result(error_response)
+        return EventJSONResponse({**empty, "segments": len(segments), "skipped_segments": skipped, **error_response})
+    
+    bypass_cache = wants_cache_bypass(request)
+    results = await asyncio.gather(*(
+        extract_event(segment, body.current_time, body.user_timezone, bypass_cache) for segment in segments
+    ))
+    extracted, failed = [], []
+    for index, (segment, (result, _)) in enumerate(zip(segments, results)):
+        record_result(result)
+        if result.get('error_code') in EXTRACTED_ERROR_CODES:
+            extracted.append(result)
+        else:
+            failed.append({"index": index, "text": segment, "error_code": result['error_code'],
+                           "extraction_error": result.get('extraction_error')})
+    events = dedupe_events(extracted)
+    logger.info("Multi-event extraction finished", extra=log_fields(
+        segments=len(segments), skipped_segments=skipped, failed_segments=len(failed), events=len(events)
+    ))
+    return EventJSONResponse({"events": events, "segments": len(segments), "skipped_segments": skipped,
+                              "failed_segments": failed})
+
+def sse_event(event: str, data: dict) -> str:
+    if event in ('result', 'error'):
+        record_result(data)
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+def sse_error_event(e: Exception, extraction_error: str) -> str:
+    """Terminal `error` frame for a failed stream, built from plain strings so it can't fail in turn"""
+    try:
+        error_code = error_code_for_exception(e)
+    except Exception:
         error_code = ErrorCodes.UNKNOWN_ERROR
-        if 'timeout' in error_str or 'timed out' in error_str:
-            error_code = ErrorCodes.BACKEND_TIMEOUT
-        elif 'rate limit' in error_str or '429' in error_str:
-            error_code = ErrorCodes.RATE_LIMITED
+    return sse_event('error', {"error_code": error_code, "extraction_error": extraction_error})
+
+async def stream_extraction_events(text: str, current_time: Optional[str], user_timezone: str, bypass_cache: bool,
+                                   client: Optional[str] = None):
+    """Produce the SSE frames for /process_event/stream"""
+    try:
+        error_response = validate_text(text)
+        if error_response:
+            yield sse_event('result', error_response)
+            return
         
-        # Return partial extraction with error flag - preserve any extracted info
-        return create_fallback_response(text, current_time, str(e), user_timezone, error_code)
+        if not current_time:
+            logger.warning("No current time provided, using server time")
+            current_time = datetime.now().isoformat()  # Use server time as fallback
+        
+        user_now = get_user_now(current_time, user_timezone)
+        decided = model_router.decide(text)
+        extraction_key = extraction_cache_key(text, user_timezone, user_now, decided[0])
+        if extraction_cache is not None and not bypass_cache:
+            cached = await extraction_cache.get(extraction_key)
+            if cached is not None:
+                yield sse_event('result', cached)
+                return
+        await check_client_rate(client)
+        
+        # Mock mode has nothing to stream
+        if not get_openai_client():
+            yield sse_event('result', await process_text(text, current_time, user_timezone, user_now, decided))
+            return
+        
+        logger.info("Streaming text", extra=verbose_fields(
+            current_time=current_time, timezone=user_timezone, **loggable_text(text)
+        ))
+        async for event, data in process_text_stream(text, current_time, user_timezone, user_now, decided):
+            if event == 'result' and extraction_cache is not None:
+                await extraction_cache.set(extraction_key, data)
+            yield sse_event(event, data)
+    
+    except Exception as e:
+        yield sse_error_event(e, "Could not extract event details. Please try again.")
+        logger.error("Error in process_event_stream", extra=log_fields(error=repr(e)))
+
+@app.post("/process_event/stream")
+async def process_event_stream(request: Request):
+    """Server-Sent Events version of /process_event.
+    
+    Emits a `field` event ({"field": ..., "value": ...}) for each event field as
+    the model produces it (title first, then date and times, ...), followed by
+    one terminal event: `result`, shaped exactly like a /process_event
+    response, or `error` ({"error_code", "extraction_error"}) when the body is
+    invalid or the extraction failed. Fields already sent are kept on error.
+    """
+    # The body is validated like /process_event's before any frame is sent
+    try:
+        started = time.perf_counter()
+        body = ProcessEventRequest.model_validate_json(await request.body())
+        STAGE_JSON_PARSE.observe(time.perf_counter() - started)
+        events = stream_extraction_events(body.text, body.current_time, body.user_timezone,
+                                          wants_cache_bypass(request), request_client_key(request))
+    except Exception as e:
+        logger.error("Error in process_event_stream", extra=log_fields(error=str(e)))
+        frame = sse_error_event(e, "Could not read the request. Please try again.")
+        
+        async def error_events():
+            yield frame
+        events = error_events()
+    
+    return StreamingResponse(
+        events,
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
 class CalendarSaveResult(BaseModel):
     success: bool
@@ -524,8 +1264,8 @@ class CalendarSaveResult(BaseModel):
     extraction_duration_ms: Optional[int] = None
     save_duration_ms: Optional[int] = None
 
-@traceable(run_type="chain", name="calendar_save_result", client=langsmith_client)
-def log_calendar_save(result: CalendarSaveResult):
+@traceable(run_type="chain", name="calendar_save_result")
+async def log_calendar_save(result: CalendarSaveResult):
     """Log calendar save result for end-to-end tracing.
     
     Note: Event details (title, date, time) are NOT anonymized here as they are
@@ -546,20 +1286,127 @@ def log_calendar_save(result: CalendarSaveResult):
 async def log_calendar_save_endpoint(result: CalendarSaveResult):
     """Endpoint to log calendar save results for end-to-end tracing."""
     try:
-        logged = log_calendar_save(result)
+        logged = await log_calendar_save(result)
         return {"status": "logged", "data": logged}
     except Exception as e:
         return {"status": "error", "message": str(e)}
 
+@app.get("/cache_stats")
+async def cache_stats():
+    """Hit/miss counters for the extraction cache, coalesced in-flight requests and prompt contexts."""
+    stats = {"enabled": False}
+    if extraction_cache is not None:
+        stats = {"enabled": True, **extraction_cache.stats()}
+    stats["singleflight"] = inflight_extractions.stats()
+    stats["prompt_context"] = prompt_contexts.stats()
+    return stats
+
+@app.get("/preparser_stats")
+async def preparser_stats_endpoint():
+    """Pre-parser usage and, in shadow mode, its agreement with LLM results."""
+    return {
+        "mode": PREPARSER_MODE,
+        "confidence_threshold": PREPARSER_CONFIDENCE_THRESHOLD,
+        **preparser_stats.stats()
+    }
+
+@app.get("/trace_stats")
+async def trace_stats():
+    """Trace export and extraction recording queue counters: queued, sent and dropped runs."""
+    return {**tracer.stats(), "recording": recorder.stats()}
+
+@app.get("/upstream_stats")
+async def upstream_stats():
+    """LLM call counters: attempts, retries, budget exhaustion, circuit breaker and hedging state."""
+    return {**upstream_caller.stats(), "hedging": upstream_hedger.stats()}
+
+@app.get("/routing_stats")
+async def routing_stats():
+    """Model tiers, routing mix, escalations by reason and per-tier LLM latency."""
+    return model_router.stats()
+
+@app.get("/admission_stats")
+async def admission_stats():
+    """Upstream slots, wait queue and shedding counters, and per-client rate limiting."""
+    return {
+        "admission": admission.stats(),
+        "rate_limit": rate_limiter.stats() if rate_limiter is not None else {"enabled": False}
+    }
+
+def collect_component_metrics():
+    """Scrape-time samples from the cache, single-flight, upstream caller, trace and log queues"""
+    samples = [("prompt_variant_info", "gauge", "Prompt/schema variant in use (PROMPT_VARIANT)",
+                {"variant": prompt_variant.name}, 1)]
+    if extraction_cache is not None:
+        samples += [
+            ("extraction_cache_hits_total", "counter", "Extraction cache hits", {}, extraction_cache.hits),
+            ("extraction_cache_misses_total", "counter", "Extraction cache misses", {}, extraction_cache.misses),
+        ]
+    samples += [
+        ("prompt_context_hits_total", "counter", "Requests served a memoized prompt context", {}, prompt_contexts.hits),
+        ("prompt_context_misses_total", "counter", "Prompt contexts built (new timezone or local day)", {},
+         prompt_contexts.misses),
+    ]
+    flights = inflight_extractions.stats()
+    samples += [
+        ("singleflight_in_flight", "gauge", "Distinct extractions currently in flight", {}, flights["in_flight"]),
+        ("singleflight_coalesced_total", "counter", "Requests that joined an in-flight extraction", {}, flights["coalesced"]),
+    ]
+    upstream = upstream_caller.stats()
+    for name in ("attempts", "retries", "failures", "budget_exhausted"):
+        samples.append((f"upstream_{name}_total", "counter", f"Upstream LLM {name.replace('_', ' ')}", {}, upstream[name]))
+    breaker = upstream["breaker"]
+    samples += [
+        ("upstream_breaker_open", "gauge", "1 while the upstream circuit breaker is open", {}, int(breaker["state"] == 'open')),
+        ("upstream_breaker_rejected_total", "counter", "Calls failed fast by the circuit breaker", {}, breaker["rejected"]),
+    ]
+    slots = admission.stats()
+    samples += [
+        ("admission_outstanding", "gauge", "Upstream extraction slots in use", {}, slots["outstanding"]),
+        ("admission_queue_depth", "gauge", "Requests waiting for an upstream slot", {}, slots["queue_depth"]),
+    ]
+    if upstream_hedger.enabled:
+        hedging = upstream_hedger.stats()
+        for name in ("calls", "hedged", "hedge_won", "skipped_budget", "skipped_saturated"):
+            samples.append(("upstream_hedge_total", "counter", "Hedgeable calls, hedges fired, hedges that won, "
+                            "hedges skipped for budget or for want of a free slot", {"outcome": name}, hedging[name]))
+    if tracer.queue is not None:
+        trace = tracer.queue.stats()
+        samples.append(("trace_queue_depth", "gauge", "Runs waiting to be exported", {}, trace["queue_depth"]))
+        for name in ("sent", "dropped_backpressure", "dropped_export_error"):
+            samples.append(("trace_runs_total", "counter", "Traced runs by outcome", {"outcome": name}, trace[name]))
+    logging_stats = log_stats()
+    samples += [
+        ("log_queue_depth", "gauge", "Log records waiting to be written", {}, logging_stats["queue_depth"]),
+        ("log_records_dropped_total", "counter", "Log records dropped because the log queue was full", {},
+         logging_stats["dropped"]),
+        ("log_records_sampled_out_total", "counter", "Verbose log records skipped by LOG_SAMPLE_RATE", {},
+         logging_stats["sampled_out"]),
+    ]
+    return samples
+
+metrics_registry.add_collector(collect_component_metrics)
+
+@app.get("/metrics")
+async def metrics():
+    """Prometheus text exposition of stage latencies, result codes and component counters."""
+    return PlainTextResponse(metrics_registry.render(), media_type="text/plain; version=0.0.4")
+
 @app.get("/health")
 async def health_check():
     return {"status": "ok"}
 
+@app.get("/ready")
+async def ready_check():
+    """Readiness: dependencies loaded and the OpenAI key validated (or mock mode)."""
+    status_code = 200 if readiness['status'] == 'ready' else 503
+    return JSONResponse(status_code=status_code, content=readiness)
+
 @app.get("/")
 async def root():
     return {"message": "AI Calendar Extension API is running. Use /process_event endpoint to process text."}
 
 if __name__ == "__main__":
-    import uvicorn
-    port = int(os.getenv("PORT", 8000))
-    uvicorn.run("main:app", host="0.0.0.0", port=port, reload=True)
+    # Production profile (gunicorn.conf.py); SERVER_RELOAD=true runs a single auto-reloading dev server
+    from serving import run
+    run()
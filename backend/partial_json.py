@@ -0,0 +1,88 @@
+"""
+Incremental parser for a JSON object that arrives in chunks.
+
+Used to turn streamed createEvent function-call arguments into field-level
+updates: each top-level key is reported as soon as its value is complete,
+without re-parsing the whole buffer on every chunk.
+"""
+import json
+from typing import Any, List, Tuple
+
+
+class PartialObjectParser:
+    """Report top-level fields of a streamed JSON object as they complete"""
+
+    def __init__(self):
+        self.buffer = ''
+        self.fields = {}
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._token_start = None
+        self._key = None
+        self._value_start = None
+
+    def feed(self, chunk: str) -> List[Tuple[str, Any]]:
+        """Add a chunk and return the (key, value) pairs it completed"""
+        self.buffer += chunk
+        buf = self.buffer
+        completed = []
+
+        for i in range(self._pos, len(buf)):
+            c = buf[i]
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif c == '\\':
+                    self._escape = True
+                elif c == '"':
+                    self._in_string = False
+                    if self._depth == 1:
+                        if self._key is None and self._value_start is None:
+                            self._key = json.loads(buf[self._token_start:i + 1])
+                        elif self._value_start == self._token_start:
+                            self._complete(buf, i + 1, completed)
+                continue
+
+            if c == '"':
+                self._in_string = True
+                if self._depth == 1:
+                    self._token_start = i
+                    if self._key is not None and self._value_start is None:
+                        self._value_start = i
+            elif c in '{[':
+                if self._depth == 1 and self._key is not None and self._value_start is None:
+                    self._value_start = i
+                self._depth += 1
+            elif c in '}]':
+                self._depth -= 1
+                if self._value_start is not None:
+                    if self._depth == 1:
+                        # Nested object/array value just closed
+                        self._complete(buf, i + 1, completed)
+                    elif self._depth == 0:
+                        # End of the whole object terminates a pending number/null/bool
+                        self._complete(buf, i, completed)
+            elif self._depth == 1:
+                if c == ',':
+                    if self._value_start is not None:
+                        self._complete(buf, i, completed)
+                elif c != ':' and not c.isspace() and self._key is not None and self._value_start is None:
+                    self._value_start = i
+
+        self._pos = len(buf)
+        return completed
+
+    def _complete(self, buf: str, end: int, completed: list):
+        key = self._key
+        raw = buf[self._value_start:end].strip()
+        self._key = None
+        self._value_start = None
+        try:
+            value = json.loads(raw)
+        except ValueError:
+            return  # Malformed value; the final full parse will surface the error
+        self.fields[key] = value
+        completed.append((key, value))
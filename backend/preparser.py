@@ -0,0 +1,430 @@
+"""
+Deterministic rule-based event extraction.
+
+Handles simple selections like "Lunch with Sam tomorrow at 12:30 PM at Cafe Luna"
+without an LLM call: relative dates, weekday names, explicit dates, single
+times and time ranges, attendee emails and "at/in <Place>" locations. Every
+result carries a confidence score; callers only trust it above a threshold.
+All regexes are compiled once at import.
+"""
+import re
+from datetime import datetime, timedelta
+from typing import List, Optional
+
+# Time format regex
+TIME_FORMAT = re.compile(r'^(1[0-2]|0?[1-9]):([0-5][0-9])\s*(AM|PM)$', re.IGNORECASE)
+
+MONTHS = {
+    'jan': 1, 'feb': 2, 'mar': 3, 'apr': 4, 'may': 5, 'jun': 6,
+    'jul': 7, 'aug': 8, 'sep': 9, 'oct': 10, 'nov': 11, 'dec': 12
+}
+WEEKDAYS = {'mon': 0, 'tue': 1, 'wed': 2, 'thu': 3, 'fri': 4, 'sat': 5, 'sun': 6}
+
+_MONTH = r'(?P<month>jan(?:uary)?|feb(?:ruary)?|mar(?:ch)?|apr(?:il)?|may|june?|july?|aug(?:ust)?|sep(?:t(?:ember)?)?|oct(?:ober)?|nov(?:ember)?|dec(?:ember)?)\.?'
+_WEEKDAY = r'(?P<weekday>mon(?:day)?|tue(?:s(?:day)?)?|wed(?:nesday)?|thu(?:rs(?:day)?)?|fri(?:day)?|sat(?:urday)?|sun(?:day)?)'
+_ORDINAL = r'(?:st|nd|rd|th)?'
+_YEAR = r'(?:,?\s+(?P<year>\d{4}))?'
+
+DATE_PATTERNS = [
+    ('iso', re.compile(r'\b(?P<year>\d{4})-(?P<month>\d{2})-(?P<day>\d{2})\b')),
+    ('month_day', re.compile(r'\b' + _MONTH + r'\s+(?P<day>\d{1,2})' + _ORDINAL + r'\b' + _YEAR, re.I)),
+    ('day_month', re.compile(r'\b(?P<day>\d{1,2})' + _ORDINAL + r'\s+(?:of\s+)?' + _MONTH + r'\b' + _YEAR, re.I)),
+    ('numeric', re.compile(r'(?<![\d/.])(?P<month>\d{1,2})/(?P<day>\d{1,2})(?:/(?P<year>\d{4}|\d{2}))?(?![\d/])')),
+    ('relative', re.compile(r'\b(?P<relative>day after tomorrow|tomorrow|today|tonight|this (?:morning|afternoon|evening)|next week)\b', re.I)),
+    ('weekday', re.compile(r'\b(?:(?P<qualifier>next|this|on)\s+)?' + _WEEKDAY + r'\b', re.I)),
+]
+
+_CLOCK = r'\d{1,2}(?::[0-5]\d)?\s*(?:[ap]\.?m\b\.?)?|noon|midnight'
+TIME_RANGES = [
+    re.compile(r'(?<![\d/.:-])(?P<start>' + _CLOCK + r')\s*(?:-|–|—|to|until|till)\s*(?P<end>' + _CLOCK + r')(?![\w/])', re.I),
+    re.compile(r'\bbetween\s+(?P<start>' + _CLOCK + r')\s+and\s+(?P<end>' + _CLOCK + r')(?![\w/])', re.I),
+]
+SINGLE_TIME = re.compile(
+    r'(?<![\d/.:-])(?:(?P<hour>\d{1,2}):(?P<minute>[0-5]\d)\s*(?P<period>[ap]\.?m\b\.?)?'
+    r'|(?P<bare_hour>\d{1,2})\s*(?P<bare_period>[ap]\.?m\b\.?)'
+    r'|(?P<word>noon|midnight))(?![\w/])',
+    re.I
+)
+CLOCK_PARTS = re.compile(r'(?P<hour>\d{1,2})(?::(?P<minute>[0-5]\d))?\s*(?P<period>[ap])?', re.I)
+
+EMAIL = re.compile(r'[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}')
+# Single spaces only, so a location never runs across a masked-out date or time
+LOCATION = re.compile(r"\b(?:at|in|@) (?P<location>(?:the )?[A-Z][\w&'-]*(?: (?:[A-Z0-9][\w&'-]*|of|de|la))*)")
+LEADING_PREPOSITION = re.compile(r'\b(?:at|on|from|by|around|before|after|for|@)\s+$', re.I)
+# Words that suggest alternatives, recurrence or uncertainty the LLM handles better
+HEDGE_WORDS = re.compile(r'\b(?:or|maybe|perhaps|tbd|tba|alternatively|reschedul\w*|every|weekly|daily|monthly|unless|instead)\b', re.I)
+TIMEZONE_LABEL = re.compile(r'\(?\b(?:[A-Z]{1,3}T|UTC|GMT)(?:[+-]\d{1,2})?\b\)?')
+EDGE_FILLER = re.compile(r'^(?:on|at|from|to|for|by|in|with|and|the|,|-|:)\s+|\s+(?:on|at|from|to|for|by|in|with|and|the|between)$', re.I)
+EXTRA_PUNCTUATION = re.compile(r'\s*[,;:!?.()\[\]-]+\s*$|^\s*[,;:!?.()\[\]-]+\s*')
+WHITESPACE = re.compile(r'\s+')
+
+MAX_CONFIDENT_LENGTH = 160
+
+
+def add_one_hour(time_str: str) -> str:
+    """Add one hour to a time string in HH:MM AM/PM format"""
+    match = TIME_FORMAT.match(time_str)
+    if not match:
+        raise ValueError(f"Invalid time format: {time_str}")
+
+    hour = int(match.group(1))
+    minute = int(match.group(2))
+    period = match.group(3).upper()
+
+    # Convert to 24-hour
+    if period == 'PM' and hour != 12:
+        hour += 12
+    elif period == 'AM' and hour == 12:
+        hour = 0
+
+    # Add one hour
+    hour = (hour + 1) % 24
+
+    # Convert back to 12-hour
+    if hour == 0:
+        hour = 12
+        period = 'AM'
+    elif hour == 12:
+        period = 'PM'
+    elif hour > 12:
+        hour -= 12
+        period = 'PM'
+    else:
+        period = 'AM'
+
+    return f"{hour}:{str(minute).zfill(2)} {period}"
+
+
+def format_minutes(minutes: int) -> str:
+    """Format minutes since midnight as 'H:MM AM/PM'"""
+    hour, minute = divmod(minutes % (24 * 60), 60)
+    period = 'AM' if hour < 12 else 'PM'
+    hour = hour % 12 or 12
+    return f"{hour}:{str(minute).zfill(2)} {period}"
+
+
+class PreParseResult:
+    """A locally extracted event plus how much we trust it (0.0 - 1.0)"""
+
+    def __init__(self, event: dict, confidence: float, reasons: List[str]):
+        self.event = event
+        self.confidence = confidence
+        self.reasons = reasons
+
+
+def _parse_clock(raw: str):
+    """Return (minutes, has_period) for a clock string, or None"""
+    raw = raw.strip().lower()
+    if raw == 'noon':
+        return 12 * 60, True
+    if raw == 'midnight':
+        return 0, True
+    match = CLOCK_PARTS.match(raw)
+    if not match:
+        return None
+    hour = int(match.group('hour'))
+    minute = int(match.group('minute') or 0)
+    period = (match.group('period') or '').lower()
+    if period:
+        if not 1 <= hour <= 12:
+            return None
+        hour = hour % 12 + (12 if period == 'p' else 0)
+        return hour * 60 + minute, True
+    if hour > 23:
+        return None
+    return hour * 60 + minute, hour == 0 or hour > 12
+
+
+def _assume_period(minutes: int) -> int:
+    """Place an ambiguous 1-11 o'clock time within business hours (8 AM - 7 PM)"""
+    if minutes < 8 * 60:
+        return minutes + 12 * 60
+    return minutes
+
+
+def _find_times(text: str, reasons: List[str]):
+    """Return (start_minutes, end_minutes or None, spans, mentions)"""
+    spans = []
+    candidates = []
+
+    for match in (m for pattern in TIME_RANGES for m in pattern.finditer(text)):
+        if any(s < match.end() and match.start() < e for s, e in spans):
+            continue
+        start = _parse_clock(match.group('start'))
+        end = _parse_clock(match.group('end'))
+        if not start or not end:
+            continue
+        raw_start, raw_end = match.group('start'), match.group('end')
+        # Require some clock signal, so "2-3 people" or "5 to 6 slides" aren't times
+        if not (start[1] or end[1] or ':' in raw_start or ':' in raw_end):
+            continue
+        start_minutes, start_explicit = start
+        end_minutes, end_explicit = end
+        if end_explicit and not start_explicit:
+            # "3-4pm": start shares the end's half of the day unless that puts it after the end
+            start_minutes = start_minutes % (12 * 60) + (end_minutes // (12 * 60)) * 12 * 60
+            if start_minutes > end_minutes:
+                start_minutes -= 12 * 60
+        elif start_explicit and not end_explicit:
+            end_minutes = end_minutes % (12 * 60) + (start_minutes // (12 * 60)) * 12 * 60
+            if end_minutes <= start_minutes:
+                end_minutes += 12 * 60
+        elif not start_explicit and not end_explicit:
+            reasons.append('ambiguous_am_pm')
+            start_minutes = _assume_period(start_minutes)
+            end_minutes = _assume_period(end_minutes)
+            if end_minutes <= start_minutes:
+                end_minutes += 12 * 60
+        spans.append(match.span())
+        candidates.append((start_minutes, end_minutes))
+
+    for match in SINGLE_TIME.finditer(text):
+        if any(s <= match.start() < e for s, e in spans):
+            continue
+        if match.group('word'):
+            parsed = _parse_clock(match.group('word'))
+        elif match.group('bare_hour'):
+            parsed = _parse_clock(match.group('bare_hour') + match.group('bare_period')[0])
+        else:
+            period = (match.group('period') or '')[:1]
+            parsed = _parse_clock(f"{match.group('hour')}:{match.group('minute')}{period}")
+        if not parsed:
+            continue
+        minutes, explicit = parsed
+        if not explicit:
+            reasons.append('ambiguous_am_pm')
+            minutes = _assume_period(minutes)
+        spans.append(match.span())
+        candidates.append((minutes, None))
+
+    if not candidates:
+        return None, None, spans, 0
+    # Keep the first candidate in text order
+    first_index = min(range(len(candidates)), key=lambda i: spans[i][0])
+    start, end = candidates[first_index]
+    return start, end, spans, len(candidates)
+
+
+def _resolve_month_day(month: int, day: int, year: Optional[str], today) -> Optional[datetime]:
+    try:
+        if year:
+            year_value = int(year)
+            if year_value < 100:
+                year_value += 2000
+            return datetime(year_value, month, day)
+        candidate = datetime(today.year, month, day)
+        # If year not specified and date has passed this year, use next year
+        if candidate.date() < today:
+            candidate = datetime(today.year + 1, month, day)
+        return candidate
+    except ValueError:
+        return None
+
+
+def _find_dates(text: str, user_now: datetime, reasons: List[str]):
+    """Return (resolved date or None, spans, number of distinct dates mentioned)"""
+    today = user_now.date()
+    found = []
+    spans = []
+
+    for kind, pattern in DATE_PATTERNS:
+        for match in pattern.finditer(text):
+            if any(s < match.end() and match.start() < e for s, e in spans):
+                continue
+            resolved = None
+            if kind == 'iso':
+                try:
+                    resolved = datetime(int(match.group('year')), int(match.group('month')), int(match.group('day'))).date()
+                except ValueError:
+                    pass
+            elif kind in ('month_day', 'day_month'):
+                month = MONTHS[match.group('month').lower()[:3]]
+                resolved_dt = _resolve_month_day(month, int(match.group('day')), match.group('year'), today)
+                resolved = resolved_dt.date() if resolved_dt else None
+            elif kind == 'numeric':
+                first, second = int(match.group('month')), int(match.group('day'))
+                if first > 12 and second <= 12:
+                    first, second = second, first  # Day-first date like 25/12
+                elif first <= 12 and second <= 12 and first != second:
+                    reasons.append('ambiguous_numeric_date')
+                resolved_dt = _resolve_month_day(first, second, match.group('year'), today)
+                resolved = resolved_dt.date() if resolved_dt else None
+            elif kind == 'relative':
+                relative = match.group('relative').lower()
+                if relative == 'day after tomorrow':
+                    resolved = today + timedelta(days=2)
+                elif relative == 'tomorrow':
+                    resolved = today + timedelta(days=1)
+                elif relative == 'next week':
+                    resolved = today + timedelta(weeks=1)
+                    reasons.append('vague_date')
+                else:
+                    resolved = today
+            elif kind == 'weekday':
+                weekday = WEEKDAYS[match.group('weekday').lower()[:3]]
+                qualifier = (match.group('qualifier') or '').lower()
+                days_ahead = (weekday - today.weekday()) % 7
+                if qualifier == 'next':
+                    # "next Friday" is read differently by different people
+                    reasons.append('ambiguous_next_weekday')
+                    if days_ahead == 0:
+                        days_ahead = 7
+                elif days_ahead == 0 and qualifier != 'this':
+                    reasons.append('ambiguous_weekday_today')
+                resolved = today + timedelta(days=days_ahead)
+            if resolved is None:
+                continue
+            spans.append(match.span())
+            found.append((match.start(), kind, resolved))
+
+    if not found:
+        return None, spans, 0
+    found.sort()
+    distinct = {resolved for _, kind, resolved in found if kind != 'weekday'} or {found[0][2]}
+    # A weekday alongside an explicit date ("Friday, March 6") is fine if they agree
+    explicit = [item for item in found if item[1] != 'weekday']
+    chosen = explicit[0][2] if explicit else found[0][2]
+    weekday_dates = {resolved for _, kind, resolved in found if kind == 'weekday'}
+    if explicit and weekday_dates and chosen.weekday() not in {d.weekday() for d in weekday_dates}:
+        reasons.append('weekday_mismatch')
+    return chosen, spans, len(distinct)
+
+
+def _mask(text: str, spans) -> str:
+    """Blank out spans (and a preposition right before them) keeping offsets intact"""
+    chars = list(text)
+    for start, end in spans:
+        preposition = LEADING_PREPOSITION.search(text, 0, start)
+        if preposition:
+            start = preposition.start()
+        for i in range(start, end):
+            chars[i] = ' '
+    return ''.join(chars)
+
+
+def _build_title(masked: str) -> str:
+    """Whatever remains after removing dates, times, locations and emails"""
+    title = WHITESPACE.sub(' ', masked).strip()
+    # Drop connecting words and punctuation left dangling at either end
+    previous = None
+    while previous != title:
+        previous = title
+        title = EXTRA_PUNCTUATION.sub('', title)
+        title = EDGE_FILLER.sub('', title).strip()
+    # Keep the first clause when a sentence trails on
+    title = re.split(r'\s*[.;!?]\s+|\s+-\s+|\s*,\s+', title)[0]
+    if title:
+        title = title[0].upper() + title[1:]
+    return title
+
+
+def preparse_event(text: str, user_now: datetime) -> Optional[PreParseResult]:
+    """Extract an event locally; None if no start time could be found"""
+    reasons = []
+    clean = TIMEZONE_LABEL.sub(lambda m: ' ' * len(m.group(0)), text)
+
+    emails = EMAIL.findall(clean)
+    masked = EMAIL.sub(lambda m: ' ' * len(m.group(0)), clean)
+
+    start, end, time_spans, time_mentions = _find_times(masked, reasons)
+    if start is None:
+        return None
+    date, date_spans, date_mentions = _find_dates(masked, user_now, reasons)
+
+    masked = _mask(masked, time_spans + date_spans)
+    location = ''
+    match = LOCATION.search(masked)
+    if match:
+        location = match.group('location')
+        masked = _mask(masked, [match.span()])
+
+    title = _build_title(masked)
+
+    confidence = 1.0
+    if date is None:
+        reasons.append('no_date')
+        date = user_now.date()
+    if time_mentions > 1:
+        reasons.append('multiple_times')
+    if date_mentions > 1:
+        reasons.append('multiple_dates')
+    if HEDGE_WORDS.search(masked):
+        reasons.append('hedged')
+    if len(text) > MAX_CONFIDENT_LENGTH:
+        reasons.append('long_text')
+    title_words = len(title.split())
+    if title_words == 0:
+        reasons.append('no_title')
+    elif title_words > 6:
+        reasons.append('long_title')
+
+    penalties = {
+        'no_date': 0.6, 'multiple_times': 0.3, 'multiple_dates': 0.3, 'hedged': 0.5,
+        'long_text': 0.5, 'no_title': 0.2, 'long_title': 0.7, 'ambiguous_am_pm': 0.8,
+        'ambiguous_numeric_date': 0.8, 'ambiguous_next_weekday': 0.7,
+        'ambiguous_weekday_today': 0.7, 'vague_date': 0.8, 'weekday_mismatch': 0.3
+    }
+    for reason in set(reasons):
+        confidence *= penalties[reason]
+
+    start_time = format_minutes(start)
+    event = {
+        "title": title or "Meeting",
+        "date": date.strftime('%Y-%m-%d'),
+        "startTime": start_time,
+        "endTime": format_minutes(end) if end is not None else add_one_hour(start_time),
+        "location": location,
+        "attendees": emails,
+        "description": ""
+    }
+    return PreParseResult(event, round(confidence, 3), sorted(set(reasons)))
+
+
+class PreParserStats:
+    """Counts primary-mode answers and shadow-mode agreement with the LLM"""
+
+    FIELDS = ('title', 'date', 'startTime', 'endTime', 'location', 'attendees')
+
+    def __init__(self):
+        self.attempts = 0
+        self.confident = 0
+        self.answered = 0
+        self.shadow_compared = 0
+        self.shadow_agreed = 0
+        self.shadow_confident_compared = 0
+        self.shadow_confident_agreed = 0
+        self.field_agreement = {field: 0 for field in self.FIELDS}
+
+    def record_shadow(self, parsed: PreParseResult, llm_result: dict, threshold: float):
+        """Compare a pre-parse with the LLM's answer; date and times must all match to agree"""
+        matches = {}
+        for field in self.FIELDS:
+            ours, theirs = parsed.event.get(field), llm_result.get(field)
+            if field in ('title', 'location'):
+                ours, theirs = (ours or '').strip().lower(), (theirs or '').strip().lower()
+            elif field == 'attendees':
+                ours, theirs = sorted(ours or []), sorted(theirs or [])
+            matches[field] = ours == theirs
+            if matches[field]:
+                self.field_agreement[field] += 1
+        agreed = matches['date'] and matches['startTime'] and matches['endTime']
+        self.shadow_compared += 1
+        self.shadow_agreed += agreed
+        if parsed.confidence >= threshold:
+            self.shadow_confident_compared += 1
+            self.shadow_confident_agreed += agreed
+        return agreed
+
+    def stats(self) -> dict:
+        def rate(part, whole):
+            return round(part / whole, 4) if whole else 0.0
+        return {
+            "attempts": self.attempts,
+            "confident": self.confident,
+            "answered": self.answered,
+            "shadow_compared": self.shadow_compared,
+            "shadow_agreement": rate(self.shadow_agreed, self.shadow_compared),
+            "shadow_confident_compared": self.shadow_confident_compared,
+            "shadow_confident_agreement": rate(self.shadow_confident_agreed, self.shadow_confident_compared),
+            "field_agreement": {f: rate(n, self.shadow_compared) for f, n in self.field_agreement.items()}
+        }
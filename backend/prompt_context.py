@@ -0,0 +1,103 @@
+"""
+Memoized per-(timezone, local date) prompt context.
+
+The extraction prompt only changes with the user's timezone and local date,
+so the reference dates, the formatted system prompts and their fingerprints
+(part of the extraction cache key) are built once per (timezone, date) and
+reused by every request on that day. Entries expire at
+the next local midnight of their timezone and are purged on the next miss;
+the LRU bound (PROMPT_CONTEXT_MAX_ENTRIES) caps memory when clients send
+many distinct timezones.
+"""
+import functools
+import os
+import time
+from collections import OrderedDict
+from datetime import date, datetime, timedelta
+from datetime import time as dt_time
+from typing import Callable, Dict, Optional
+
+import pytz
+
+
+@functools.lru_cache(maxsize=1024)
+def resolve_timezone(name: str):
+    """pytz timezone for an IANA name, or None if unknown (both answers are cached)"""
+    try:
+        return pytz.timezone(name)
+    except (pytz.UnknownTimeZoneError, AttributeError, ValueError):
+        return None
+
+
+class PromptContext:
+    """Everything the prompt and date handling need for one (timezone, local date)"""
+    __slots__ = ('tz', 'local_date', 'current_date', 'tomorrow_date', 'next_week_date', 'expires_at',
+                 'system_prompts', 'fingerprints')
+
+    def __init__(self, tz, local_date: date):
+        self.tz = tz
+        self.local_date = local_date
+        self.current_date = local_date.strftime('%Y-%m-%d')
+        self.tomorrow_date = (local_date + timedelta(days=1)).strftime('%Y-%m-%d')
+        self.next_week_date = (local_date + timedelta(weeks=1)).strftime('%Y-%m-%d')
+        # Next local midnight as a Unix timestamp; localize handles DST offsets
+        midnight = datetime.combine(local_date + timedelta(days=1), dt_time.min)
+        self.expires_at = tz.localize(midnight).timestamp()
+        self.system_prompts: Dict[bool, str] = {}
+        self.fingerprints: Dict[bool, str] = {}
+
+    def system_prompt(self, multi_event: bool = False) -> str:
+        return self.system_prompts[multi_event]
+
+    def prompt_fingerprint(self, multi_event: bool = False) -> str:
+        return self.fingerprints[multi_event]
+
+
+class PromptContextCache:
+    """LRU of PromptContext keyed on (zone, local date)"""
+
+    def __init__(self, render_prompt: Callable[[PromptContext, bool], str], max_entries: int = 512,
+                 fingerprint: Optional[Callable[[str, bool], str]] = None):
+        self.render_prompt = render_prompt
+        # fingerprint(prompt, multi_event) identifies a rendered prompt together with its schema
+        self.fingerprint = fingerprint
+        self.max_entries = max_entries
+        self._entries: 'OrderedDict[tuple, PromptContext]' = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, user_now: datetime) -> PromptContext:
+        """Context for an aware datetime already converted to the user's timezone"""
+        tz = user_now.tzinfo
+        zone = getattr(tz, 'zone', None) or str(tz)
+        key = (zone, user_now.date())
+        context = self._entries.get(key)
+        if context is not None:
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return context
+        self.misses += 1
+        self._purge_expired()
+        # user_now.tzinfo is a localized pytz offset; the zone object handles other dates
+        context = PromptContext(resolve_timezone(zone) or pytz.UTC, key[1])
+        for multi_event in (False, True):
+            context.system_prompts[multi_event] = self.render_prompt(context, multi_event)
+            if self.fingerprint is not None:
+                context.fingerprints[multi_event] = self.fingerprint(context.system_prompts[multi_event], multi_event)
+        self._entries[key] = context
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return context
+
+    def _purge_expired(self):
+        now = time.time()
+        for key in [key for key, context in self._entries.items() if context.expires_at <= now]:
+            del self._entries[key]
+
+    def stats(self) -> dict:
+        return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+def create_prompt_context_cache(render_prompt: Callable[[PromptContext, bool], str],
+                                fingerprint: Optional[Callable[[str, bool], str]] = None) -> PromptContextCache:
+    return PromptContextCache(render_prompt, int(os.getenv('PROMPT_CONTEXT_MAX_ENTRIES', '512')), fingerprint)
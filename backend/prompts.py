@@ -0,0 +1,193 @@
+"""
+System prompts and function schemas for event extraction.
+
+Two variants share the same output contract (createEvent / createEvents with
+identical properties and required fields):
+
+- standard: the original numbered rules and fully described schema.
+- compact: the same rules in terse form and a schema without prose
+  descriptions. The prompt and schema are sent as input tokens on every
+  call, so this trims time-to-first-token and cost.
+
+PROMPT_VARIANT selects the one the backend uses; benchmarks/prompt_eval.py
+compares their accuracy and token counts before switching.
+"""
+import os
+
+from prompt_context import PromptContext
+
+# Event schema for function calling
+CREATE_EVENT_FUNCTION = {
+    "name": "createEvent",
+    "description": "Extracts a calendar event from user text, resolving times and dates based on current date and timezone.",
+    "parameters": {
+        "type": "object",
+        "properties": {
+            "title": {
+                "type": "string",
+                "description": "The event title"
+            },
+            "date": {
+                "type": "string",
+                "description": "The date in YYYY-MM-DD format, resolved from the user's text using their current date and timezone"
+            },
+            "startTime": {
+                "type": "string",
+                "description": "Start time in 'HH:MM AM/PM' format with two-digit minutes (e.g., '10:00 AM', not '10 AM')"
+            },
+            "endTime": {
+                "type": "string",
+                "description": "End time in 'HH:MM AM/PM' format with two-digit minutes. If missing, should be 1 hour after startTime"
+            },
+            "location": {
+                "type": ["string", "null"],
+                "description": "Event location (virtual or physical), or null if not specified"
+            },
+            "attendees": {
+                "type": "array",
+                "items": {
+                    "type": "string",
+                    "format": "email"
+                },
+                "description": "List of email addresses mentioned in the text"
+            },
+            "description": {
+                "type": ["string", "null"],
+                "description": "A detailed description of the event extracted from the text, including purpose, agenda, or any other relevant details"
+            }
+        },
+        "required": ["title", "date", "startTime", "endTime", "location", "attendees", "description"]
+    }
+}
+
+COMPACT_CREATE_EVENT_FUNCTION = {
+    "name": "createEvent",
+    "description": "Calendar event from text.",
+    "parameters": {
+        "type": "object",
+        "properties": {
+            "title": {"type": "string"},
+            "date": {"type": "string", "description": "YYYY-MM-DD"},
+            "startTime": {"type": "string", "description": "HH:MM AM/PM"},
+            "endTime": {"type": "string", "description": "HH:MM AM/PM"},
+            "location": {"type": ["string", "null"]},
+            "attendees": {"type": "array", "items": {"type": "string"}, "description": "emails"},
+            "description": {"type": ["string", "null"]}
+        },
+        "required": CREATE_EVENT_FUNCTION["parameters"]["required"]
+    }
+}
+
+
+def events_function(event_function: dict, description: str, index_description: str) -> dict:
+    """Multi-event variant used to pack several short texts into one LLM call"""
+    return {
+        "name": "createEvents",
+        "description": description,
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "events": {
+                    "type": "array",
+                    "items": {
+                        "type": "object",
+                        "properties": {
+                            "index": {
+                                "type": "integer",
+                                "description": index_description
+                            },
+                            **event_function["parameters"]["properties"]
+                        },
+                        "required": ["index"] + event_function["parameters"]["required"]
+                    }
+                }
+            },
+            "required": ["events"]
+        }
+    }
+
+
+CREATE_EVENTS_FUNCTION = events_function(
+    CREATE_EVENT_FUNCTION,
+    "Extracts one calendar event from each numbered text, resolving times and dates based on current date and timezone.",
+    "The number of the text this event was extracted from"
+)
+COMPACT_CREATE_EVENTS_FUNCTION = events_function(
+    COMPACT_CREATE_EVENT_FUNCTION, "One calendar event per numbered text.", "text number"
+)
+
+
+def render_standard_prompt(context: PromptContext, multi_event: bool = False) -> str:
+    """Format the extraction system prompt for one (timezone, local date)"""
+    current_date = context.current_date
+    tomorrow_date = context.tomorrow_date
+    next_week_date = context.next_week_date
+
+    if multi_event:
+        instruction = ('The user message contains several numbered texts like "[0] ...". '
+                       'Call createEvents with one event per text, setting index to the text\'s number.')
+    else:
+        instruction = 'Call createEvent with the extracted details.'
+
+    return f'''Extract calendar event details from text.
+
+Current date: {current_date}
+Reference: "today" = {current_date}, "tomorrow" = {tomorrow_date}, "next week" = {next_week_date}
+
+RULES:
+1. DATES: If year not specified and date has passed this year, use next year.
+2. TIMES: Extract the time exactly as written. DO NOT convert timezones. Ignore timezone labels like (CET), (PT), etc.
+3. If multiple times mentioned, pick the first/primary one (ignore fallback times like "or we could do X").
+4. TITLE: Short (3-5 words), no dates/times in title.
+5. FORMAT: Times must be "HH:MM AM/PM" (e.g., "10:00 AM" not "10 AM"). Dates must be YYYY-MM-DD.
+6. END TIME: If not specified, set to 1 hour after start time.
+7. LOCATION: Use empty string "" if not specified.
+8. DESCRIPTION: Brief summary, not raw text.
+
+{instruction}'''
+
+
+def render_compact_prompt(context: PromptContext, multi_event: bool = False) -> str:
+    """Same rules as the standard prompt in roughly half the tokens"""
+    if multi_event:
+        instruction = 'Texts are numbered "[n] ...": call createEvents, one event per text with its index.'
+    else:
+        instruction = 'Call createEvent.'
+    return (f'Extract a calendar event. Today {context.current_date}, tomorrow {context.tomorrow_date}, '
+            f'next week {context.next_week_date}.\n'
+            '- Date without year already passed: next year.\n'
+            '- Copy times as written, no timezone conversion, ignore labels like (CET).\n'
+            '- Several times: the first/primary one.\n'
+            '- Title: 3-5 words, no date/time.\n'
+            '- Times "HH:MM AM/PM", dates YYYY-MM-DD.\n'
+            '- No end time: start + 1 hour. No location: "".\n'
+            '- Description: brief summary.\n'
+            f'{instruction}')
+
+
+class PromptVariant:
+    """A system prompt renderer with its single- and multi-event function schemas"""
+
+    def __init__(self, name: str, render, event_function: dict, events_function: dict):
+        self.name = name
+        self.render = render
+        self.event_function = event_function
+        self.events_function = events_function
+
+
+VARIANTS = {
+    'standard': PromptVariant('standard', render_standard_prompt, CREATE_EVENT_FUNCTION, CREATE_EVENTS_FUNCTION),
+    'compact': PromptVariant('compact', render_compact_prompt, COMPACT_CREATE_EVENT_FUNCTION,
+                             COMPACT_CREATE_EVENTS_FUNCTION),
+}
+
+
+def get_prompt_variant(name: str) -> PromptVariant:
+    variant = VARIANTS.get(name.lower())
+    if variant is None:
+        raise ValueError(f"Unknown PROMPT_VARIANT: {name}")
+    return variant
+
+
+def create_prompt_variant_from_env() -> PromptVariant:
+    return get_prompt_variant(os.getenv('PROMPT_VARIANT', 'standard'))
@@ -0,0 +1,267 @@
+"""
+Record/replay of extractions for offline regression checks.
+
+Recording (RECORD_PATH set): each process_text call appends one JSON line
+with its inputs (text, current_time, user_timezone), every upstream LLM
+response it used (model, function, arguments, seconds, usage, and a
+fingerprint of the system prompt and schema it was asked with) and its result
+or error. The losing call of a hedged pair is kept too, marked "hedge", so a
+recording shows the full upstream cost; replay skips it. Records go through a TraceQueue (tracing.py) with a file exporter, so
+the request path only enqueues; PII is redacted on the writer thread exactly
+as for traced runs, in the text, the recorded arguments and the result alike.
+RECORD_ANONYMIZE=false keeps raw text for corpora you own, and
+RECORD_SAMPLE_RATE records a fraction of extractions.
+
+Replay (benchmarks/replay.py): ReplayClient stands in for the AsyncOpenAI
+client and answers each chat.completions.create from the record being
+replayed, so process_text runs unchanged and deterministically (the record's
+current_time pins the dates). Calls are matched by function and model; a call
+the recording doesn't have raises ReplayMiss; a call answered from a response
+recorded for another prompt is counted, so prompt edits show up as stale
+answers. diff_results compares the replayed result with the recorded one
+field by field.
+"""
+import asyncio
+import contextlib
+import contextvars
+import functools
+import hashlib
+import inspect
+import json
+import os
+import random
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from types import SimpleNamespace
+from typing import Callable, Dict, Iterator, List, Optional
+
+from tracing import TraceQueue
+
+# Upstream calls of the extraction being recorded in this context
+_recording = contextvars.ContextVar('recording', default=None)
+# Record being replayed in this context
+_replaying = contextvars.ContextVar('replaying', default=None)
+
+# Result fields compared by diff_results
+COMPARED_FIELDS = ('title', 'date', 'startTime', 'endTime', 'location', 'attendees', 'description', 'error_code')
+
+
+def prompt_fingerprint(system_prompt: str, function: dict) -> str:
+    """Short hash of what a call asked: the system prompt and the function schema"""
+    raw = system_prompt + "\x1f" + json.dumps(function, sort_keys=True)
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()[:16]
+
+
+def note_upstream_call(model: str, function: dict, system_prompt: str, arguments: Optional[str], seconds: float,
+                       usage=None, hedge: bool = False):
+    """Add an upstream response to the extraction being recorded, if any; hedge marks one that went unused"""
+    calls = _recording.get()
+    if calls is not None:
+        call = {
+            "model": model, "function": function["name"], "prompt": prompt_fingerprint(system_prompt, function),
+            "arguments": arguments, "seconds": round(seconds, 4),
+            "usage": {"prompt_tokens": usage.prompt_tokens, "completion_tokens": usage.completion_tokens}
+            if getattr(usage, 'prompt_tokens', None) is not None else None
+        }
+        if hedge:
+            call["hedge"] = True
+        calls.append(call)
+
+
+class JSONLExporter:
+    """Append batches as JSON lines to a local file.
+
+    Each batch is one O_APPEND write, so workers sharing the file don't
+    interleave within a line.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def export(self, runs: list):
+        data = "".join(json.dumps(run, default=str) + "\n" for run in runs)
+        with self._lock, open(self.path, 'a', encoding='utf-8') as f:
+            f.write(data)
+
+
+class Recorder:
+    """Provides the @recorder.records decorator that feeds a TraceQueue; a no-op without one"""
+
+    def __init__(self, queue: Optional[TraceQueue], sample_rate: float = 1.0, tags: Optional[dict] = None):
+        self.queue = queue
+        self.sample_rate = sample_rate
+        self.tags = tags or {}
+
+    def records(self, *input_names: str):
+        """Record the named arguments, upstream calls and result of an async function"""
+        def decorator(fn):
+            if self.queue is None:
+                return fn
+            signature = inspect.signature(fn)
+
+            @functools.wraps(fn)
+            async def wrapper(*args, **kwargs):
+                if self.sample_rate < 1.0 and random.random() >= self.sample_rate:
+                    return await fn(*args, **kwargs)
+                bound = signature.bind(*args, **kwargs)
+                bound.apply_defaults()
+                inputs = {name: bound.arguments[name] for name in input_names}
+                calls = []
+                token = _recording.set(calls)
+                started = time.perf_counter()
+                outputs = {"upstream": calls}
+                try:
+                    outputs["result"] = await fn(*args, **kwargs)
+                    return outputs["result"]
+                except Exception as e:
+                    outputs["error"] = str(e)
+                    raise
+                finally:
+                    _recording.reset(token)
+                    self.queue.put({
+                        "id": uuid.uuid4().hex,
+                        "recorded_at": datetime.now(timezone.utc).isoformat(),
+                        "seconds": round(time.perf_counter() - started, 4),
+                        **self.tags,
+                        "inputs": inputs,
+                        "outputs": outputs
+                    })
+            return wrapper
+        return decorator
+
+    def flush(self):
+        if self.queue is not None:
+            self.queue.flush()
+
+    def stats(self) -> dict:
+        if self.queue is None:
+            return {"enabled": False}
+        return {"enabled": True, "sample_rate": self.sample_rate, **self.queue.stats()}
+
+
+def create_recorder_from_env(anonymizer_factory: Optional[Callable] = None, tags: Optional[dict] = None) -> Recorder:
+    """Recorder configured by RECORD_* env vars; records nothing unless RECORD_PATH is set"""
+    path = os.getenv('RECORD_PATH', '')
+    if not path:
+        return Recorder(None)
+    anonymize = os.getenv('RECORD_ANONYMIZE', 'true').lower() != 'false'
+    queue = TraceQueue(
+        JSONLExporter(path),
+        max_size=int(os.getenv('RECORD_QUEUE_SIZE', '1000')),
+        batch_size=int(os.getenv('RECORD_BATCH_SIZE', '20')),
+        flush_interval=float(os.getenv('RECORD_FLUSH_INTERVAL_SECONDS', '1')),
+        anonymizer_factory=anonymizer_factory if anonymize else None
+    )
+    return Recorder(queue, float(os.getenv('RECORD_SAMPLE_RATE', '1.0')), tags)
+
+
+def load_records(path: str) -> Iterator[dict]:
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+class ReplayMiss(LookupError):
+    """The code under replay made an upstream call the recording has no response for"""
+
+
+class ReplayState:
+    """The recorded upstream calls of one record, consumed as the replay asks for them"""
+
+    def __init__(self, record: dict):
+        # Unused hedge calls were never part of the extraction; replay runs without hedging
+        self.remaining = [call for call in record["outputs"].get("upstream") or [] if not call.get("hedge")]
+        self.used = []
+        self.answered = 0
+        self.model_changed = 0
+        self.prompt_changed = 0
+        self.missed = 0
+
+    def take(self, model: str, function_name: str, prompt: Optional[str] = None) -> Optional[dict]:
+        for same_model in (True, False):
+            for i, call in enumerate(self.remaining):
+                if call["function"] == function_name and (call["model"] == model or not same_model):
+                    self.answered += 1
+                    self.model_changed += not same_model
+                    # Recordings made before fingerprints were kept match any prompt
+                    self.prompt_changed += call.get("prompt", prompt) != prompt
+                    self.used.append(self.remaining.pop(i))
+                    return self.used[-1]
+        self.missed += 1
+        return None
+
+
+def completion_for(call: dict):
+    """A ChatCompletion-shaped object carrying a recorded function call"""
+    function_call = None
+    if call["arguments"] is not None:
+        function_call = SimpleNamespace(name=call["function"], arguments=call["arguments"])
+    message = SimpleNamespace(role="assistant", content=None, function_call=function_call)
+    usage = SimpleNamespace(**call["usage"]) if call.get("usage") else None
+    return SimpleNamespace(model=call["model"], usage=usage,
+                           choices=[SimpleNamespace(index=0, finish_reason="stop", message=message)])
+
+
+class ReplayClient:
+    """Stands in for AsyncOpenAI: chat.completions.create answers from the record being replayed.
+
+    With latency=True each answer waits the recorded upstream time, so end-to-end
+    timings are comparable with production; otherwise only local work is timed.
+    """
+
+    def __init__(self, latency: bool = False):
+        self.latency = latency
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    @contextlib.contextmanager
+    def replaying(self, record: dict):
+        state = ReplayState(record)
+        token = _replaying.set(state)
+        try:
+            yield state
+        finally:
+            _replaying.reset(token)
+
+    async def _create(self, model: str, function_call: dict, messages: list, functions: list, **kwargs):
+        state = _replaying.get()
+        if state is None:
+            raise ReplayMiss("Upstream call outside of a replayed record")
+        call = state.take(model, function_call["name"], prompt_fingerprint(messages[0]["content"], functions[0]))
+        if call is None:
+            raise ReplayMiss(f"No recorded {function_call['name']} response left for this record")
+        if self.latency:
+            await asyncio.sleep(call["seconds"])
+        return completion_for(call)
+
+
+def diff_results(expected: Optional[dict], actual: Optional[dict]) -> Dict[str, list]:
+    """Fields that differ between a recorded and a replayed result, as {field: [expected, actual]}.
+
+    A missing result (the call raised) is compared as an empty one, so a
+    result that became an error differs in every populated field.
+    """
+    expected, actual = expected or {}, actual or {}
+    return {
+        field: [expected.get(field), actual.get(field)]
+        for field in COMPARED_FIELDS
+        if expected.get(field) != actual.get(field)
+    }
+
+
+def summarize_stage_seconds(samples: List[Dict[str, float]], quantiles=(0.5, 0.95)) -> Dict[str, dict]:
+    """Per-stage mean and quantiles (ms) over per-record stage timings"""
+    stages = {}
+    for sample in samples:
+        for stage, seconds in sample.items():
+            stages.setdefault(stage, []).append(seconds)
+    summary = {}
+    for stage, values in sorted(stages.items()):
+        values.sort()
+        summary[stage] = {"mean_ms": round(sum(values) / len(values) * 1000, 3)}
+        for q in quantiles:
+            summary[stage][f"p{int(q * 100)}_ms"] = round(values[min(len(values) - 1, int(len(values) * q))] * 1000, 3)
+    return summary
@@ -0,0 +1,149 @@
+"""
+Per-request model routing with escalation.
+
+MODEL_TIERS lists the models from fastest/cheapest to strongest, e.g.
+"fast=gpt-4o-mini,strong=gpt-4o". Each request starts on the fast tier unless
+cheap features of the text say it needs judgment:
+
+- longer than ROUTER_FAST_MAX_CHARS
+- more than ROUTER_FAST_MAX_DATES date mentions
+- more than ROUTER_FAST_MAX_TIMES time mentions
+- several candidate times (prompt rule 3: "pick the first/primary one")
+
+in which case it goes to the strongest tier. When a tier's answer fails
+EventDetails validation or needs past-date correction, the request is retried
+on the next tier, up to the strongest (ROUTER_ESCALATE=false turns that off).
+
+With a single tier (the default, "default=gpt-3.5-turbo") routing and
+escalation are no-ops.
+"""
+import os
+from typing import List, Optional, Tuple
+
+from metrics import Counter, Histogram, registry
+from preparser import DATE_PATTERNS, HEDGE_WORDS, SINGLE_TIME, TIME_RANGES
+
+ROUTED_TOTAL = Counter(registry, 'model_routed_total', 'Requests routed to each model tier', label='tier')
+ESCALATIONS_TOTAL = Counter(registry, 'model_escalations_total', 'Escalations to a stronger tier by reason',
+                            label='reason')
+TIER_SECONDS = Histogram(registry, 'llm_call_seconds_by_tier', 'LLM call latency per model tier', label='tier')
+
+
+class ModelTier:
+    def __init__(self, name: str, model: str):
+        self.name = name
+        self.model = model
+
+    def __repr__(self):
+        return f"ModelTier({self.name}={self.model})"
+
+
+def parse_tiers(spec: str) -> List[ModelTier]:
+    """Parse 'fast=gpt-4o-mini,strong=gpt-4o' (fastest first); a bare model name is its own tier name"""
+    tiers = []
+    for part in (spec or '').split(','):
+        part = part.strip()
+        if not part:
+            continue
+        name, _, model = part.partition('=')
+        tiers.append(ModelTier(name.strip(), (model or name).strip()))
+    if not tiers:
+        raise ValueError("MODEL_TIERS must name at least one model")
+    return tiers
+
+
+def extract_features(text: str) -> dict:
+    """Cheap signals of how hard a text is; reuses the pre-parser's compiled patterns"""
+    date_mentions = sum(1 for _, pattern in DATE_PATTERNS for _ in pattern.finditer(text))
+    times = [match.start() for match in SINGLE_TIME.finditer(text)]
+    ranges = [match.span() for pattern in TIME_RANGES for match in pattern.finditer(text)]
+    # A range ("2-4pm", "2pm-4pm") is one candidate even though its ends match as times
+    candidates = len(ranges) + sum(1 for start in times if not any(s <= start < e for s, e in ranges))
+    return {
+        "length": len(text),
+        "date_mentions": date_mentions,
+        "time_mentions": len(times),
+        "multiple_times": candidates > 1 or (candidates > 0 and bool(HEDGE_WORDS.search(text)))
+    }
+
+
+class ModelRouter:
+    """Chooses a model tier per request and says where to escalate"""
+
+    def __init__(self, tiers: List[ModelTier], fast_max_chars: int = 500, fast_max_dates: int = 1,
+                 fast_max_times: int = 2, escalate: bool = True):
+        self.tiers = tiers
+        self.fast_max_chars = fast_max_chars
+        self.fast_max_dates = fast_max_dates
+        self.fast_max_times = fast_max_times
+        self.escalate = escalate
+        ROUTED_TOTAL.declare(*(tier.name for tier in tiers))
+        self._latency = {tier.name: TIER_SECONDS.labels(tier.name) for tier in tiers}
+
+    @property
+    def enabled(self) -> bool:
+        return len(self.tiers) > 1
+
+    def choose(self, text: str, decided: Optional[Tuple[int, dict]] = None) -> Tuple[int, dict]:
+        """(tier index, decision) for a text; decision holds the reason and features for traces.
+
+        decided is an earlier decide(text) for the same text, counted instead of deciding again.
+        """
+        index, decision = decided or self.decide(text)
+        ROUTED_TOTAL.inc(self.tiers[index].name)
+        return index, decision
+
+    def decide(self, text: str) -> Tuple[int, dict]:
+        """choose() without counting the decision, e.g. to know the model ahead of the call"""
+        if not self.enabled:
+            return 0, {"tier": self.tiers[0].name, "reason": "single_tier"}
+        strongest = len(self.tiers) - 1
+        # Long texts skip feature extraction: length alone decides
+        if len(text) > self.fast_max_chars:
+            index, decision = strongest, {"reason": "length", "length": len(text)}
+        else:
+            features = extract_features(text)
+            if features["multiple_times"]:
+                reason = "multiple_times"
+            elif features["date_mentions"] > self.fast_max_dates:
+                reason = "date_mentions"
+            elif features["time_mentions"] > self.fast_max_times:
+                reason = "time_mentions"
+            else:
+                reason = "simple"
+            index = 0 if reason == "simple" else strongest
+            decision = {"reason": reason, **features}
+        decision["tier"] = self.tiers[index].name
+        return index, decision
+
+    def next_tier(self, index: int) -> Optional[int]:
+        if not self.escalate or index + 1 >= len(self.tiers):
+            return None
+        return index + 1
+
+    def record_escalation(self, reason: str):
+        ESCALATIONS_TOTAL.inc(reason)
+
+    def observe_latency(self, index: int, seconds: float):
+        self._latency[self.tiers[index].name].observe(seconds)
+
+    def stats(self) -> dict:
+        return {
+            "tiers": {tier.name: tier.model for tier in self.tiers},
+            "routed": dict(ROUTED_TOTAL.values),
+            "escalations": dict(ESCALATIONS_TOTAL.values),
+            "latency_seconds": {
+                name: {"count": child.count, "mean": round(child.sum / child.count, 4) if child.count else None}
+                for name, child in self._latency.items()
+            }
+        }
+
+
+def create_router_from_env() -> ModelRouter:
+    return ModelRouter(
+        parse_tiers(os.getenv('MODEL_TIERS', 'default=gpt-3.5-turbo')),
+        fast_max_chars=int(os.getenv('ROUTER_FAST_MAX_CHARS', '500')),
+        fast_max_dates=int(os.getenv('ROUTER_FAST_MAX_DATES', '1')),
+        fast_max_times=int(os.getenv('ROUTER_FAST_MAX_TIMES', '2')),
+        escalate=os.getenv('ROUTER_ESCALATE', 'true').lower() != 'false'
+    )
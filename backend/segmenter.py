@@ -0,0 +1,137 @@
+"""
+Cheap segmentation of long selections into candidate event spans.
+
+A conference schedule or a thread listing several sessions holds one event
+per time mention. segment_text splits such text into spans, each extracted as
+its own single event, using the pre-parser's date and time patterns instead of
+an LLM call:
+
+- Text is split into lines, and lines mentioning several times into sentences.
+- A line with a time starts a new span, unless it reads as a continuation of
+  the previous one ("ends at 5pm", "or 4pm instead").
+- A short line with a date but no time ("Tuesday, March 11") is a header. It
+  is prepended to the spans under it that don't name their own date.
+- Lines before the first header or span (a heading, the venue) are
+  prepended to every span as shared context, up to PREAMBLE_MAX_CHARS.
+- Other lines belong to the span above them.
+
+Text with fewer than two spans comes back whole. dedupe_events merges the
+extracted events that describe the same session.
+"""
+import re
+from typing import List, Tuple
+
+from preparser import DATE_PATTERNS, SINGLE_TIME, TIME_RANGES
+
+HEADER_MAX_CHARS = 60
+PREAMBLE_MAX_CHARS = 240
+
+SENTENCE_BREAK = re.compile(r'(?<=[.!?;])\s+')
+# A time in a line starting like this belongs to the span above it
+CONTINUATION = re.compile(
+    r'^\W*(?:end(?:s|ing)?|until|till|to|finish\w*|wrap\w*|or|if|otherwise|alternatively|instead|fallback|backup)\b',
+    re.I
+)
+# Every time pattern needs one of these; lines without any skip the full patterns
+TIME_HINT = re.compile(r'\d|noon|midnight', re.I)
+CLOCK_SIGNAL = re.compile(r':|[ap]\.?m\b|noon|midnight', re.I)
+TITLE_WORD = re.compile(r'[a-z0-9]+')
+
+
+def count_times(text: str) -> int:
+    """Number of clock times mentioned, counting a range once"""
+    if not TIME_HINT.search(text):
+        return 0
+    count, spans = 0, []
+    for pattern in TIME_RANGES:
+        for match in pattern.finditer(text):
+            # Same clock signal the pre-parser requires, so "2-3 people" isn't a time
+            if CLOCK_SIGNAL.search(match.group(0)):
+                spans.append((match.start(), match.end()))
+                count += 1
+    for match in SINGLE_TIME.finditer(text):
+        if not any(s <= match.start() < e for s, e in spans):
+            count += 1
+    return count
+
+
+def has_date(text: str) -> bool:
+    return any(pattern.search(text) for _, pattern in DATE_PATTERNS)
+
+
+def _units(text: str) -> List[Tuple[str, int]]:
+    """Lines, or sentences of lines with several times, each with its count_times"""
+    units = []
+    for line in text.splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        times = count_times(line)
+        if times > 1:
+            units.extend((part, count_times(part)) for part in SENTENCE_BREAK.split(line) if part)
+        else:
+            units.append((line, times))
+    return units
+
+
+def segment_text(text: str) -> List[str]:
+    """Split text into one span per candidate event; returns [text] when there is at most one"""
+    preamble, header = [], None
+    spans = []  # [context lines, span lines]
+    for unit, times in _units(text):
+        if times and spans and CONTINUATION.match(unit):
+            spans[-1][1].append(unit)
+        elif times:
+            context = [header] if header and not has_date(unit) else []
+            spans.append([context, [unit]])
+        elif len(unit) <= HEADER_MAX_CHARS and has_date(unit):
+            header = unit
+        elif spans:
+            spans[-1][1].append(unit)
+        else:
+            preamble.append(unit)
+
+    if len(spans) < 2:
+        return [text]
+    shared = " ".join(preamble)[:PREAMBLE_MAX_CHARS]
+    return ["\n".join(([shared] if shared else []) + context + lines) for context, lines in spans]
+
+
+def _title_words(event: dict) -> set:
+    return set(TITLE_WORD.findall((event.get('title') or '').lower()))
+
+
+def same_event(a: dict, b: dict) -> bool:
+    """Same date and start time, and titles sharing at least half their words"""
+    if a.get('date') != b.get('date') or a.get('startTime') != b.get('startTime'):
+        return False
+    words_a, words_b = _title_words(a), _title_words(b)
+    if not words_a or not words_b:
+        return True
+    return len(words_a & words_b) / len(words_a | words_b) >= 0.5 or words_a <= words_b or words_b <= words_a
+
+
+def dedupe_events(events: List[dict]) -> List[dict]:
+    """Drop results without an event and merge duplicates, keeping the first in text order.
+
+    A clean extraction replaces a duplicate that carries an error code; the
+    merged event keeps every attendee and the longer description.
+    """
+    kept = []
+    for event in events:
+        if not event.get('title') or not event.get('date'):
+            continue
+        for i, other in enumerate(kept):
+            if not same_event(other, event):
+                continue
+            if other.get('error_code') and not event.get('error_code'):
+                other, event = event, other
+            merged = dict(other)
+            merged['attendees'] = list(dict.fromkeys((other.get('attendees') or []) + (event.get('attendees') or [])))
+            if len(event.get('description') or '') > len(other.get('description') or ''):
+                merged['description'] = event['description']
+            kept[i] = merged
+            break
+        else:
+            kept.append(event)
+    return kept
@@ -0,0 +1,51 @@
+"""
+Process launcher and gunicorn worker for the production serving profile.
+
+gunicorn.conf.py holds the settings (workers, preload, keep-alive, backlog,
+graceful timeout). This module provides the uvicorn worker it runs:
+
+- SERVER_LOOP (auto|uvloop|asyncio) and SERVER_HTTP (auto|httptools|h11)
+  pick the event loop and HTTP parser. 'auto' uses uvloop and httptools when
+  they are installed (pip install uvloop httptools) and the pure-Python ones
+  otherwise.
+- On SIGTERM uvicorn stops accepting, waits for open requests for part of
+  gunicorn's graceful_timeout, then runs the app's lifespan shutdown, which
+  drains in-flight extractions (SHUTDOWN_DRAIN_SECONDS) and flushes traces
+  and logs. The rest of graceful_timeout is left for that, so gunicorn
+  doesn't SIGKILL a worker mid-drain.
+
+python main.py runs gunicorn with gunicorn.conf.py; SERVER_RELOAD=true runs a
+single auto-reloading uvicorn instead, for development.
+"""
+import os
+import sys
+
+from uvicorn.workers import UvicornWorker
+
+# Share of graceful_timeout for open requests; the rest is for the lifespan drain
+REQUEST_DRAIN_SHARE = 0.6
+
+
+class ServingWorker(UvicornWorker):
+    CONFIG_KWARGS = {
+        "loop": os.getenv('SERVER_LOOP', 'auto'),
+        "http": os.getenv('SERVER_HTTP', 'auto'),
+    }
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # UvicornWorker leaves this unset, so uvicorn would wait on open requests indefinitely
+        self.config.timeout_graceful_shutdown = int(self.cfg.graceful_timeout * REQUEST_DRAIN_SHARE)
+
+
+def run():
+    backend_dir = os.path.dirname(os.path.abspath(__file__))
+    if os.getenv('SERVER_RELOAD', 'false').lower() == 'true':
+        import uvicorn
+        uvicorn.run("main:app", host="0.0.0.0", port=int(os.getenv("PORT", 8000)), reload=True,
+                    app_dir=backend_dir)
+        return
+    from gunicorn.app.wsgiapp import run as gunicorn_run
+    os.chdir(backend_dir)
+    sys.argv = ["gunicorn", "-c", os.path.join(backend_dir, "gunicorn.conf.py"), "main:app"]
+    gunicorn_run()
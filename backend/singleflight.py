@@ -0,0 +1,56 @@
+"""
+Single-flight coalescing of identical concurrent extractions.
+
+When a team-wide invite goes out, many identical /process_event bodies arrive
+at once. The first caller for a key runs the extraction; everyone else who
+arrives while it is in flight awaits the same task and gets its result (or
+its exception).
+"""
+import asyncio
+import copy
+from typing import Awaitable, Callable, Dict
+
+
+class SingleFlight:
+    """Share one in-flight coroutine per key between concurrent callers"""
+
+    def __init__(self):
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self.leaders = 0
+        self.coalesced = 0
+
+    async def do(self, key: str, fn: Callable[[], Awaitable]):
+        task = self._inflight.get(key)
+        if task is not None:
+            self.coalesced += 1
+            # Followers get their own copy so nobody mutates a shared result
+            result = await asyncio.shield(task)
+            return copy.deepcopy(result)
+
+        self.leaders += 1
+        task = asyncio.ensure_future(fn())
+        self._inflight[key] = task
+        task.add_done_callback(lambda t: self._finish(key, t))
+        # Shielded so a disconnecting leader doesn't cancel the call for its followers
+        return await asyncio.shield(task)
+
+    def _finish(self, key: str, task: asyncio.Task):
+        self._inflight.pop(key, None)
+        # Mark the exception retrieved in case every waiter was cancelled
+        if not task.cancelled():
+            task.exception()
+
+    async def drain(self, timeout: float) -> int:
+        """Wait up to timeout seconds for in-flight extractions; returns how many were still running"""
+        tasks = list(self._inflight.values())
+        if not tasks:
+            return 0
+        _, pending = await asyncio.wait(tasks, timeout=timeout)
+        return len(pending)
+
+    def stats(self) -> dict:
+        return {
+            "in_flight": len(self._inflight),
+            "leaders": self.leaders,
+            "coalesced": self.coalesced
+        }
@@ -0,0 +1,9 @@
+import os
+import sys
+
+# Backend modules are imported by name, as main.py does
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# main reads its configuration at import: mock mode (no upstream calls) and no trace export
+os.environ["OPENAI_API_KEY"] = ""
+os.environ["LANGSMITH_TRACING"] = "false"
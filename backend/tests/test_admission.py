@@ -0,0 +1,136 @@
+import asyncio
+
+import pytest
+
+from admission import (AdmissionController, AdmissionRejected, InMemoryBucketStore, SQLiteBucketStore,
+                       TokenBucketLimiter, client_key, create_rate_limiter_from_env)
+
+INSTALL_ID = "0f8fad5b-d9cb-469f-a165-70867728950e"
+
+
+def test_client_key_combines_ip_and_install_id():
+    assert client_key({"x-install-id": INSTALL_ID}, "10.0.0.1") == f"ip:10.0.0.1|install:{INSTALL_ID}"
+    # Not an install ID the extension would send
+    assert client_key({"x-install-id": "a b"}, "10.0.0.1") == "ip:10.0.0.1"
+
+
+def test_client_key_reads_forwarded_for_from_the_right():
+    headers = {"x-forwarded-for": "6.6.6.6, 1.2.3.4"}
+    assert client_key(headers, "10.0.0.1", proxy_hops=1) == "ip:1.2.3.4"
+    assert client_key(headers, "10.0.0.1", proxy_hops=0) == "ip:10.0.0.1"
+    # Fewer entries than proxies: the header was not written by them
+    assert client_key({}, "10.0.0.1", proxy_hops=1) == "ip:10.0.0.1"
+
+
+@pytest.mark.parametrize("make_store", [InMemoryBucketStore, lambda: SQLiteBucketStore(":memory:")])
+def test_bucket_refills_up_to_burst(make_store):
+    store = make_store()
+    assert [store.take("a", 1, rate=1.0, burst=3, now=100.0) for _ in range(4)] == [True, True, True, False]
+    # Other clients have their own bucket
+    assert store.take("b", 1, rate=1.0, burst=3, now=100.0)
+    assert store.take("a", 1, rate=1.0, burst=3, now=101.0)
+    assert not store.take("a", 1, rate=1.0, burst=3, now=101.0)
+    assert [store.take("a", 1, rate=1.0, burst=3, now=200.0) for _ in range(4)] == [True, True, True, False]
+
+
+def test_in_memory_store_forgets_least_recent_clients():
+    store = InMemoryBucketStore(max_clients=2)
+    for key in ("a", "b", "a", "c"):
+        store.take(key, 1, rate=1.0, burst=3, now=0.0)
+    assert len(store) == 2
+    # "b" was forgotten, so it starts again with a full bucket
+    assert [store.take("b", 1, rate=0.0, burst=3, now=0.0) for _ in range(4)] == [True, True, True, False]
+
+
+def test_sqlite_buckets_are_shared_between_stores(tmp_path):
+    path = str(tmp_path / "buckets.sqlite3")
+    first, second = SQLiteBucketStore(path), SQLiteBucketStore(path)
+    assert first.take("a", 2, rate=0.0, burst=3, now=0.0)
+    assert not second.take("a", 2, rate=0.0, burst=3, now=0.0)
+
+
+@pytest.mark.parametrize("make_store", [InMemoryBucketStore, lambda: SQLiteBucketStore(":memory:")])
+def test_limiter_check_raises_when_over_rate(make_store):
+    limiter = TokenBucketLimiter(make_store(), rate_per_second=0.0, burst=2)
+
+    async def run():
+        await limiter.check("a")
+        await limiter.check("a")
+        with pytest.raises(AdmissionRejected):
+            await limiter.check("a")
+
+    asyncio.run(run())
+    assert (limiter.allowed, limiter.limited) == (2, 1)
+
+
+def test_rotating_install_ids_from_one_ip_are_still_limited():
+    limiter = TokenBucketLimiter(InMemoryBucketStore(), rate_per_second=0.0, burst=2, ip_factor=3)
+
+    async def run():
+        return [await limiter.allow(client_key({"x-install-id": f"install-{n:04d}"}, "10.0.0.1"))
+                for n in range(10)]
+
+    # Each new ID has a full bucket of its own, but the IP's install bucket holds 2 x 3
+    assert asyncio.run(run()) == [True] * 6 + [False] * 4
+    # Another IP is unaffected
+    assert asyncio.run(limiter.allow(client_key({"x-install-id": INSTALL_ID}, "10.0.0.2")))
+
+
+def test_rate_limiter_is_off_by_default_and_needs_proxy_hops(monkeypatch):
+    monkeypatch.delenv("RATE_LIMIT_BACKEND", raising=False)
+    monkeypatch.delenv("RATE_LIMIT_PROXY_HOPS", raising=False)
+    assert create_rate_limiter_from_env() is None
+    monkeypatch.setenv("RATE_LIMIT_BACKEND", "memory")
+    with pytest.raises(ValueError):
+        create_rate_limiter_from_env()
+    monkeypatch.setenv("RATE_LIMIT_PROXY_HOPS", "1")
+    assert isinstance(create_rate_limiter_from_env().store, InMemoryBucketStore)
+    monkeypatch.setenv("RATE_LIMIT_BACKEND", "redis")
+    with pytest.raises(ValueError):
+        create_rate_limiter_from_env()
+
+
+def test_admission_queues_fifo_and_sheds_when_full():
+    controller = AdmissionController(max_outstanding=1, max_queue=2, max_wait_seconds=5)
+    order = []
+
+    async def call(name: str, hold: asyncio.Event):
+        async with controller.slot():
+            order.append(name)
+            await hold.wait()
+
+    async def run():
+        release = asyncio.Event()
+        tasks = [asyncio.ensure_future(call(name, release)) for name in ("first", "second", "third")]
+        await asyncio.sleep(0)
+        assert controller.stats()["queue_depth"] == 2
+        with pytest.raises(AdmissionRejected) as rejected:
+            await controller.acquire()
+        assert rejected.value.reason == "queue_full"
+        release.set()
+        await asyncio.gather(*tasks)
+
+    asyncio.run(run())
+    assert order == ["first", "second", "third"]
+    assert controller.outstanding == 0
+    assert controller.counters["shed_queue_full"] == 1
+
+
+def test_admission_sheds_waiters_past_the_deadline():
+    controller = AdmissionController(max_outstanding=1, max_queue=10, max_wait_seconds=0.05)
+
+    async def run():
+        await controller.acquire()
+        with pytest.raises(AdmissionRejected) as rejected:
+            await controller.acquire()
+        assert rejected.value.reason == "timeout"
+        # Slots held ~1 s on average: a waiter would now expect to miss its deadline
+        controller.release(held_seconds=1.0)
+        await controller.acquire()
+        with pytest.raises(AdmissionRejected) as rejected:
+            await controller.acquire()
+        assert rejected.value.reason == "deadline"
+
+    asyncio.run(run())
+    assert controller.counters["shed_timeout"] == 1
+    assert controller.counters["shed_deadline"] == 1
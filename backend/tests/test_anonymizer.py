@@ -0,0 +1,112 @@
+"""
+Differential check of the single-pass anonymizer against the original rules.
+
+redact must match PII_RULES applied one after another (what langsmith's
+create_anonymizer(PII_RULES) did) on a corpus of event texts and on randomly
+assembled ones. The only allowed differences are inputs where the old address
+rule matched a span the bounded one does not (a suffix inside a word, or more
+than MAX_ADDRESS_WORDS words); INTENDED_CHANGES pins the new output for a few.
+"""
+import random
+import re
+
+import pytest
+
+import anonymizer
+from anonymizer import PII_RULES, anonymize, redact
+
+COMPILED_RULES = [(re.compile(rule["pattern"]), rule["replace"]) for rule in PII_RULES]
+OLD_ADDRESS = COMPILED_RULES[3][0]
+BOUNDED_ADDRESS = re.compile(anonymizer._ADDRESS)
+
+CORPUS = [
+    "Lunch with Sam tomorrow at 12:30 PM at Cafe Luna",
+    "Team standup 10-10:30am Monday in Room 4 with bob@example.com",
+    "Call Anna Lee at 555-123-4567 or (555) 987-6543 about the offsite",
+    "Reach me on +1 555.222.3333, ssn 123-45-6789, card 4111 1111 1111 1111",
+    "Card 4111-1111-1111-1111 exp 12/30, backup 5555555555554444",
+    "Dinner at 350 5th Ave with jane.doe@example.com at 7pm",
+    "Offsite at 1600 Amphitheatre Parkway, Mountain View",
+    "Meet at 221 Baker Street at 3pm",
+    "Party at 42 oak Street on Saturday",
+    "Visit 10 Downing St tomorrow",
+    "Email John Smith@example.com before the 1:1",
+    "Interview with Dr Jones on Monday 9-10am at 12 elm Road",
+    "Quarterly review March 5 from 2 to 3:30pm at The Hub",
+    "Call 1 555-123-4567@example.com is not a phone",
+    "Ticket 1234 5678 9012 3456 7890 is not a card",
+    "Order 12 555 123 4567 8901 arrives Friday",
+    "Zoom id 123 456 7890 passcode 4455",
+    "Pickup at 9 from 77 north Lane then drinks",
+    "",
+]
+
+# Inputs where the bounded address rule deliberately differs from the old one
+INTENDED_CHANGES = {
+    # Old: suffix matched inside a word
+    "Sync at 3 with the team about Strategy": "Sync at 3 with the team about Strategy",
+    "Standup at 9 in the Studio": "Standup at 9 in the Studio",
+    # Old: one match from the first number to the last suffix in the run
+    "Lunch at 1 with the whole team then a walk to 350 5th Ave":
+        "Lunch at 1 with the whole team then a walk to [ADDRESS_REDACTED]",
+}
+
+FRAGMENTS = [
+    "lunch", "meeting", "tomorrow", "at", "in", "with", "on", "the", "room", "pm", "am",
+    "Anna", "Bob", "Lee", "Carla", "Marsh", "Kim", "Office", "Team", "Friday", "March",
+    "3", "10", "12", "2030", "7pm", "10:30", "5th", "1st",
+    "bob@example.com", "jane.doe@mail.example.org", "x_y+tag@corp.io",
+    "555-123-4567", "(555) 987-6543", "+1 555.222.3333", "5551234567",
+    "4111 1111 1111 1111", "4111-1111-1111-1111", "5555555555554444", "1234 5678 9012 345",
+    "123-45-6789", "987-65-4321",
+    "12 oak Street", "350 5th Ave", "9 elm Rd", "77 north Lane", "1 main Blvd",
+]
+SEPARATORS = [" ", " ", " ", ", ", ". ", "; ", " - ", "\n"]
+FUZZ_CASES = 3000
+
+
+def redact_sequential(text: str) -> str:
+    """The original behaviour: each rule rewrites the output of the previous one"""
+    for pattern, replace in COMPILED_RULES:
+        text = pattern.sub(replace, text)
+    return text
+
+
+def uses_unbounded_address(text: str) -> bool:
+    """True if the old address rule matches a span the bounded rule would not"""
+    for pattern, replace in COMPILED_RULES[:3]:
+        text = pattern.sub(replace, text)
+    return any(not BOUNDED_ADDRESS.fullmatch(m.group()) for m in OLD_ADDRESS.finditer(text))
+
+
+def random_text(rng: random.Random) -> str:
+    parts = []
+    for _ in range(rng.randint(1, 12)):
+        parts.append(rng.choice(FRAGMENTS))
+        parts.append(rng.choice(SEPARATORS))
+    return "".join(parts[:-1])
+
+
+@pytest.mark.parametrize("text", CORPUS)
+def test_matches_sequential_rules_on_corpus(text):
+    assert redact(text) == redact_sequential(text)
+
+
+def test_matches_sequential_rules_on_random_texts():
+    rng = random.Random(0)
+    mismatches = []
+    for text in (random_text(rng) for _ in range(FUZZ_CASES)):
+        old, new = redact_sequential(text), redact(text)
+        if old != new and not uses_unbounded_address(text):
+            mismatches.append((text, old, new))
+    assert mismatches[:5] == []
+
+
+@pytest.mark.parametrize("text, expected", INTENDED_CHANGES.items())
+def test_intended_address_changes(text, expected):
+    assert redact(text) == expected
+
+
+def test_anonymize_walks_nested_values():
+    run = {"inputs": {"text": "Call 555-123-4567", "tags": ["bob@example.com", 3]}, "ok": True}
+    assert anonymize(run) == {"inputs": {"text": "Call [PHONE_REDACTED]", "tags": ["[EMAIL_REDACTED]", 3]}, "ok": True}
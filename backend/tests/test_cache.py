@@ -0,0 +1,28 @@
+import asyncio
+
+from cache import ExtractionCache, InMemoryCacheBackend, SQLiteCacheBackend, make_cache_key
+
+
+def test_key_ignores_whitespace():
+    assert make_cache_key("Lunch  at\nnoon", "UTC", "2024-03-11", "p", "m") == \
+        make_cache_key("Lunch at noon", "UTC", "2024-03-11", "p", "m")
+
+
+def test_key_changes_with_prompt_and_model():
+    key = make_cache_key("Lunch at noon", "UTC", "2024-03-11", "p", "m")
+    assert make_cache_key("Lunch at noon", "UTC", "2024-03-11", "p2", "m") != key
+    assert make_cache_key("Lunch at noon", "UTC", "2024-03-11", "p", "m2") != key
+    assert make_cache_key("Lunch at noon", "UTC", "2024-03-12", "p", "m") != key
+
+
+def test_round_trip_on_both_backends(tmp_path):
+    for backend in (InMemoryCacheBackend(), SQLiteCacheBackend(str(tmp_path / "cache.sqlite3"))):
+        cache = ExtractionCache(backend)
+
+        async def run():
+            assert await cache.get("k") is None
+            await cache.set("k", {"title": "Lunch"})
+            return await cache.get("k")
+
+        assert asyncio.run(run()) == {"title": "Lunch"}
+        assert (cache.hits, cache.misses) == (1, 1)
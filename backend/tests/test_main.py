@@ -0,0 +1,173 @@
+import asyncio
+import json
+import re
+from datetime import date, datetime, timedelta, timezone
+from types import SimpleNamespace
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from recorder import completion_for
+
+NOW = datetime.now(timezone.utc).isoformat()
+EVENT_DATE = (date.today() + timedelta(days=7)).isoformat()
+
+
+def event_for(text: str) -> dict:
+    return {"title": text, "date": EVENT_DATE, "startTime": "10:00 AM", "endTime": "11:00 AM",
+            "location": None, "attendees": [], "description": None}
+
+
+class StubLLM:
+    """Stands in for AsyncOpenAI: answers each text with an event titled after it"""
+
+    def __init__(self):
+        self.calls = []
+        self.delay = 0.0
+        # Texts answered without a function call
+        self.no_event = set()
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    async def create(self, model: str, messages: list, function_call: dict, stream: bool = False, **kwargs):
+        name, text = function_call["name"], messages[1]["content"]
+        self.calls.append((name, text))
+        await asyncio.sleep(self.delay)
+        if text in self.no_event:
+            return completion_for({"model": model, "function": name, "arguments": None})
+        if name == "createEvents":
+            arguments = {"events": [dict(event_for(item), index=int(index))
+                                    for index, item in re.findall(r"^\[(\d+)\] (.*)$", text, re.M)]}
+        else:
+            arguments = event_for(text)
+        if stream:
+            return self.stream(json.dumps(arguments))
+        return completion_for({"model": model, "function": name, "arguments": json.dumps(arguments)})
+
+    @staticmethod
+    async def stream(arguments: str):
+        for start in range(0, len(arguments), 7):
+            delta = SimpleNamespace(function_call=SimpleNamespace(arguments=arguments[start:start + 7]))
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=delta)])
+
+
+@pytest.fixture(scope="module")
+def client():
+    return TestClient(main.app)
+
+
+@pytest.fixture
+def llm(monkeypatch):
+    stub = StubLLM()
+    monkeypatch.setattr(main, "client", stub)
+    return stub
+
+
+@pytest.mark.parametrize("body", [{"text": None}, {}, {"text": "   "}])
+def test_missing_text_is_too_short(client, body):
+    response = client.post("/process_event", json=body)
+    assert response.json()["error_code"] == "TEXT_TOO_SHORT"
+
+
+def test_null_timezone_means_utc():
+    body = main.ProcessEventRequest.model_validate({"text": "Lunch tomorrow at noon", "user_timezone": None})
+    assert body.user_timezone == "UTC"
+
+
+def test_wrongly_typed_text_is_rejected(client):
+    response = client.post("/process_event", json={"text": 5})
+    assert response.status_code == 200
+    assert response.json()["error_code"] == "UNKNOWN_ERROR"
+
+
+def test_leader_result_is_cached_after_its_client_leaves(monkeypatch):
+    started, release = asyncio.Event(), asyncio.Event()
+
+    async def process_text(text, *args):
+        started.set()
+        await release.wait()
+        return {"title": text}
+
+    monkeypatch.setattr(main, "process_text", process_text)
+    args = ("Leader leaves before the extraction ends", NOW, "UTC", False, "ip:test")
+
+    async def run():
+        leader = asyncio.ensure_future(main.extract_event(*args))
+        await started.wait()
+        leader.cancel()
+        release.set()
+        await main.inflight_extractions.drain(1)
+        return await main.extract_event(*args)
+
+    assert asyncio.run(run()) == ({"title": args[0]}, "HIT")
+
+
+def test_batch_extracts_each_item_and_rejects_invalid_ones(client, llm):
+    items = [{"text": "Batch planning sync", "current_time": NOW}, {"text": 5},
+             {"text": "Batch retro with the team", "current_time": NOW}]
+    results = client.post("/process_events", json={"items": items}).json()["results"]
+    assert [result.get("title") for result in results] == ["Batch planning sync", None, "Batch retro with the team"]
+    assert results[1]["error_code"] == "UNKNOWN_ERROR"
+    assert sorted(llm.calls) == [("createEvent", "Batch planning sync"), ("createEvent", "Batch retro with the team")]
+
+
+def test_pack_extracts_short_texts_in_one_call_and_caches_them(client, llm):
+    texts = [f"Packed standup number {n}" for n in range(3)]
+    body = {"items": [{"text": text, "current_time": NOW, "user_timezone": "Europe/Berlin"} for text in texts],
+            "pack": True}
+    results = client.post("/process_events", json=body).json()["results"]
+    assert [result["title"] for result in results] == texts
+    assert [name for name, _ in llm.calls] == ["createEvents"]
+    # Served from the cache under the packed prompt's key
+    assert client.post("/process_events", json=body).json()["results"] == results
+    assert len(llm.calls) == 1
+    # but not for a single extraction, which uses another prompt
+    response = client.post("/process_event", json=body["items"][0])
+    assert response.headers["X-Cache"] == "MISS" and llm.calls[-1] == ("createEvent", texts[0])
+
+
+def sse_frames(body: str) -> list:
+    frames = []
+    for frame in body.strip().split("\n\n"):
+        event, data = frame.split("\n", 1)
+        frames.append((event[len("event: "):], json.loads(data[len("data: "):])))
+    return frames
+
+
+def test_stream_sends_fields_then_the_result(client, llm):
+    body = {"text": "Streamed design review", "current_time": NOW}
+    frames = sse_frames(client.post("/process_event/stream", json=body).text)
+    assert frames[0] == ("field", {"field": "title", "value": "Streamed design review"})
+    assert [event for event, _ in frames[1:-1]] == ["field"] * (len(frames) - 2)
+    assert frames[-1][0] == "result" and frames[-1][1]["title"] == "Streamed design review"
+    # A cached result has nothing to stream
+    assert sse_frames(client.post("/process_event/stream", json=body).text) == [frames[-1]]
+    assert len(llm.calls) == 1
+
+
+def test_multi_extracts_each_span_and_reports_failed_ones(client, llm):
+    spans = ["Standup on Monday at 9am in Room 1", "Design review on Tuesday at 3pm in Room 2",
+             "Lunch on Friday at 12pm"]
+    llm.no_event.add(spans[1])
+    response = client.post("/process_event/multi", json={"text": "\n".join(spans), "current_time": NOW}).json()
+    assert response["segments"] == 3 and response["skipped_segments"] == 0
+    assert [event["title"] for event in response["events"]] == [spans[0], spans[2]]
+    assert [(failed["index"], failed["text"]) for failed in response["failed_segments"]] == [(1, spans[1])]
+    assert response["failed_segments"][0]["error_code"]
+
+
+def test_identical_concurrent_requests_share_one_call_then_hit_the_cache(llm):
+    llm.delay = 0.05
+    body = {"text": "Coalesced all-hands meeting", "current_time": NOW}
+
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=main.app), base_url="http://app") as http:
+            responses = await asyncio.gather(*(http.post("/process_event", json=body) for _ in range(5)))
+            return responses, await http.post("/process_event", json=body)
+
+    responses, repeat = asyncio.run(run())
+    assert llm.calls == [("createEvent", body["text"])]
+    assert all(response.json()["title"] == body["text"] for response in responses)
+    assert {response.headers["X-Cache"] for response in responses} == {"MISS"}
+    assert repeat.headers["X-Cache"] == "HIT" and repeat.json() == responses[0].json()
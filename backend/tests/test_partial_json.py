@@ -0,0 +1,43 @@
+import json
+
+from partial_json import PartialObjectParser
+
+ARGUMENTS = json.dumps({
+    "title": "Sync \"Q3\", part 2",
+    "date": "2030-10-17",
+    "attendees": ["a@example.com", "b@example.com"],
+    "location": None,
+    "details": {"room": "4", "floor": 2},
+    "priority": 3
+})
+
+
+def feed_all(chunks):
+    parser = PartialObjectParser()
+    completed = []
+    for chunk in chunks:
+        completed.extend(parser.feed(chunk))
+    return parser, completed
+
+
+def test_fields_complete_in_order_whatever_the_chunking():
+    expected = list(json.loads(ARGUMENTS).items())
+    for size in (1, 2, 7, len(ARGUMENTS)):
+        parser, completed = feed_all(ARGUMENTS[i:i + size] for i in range(0, len(ARGUMENTS), size))
+        assert completed == expected
+        assert parser.buffer == ARGUMENTS
+
+
+def test_field_is_reported_as_soon_as_its_value_closes():
+    parser = PartialObjectParser()
+    assert parser.feed('{"title": "Lun') == []
+    assert parser.feed('ch", "date": "2030') == [("title", "Lunch")]
+    # A number or string is only complete once a delimiter follows it
+    assert parser.feed('-10-17"') == [("date", "2030-10-17")]
+    assert parser.feed(', "n": 12') == []
+    assert parser.feed('}') == [("n", 12)]
+
+
+def test_malformed_value_is_skipped():
+    _, completed = feed_all(['{"a": tru, "b": "ok"}'])
+    assert completed == [("b", "ok")]
@@ -0,0 +1,59 @@
+from datetime import datetime
+
+import pytest
+import pytz
+
+from preparser import PreParserStats, add_one_hour, preparse_event
+
+# A Wednesday morning
+NOW = pytz.timezone("America/New_York").localize(datetime(2030, 10, 16, 9, 0))
+
+
+def test_relative_date_time_and_location():
+    result = preparse_event("Lunch with Sam tomorrow at 12:30 PM at Cafe Luna", NOW)
+    assert result.event == {
+        "title": "Lunch with Sam", "date": "2030-10-17", "startTime": "12:30 PM", "endTime": "1:30 PM",
+        "location": "Cafe Luna", "attendees": [], "description": ""
+    }
+    assert result.confidence == 1.0
+    assert result.reasons == []
+
+
+def test_weekday_range_and_attendee():
+    event = preparse_event("Team standup 10-10:30am Monday in Room 4 with bob@example.com", NOW).event
+    assert (event["date"], event["startTime"], event["endTime"]) == ("2030-10-21", "10:00 AM", "10:30 AM")
+    assert event["location"] == "Room 4"
+    assert event["attendees"] == ["bob@example.com"]
+
+
+def test_month_day_already_past_rolls_to_next_year():
+    event = preparse_event("Quarterly review March 5 from 2 to 3:30pm at The Hub", NOW).event
+    assert (event["date"], event["startTime"], event["endTime"]) == ("2031-03-05", "2:00 PM", "3:30 PM")
+
+
+def test_iso_date_and_noon():
+    assert preparse_event("Coffee chat 2030-11-02 at 9:15 AM", NOW).event["date"] == "2030-11-02"
+    assert preparse_event("Standup at noon today", NOW).event["startTime"] == "12:00 PM"
+
+
+def test_alternatives_lower_confidence():
+    result = preparse_event("Meet at 10am or 2pm tomorrow, whichever works", NOW)
+    assert result.confidence < 0.9
+    assert {"hedged", "multiple_times"} <= set(result.reasons)
+
+
+@pytest.mark.parametrize("text", ["No times here at all", "Dinner on Friday"])
+def test_no_start_time_gives_no_result(text):
+    assert preparse_event(text, NOW) is None
+
+
+@pytest.mark.parametrize("start, end", [("11:30 AM", "12:30 PM"), ("11:30 PM", "12:30 AM"), ("12:00 PM", "1:00 PM")])
+def test_add_one_hour(start, end):
+    assert add_one_hour(start) == end
+
+
+def test_shadow_stats_count_agreement():
+    stats = PreParserStats()
+    parsed = preparse_event("Lunch with Sam tomorrow at 12:30 PM at Cafe Luna", NOW)
+    assert stats.record_shadow(parsed, dict(parsed.event), 0.9)
+    assert not stats.record_shadow(parsed, dict(parsed.event, startTime="1:00 PM"), 0.9)
@@ -0,0 +1,51 @@
+from segmenter import count_times, dedupe_events, same_event, segment_text
+
+SCHEDULE = """DevConf - Main Hall, 1 Congress Square
+
+Tuesday, March 11
+9:00 AM - 9:45 AM Opening keynote
+10:00 AM Workshop: Async Python
+Ends at 11:30 AM.
+Wednesday, March 12
+2:30 PM Lightning talks"""
+
+
+def test_count_times():
+    assert count_times("9:00 AM - 9:45 AM Opening keynote") == 1
+    assert count_times("10am standup, 2pm review") == 2
+    assert count_times("2-3 people") == 0
+    assert count_times("no digits here") == 0
+
+
+def test_schedule_is_split_with_headers_and_preamble():
+    assert segment_text(SCHEDULE) == [
+        "DevConf - Main Hall, 1 Congress Square\nTuesday, March 11\n9:00 AM - 9:45 AM Opening keynote",
+        "DevConf - Main Hall, 1 Congress Square\nTuesday, March 11\n10:00 AM Workshop: Async Python\nEnds at 11:30 AM.",
+        "DevConf - Main Hall, 1 Congress Square\nWednesday, March 12\n2:30 PM Lightning talks",
+    ]
+
+
+def test_single_event_text_comes_back_whole():
+    text = "Lunch with Sam tomorrow at 12:30\nor 1pm if that's better"
+    assert segment_text(text) == [text]
+
+
+def test_same_event_needs_same_slot_and_similar_title():
+    a = {"title": "Opening keynote", "date": "2030-03-11", "startTime": "9:00 AM"}
+    assert same_event(a, dict(a, title="Opening keynote with Dana"))
+    assert not same_event(a, dict(a, title="Lunch"))
+    assert not same_event(a, dict(a, startTime="10:00 AM"))
+
+
+def test_dedupe_merges_and_prefers_clean_results():
+    flagged = {"title": "Keynote", "date": "2030-03-11", "startTime": "9:00 AM", "attendees": ["a"],
+               "description": "long description", "error_code": "PAST_DATE"}
+    clean = {"title": "Keynote", "date": "2030-03-11", "startTime": "9:00 AM", "attendees": ["b"],
+             "description": "short"}
+    other = {"title": "Lunch", "date": "2030-03-11", "startTime": "12:00 PM", "attendees": []}
+    merged = dedupe_events([flagged, {"title": "", "date": "2030-03-11"}, clean, other])
+    assert merged == [
+        {"title": "Keynote", "date": "2030-03-11", "startTime": "9:00 AM", "attendees": ["b", "a"],
+         "description": "long description"},
+        other,
+    ]
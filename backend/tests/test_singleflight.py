@@ -0,0 +1,81 @@
+import asyncio
+
+import pytest
+
+from singleflight import SingleFlight
+
+
+def test_concurrent_callers_share_one_call():
+    flight = SingleFlight()
+    calls = []
+
+    async def extract():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return {"title": "Lunch", "attendees": []}
+
+    async def run():
+        return await asyncio.gather(*(flight.do("key", extract) for _ in range(5)))
+
+    results = asyncio.run(run())
+    assert len(calls) == 1
+    assert all(result == {"title": "Lunch", "attendees": []} for result in results)
+    # Followers get copies, so one caller's changes don't leak into another's result
+    results[1]["attendees"].append("x")
+    assert results[2]["attendees"] == []
+    assert flight.stats() == {"in_flight": 0, "leaders": 1, "coalesced": 4}
+
+
+def test_followers_get_the_leaders_exception_and_later_calls_start_fresh():
+    flight = SingleFlight()
+
+    async def fail():
+        await asyncio.sleep(0.01)
+        raise ValueError("upstream broke")
+
+    async def succeed():
+        return "ok"
+
+    async def run():
+        results = await asyncio.gather(flight.do("key", fail), flight.do("key", fail), return_exceptions=True)
+        assert all(isinstance(result, ValueError) for result in results)
+        assert await flight.do("key", succeed) == "ok"
+
+    asyncio.run(run())
+    assert flight.leaders == 2
+
+
+def test_cancelled_leader_does_not_cancel_the_shared_call():
+    flight = SingleFlight()
+
+    async def extract():
+        await asyncio.sleep(0.02)
+        return "done"
+
+    async def run():
+        leader = asyncio.ensure_future(flight.do("key", extract))
+        await asyncio.sleep(0)
+        follower = asyncio.ensure_future(flight.do("key", extract))
+        await asyncio.sleep(0)
+        leader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        assert await follower == "done"
+
+    asyncio.run(run())
+
+
+def test_drain_reports_calls_still_running():
+    flight = SingleFlight()
+
+    async def run():
+        slow = asyncio.ensure_future(flight.do("slow", lambda: asyncio.sleep(1)))
+        fast = asyncio.ensure_future(flight.do("fast", lambda: asyncio.sleep(0)))
+        await asyncio.sleep(0)
+        assert await flight.drain(0.05) == 1
+        await fast
+        slow.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await slow
+
+    asyncio.run(run())
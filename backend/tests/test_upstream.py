@@ -0,0 +1,128 @@
+import asyncio
+import time
+
+import pytest
+
+from admission import AdmissionController
+from upstream import CircuitBreaker, Hedger, UpstreamCaller, UpstreamConfig, UpstreamUnavailableError
+
+
+def test_breaker_opens_after_consecutive_failures():
+    breaker = CircuitBreaker(failure_threshold=3, reset_seconds=30)
+    breaker.record_failure()
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.state == 'closed'
+    breaker.record_failure()
+    assert breaker.state == 'open'
+    assert not breaker.allow()
+    assert breaker.stats() == {"state": "open", "consecutive_failures": 3, "opens": 1, "rejected": 1}
+
+
+def test_half_open_breaker_lets_one_probe_through(monkeypatch):
+    breaker = CircuitBreaker(failure_threshold=1, reset_seconds=30)
+    breaker.record_failure()
+    later = time.monotonic() + 31
+    monkeypatch.setattr(time, 'monotonic', lambda: later)
+    assert breaker.allow()
+    assert breaker.state == 'half_open'
+    assert not breaker.allow()
+    breaker.record_success()
+    assert breaker.state == 'closed'
+    assert breaker.allow()
+
+
+def test_failed_probe_reopens_and_cancelled_probe_is_released(monkeypatch):
+    breaker = CircuitBreaker(failure_threshold=5, reset_seconds=30)
+    for _ in range(5):
+        breaker.record_failure()
+    later = time.monotonic() + 31
+    monkeypatch.setattr(time, 'monotonic', lambda: later)
+    assert breaker.allow()
+    breaker.release()
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == 'open'
+    assert breaker.opens == 2
+
+
+def test_caller_opens_breaker_and_then_fails_fast():
+    caller = UpstreamCaller(UpstreamConfig(max_retries=1, backoff_base_seconds=0, breaker_failures=2))
+    attempts = []
+
+    async def timing_out(timeout: float):
+        attempts.append(timeout)
+        raise asyncio.TimeoutError()
+
+    async def run():
+        for _ in range(2):
+            with pytest.raises(asyncio.TimeoutError):
+                await caller.call(timing_out)
+        with pytest.raises(UpstreamUnavailableError):
+            await caller.call(timing_out)
+
+    asyncio.run(run())
+    # Two calls of one retry each; the third never reached upstream
+    assert len(attempts) == 4
+    assert caller.breaker.state == 'open'
+    assert caller.counters["failures"] == 2
+
+
+def test_non_retryable_error_does_not_count_against_upstream():
+    caller = UpstreamCaller(UpstreamConfig(breaker_failures=1))
+
+    async def bad_request(timeout: float):
+        raise ValueError("400: invalid request")
+
+    async def run():
+        with pytest.raises(ValueError):
+            await caller.call(bad_request)
+
+    asyncio.run(run())
+    assert caller.counters["attempts"] == 1
+    assert caller.breaker.state == 'closed'
+
+
+def test_hedge_takes_its_own_admission_slot_or_is_skipped():
+    async def slow():
+        await asyncio.sleep(0.05)
+        return "ok"
+
+    async def run(controller):
+        hedger = Hedger(enabled=True, min_samples=1, min_delay_seconds=0.01, budget_ratio=1.0)
+        hedger.observe("m:f", 0.01)
+        async with controller.slot():
+            assert await hedger.run("m:f", slow, controller) == "ok"
+        return hedger.counters
+
+    free = AdmissionController(max_outstanding=2)
+    counters = asyncio.run(run(free))
+    assert counters["hedged"] == 1 and free.counters["admitted"] == 2
+    assert free.outstanding == 0
+
+    saturated = AdmissionController(max_outstanding=1)
+    counters = asyncio.run(run(saturated))
+    assert counters["hedged"] == 0 and counters["skipped_saturated"] == 1
+    assert saturated.outstanding == 0
+
+
+def test_unused_hedge_call_is_reported():
+    responses = iter([0.2, 0.0])
+
+    async def call():
+        delay = next(responses)
+        await asyncio.sleep(delay)
+        return delay
+
+    async def run():
+        hedger = Hedger(enabled=True, min_samples=1, min_delay_seconds=0.01, budget_ratio=1.0)
+        hedger.observe("m:f", 0.01)
+        lost = []
+        assert await hedger.run("m:f", call, on_lost=lost.append) == 0.0
+        return hedger.counters, lost
+
+    counters, lost = asyncio.run(run())
+    # The slow primary was still in flight when the hedge won
+    assert counters["hedge_won"] == 1 and lost == [None]
@@ -0,0 +1,88 @@
+"""
+Token accounting for extraction calls.
+
+Each call is broken down into system prompt, user text, function schema and
+completion tokens. Counts come from tiktoken when it is installed (exact for
+OpenAI's encodings, though the API's own framing of function schemas adds a
+few tokens) and from a word/punctuation heuristic otherwise; the 'estimated'
+flag says which. When the API reports usage, its prompt and completion
+totals are included as well.
+
+System prompts and schemas repeat across requests, so their counts are
+memoized; only the user text and completion are counted per call.
+"""
+import functools
+import json
+import re
+from typing import Optional
+
+_PIECE = re.compile(r"[A-Za-z]+|\d{1,3}|[^\sA-Za-z\d]+")
+
+_encoding = None
+_encoding_loaded = False
+
+
+def _get_encoding():
+    global _encoding, _encoding_loaded
+    if not _encoding_loaded:
+        _encoding_loaded = True
+        try:
+            import tiktoken
+            _encoding = tiktoken.get_encoding('cl100k_base')
+        except Exception:
+            _encoding = None
+    return _encoding
+
+
+def uses_tokenizer() -> bool:
+    """True when counts are exact (tiktoken), False when they are estimates"""
+    return _get_encoding() is not None
+
+
+def count_tokens(text: Optional[str]) -> int:
+    if not text:
+        return 0
+    encoding = _get_encoding()
+    if encoding is not None:
+        return len(encoding.encode(text))
+    # Roughly how cl100k splits text: a token per short word or 3-digit group,
+    # more for long words, and runs of punctuation ('":"', '},{') merge
+    tokens = 0
+    for piece in _PIECE.findall(text):
+        tokens += 1 + len(piece) // (8 if piece[0].isalpha() else 3)
+    return tokens
+
+
+@functools.lru_cache(maxsize=256)
+def _count_cached(text: str) -> int:
+    return count_tokens(text)
+
+
+# id(schema) -> (schema, tokens); schemas are module constants, the reference keeps the id valid
+_schema_counts = {}
+
+
+def schema_tokens(function: dict) -> int:
+    """Tokens of a function schema as sent in the request"""
+    entry = _schema_counts.get(id(function))
+    if entry is None or entry[0] is not function:
+        entry = _schema_counts[id(function)] = (function, count_tokens(json.dumps(function, separators=(',', ':'))))
+    return entry[1]
+
+
+def account_call(system_prompt: str, user_text: str, function: dict, completion_text: Optional[str] = None,
+                 usage=None, variant: Optional[str] = None) -> dict:
+    """Token breakdown of one extraction call; usage is the API's usage object, if any"""
+    counts = {
+        "variant": variant,
+        "system_prompt": _count_cached(system_prompt),
+        "user_text": count_tokens(user_text),
+        "schema": schema_tokens(function),
+        "completion": count_tokens(completion_text),
+        "estimated": not uses_tokenizer()
+    }
+    # Stubs and some proxies report zeros; only trust real numbers
+    if usage is not None and getattr(usage, 'prompt_tokens', 0):
+        counts["api_prompt_tokens"] = usage.prompt_tokens
+        counts["api_completion_tokens"] = usage.completion_tokens
+    return counts
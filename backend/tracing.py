@@ -0,0 +1,385 @@
+"""
+Background, batched trace export.
+
+@traceable records a run (inputs, outputs, error, timing, parent) and puts it
+on a bounded in-memory queue; that is all the request path pays for. A worker
+thread drains the queue in batches, anonymizes and serializes the runs and
+hands them to an exporter (LangSmith, or plain HTTP for local collectors).
+
+When the queue is full the drop policy decides what goes: 'drop_newest'
+rejects the incoming run, 'drop_oldest' evicts the oldest queued one.
+Sampling is decided once per trace, by the endpoint that started it.
+"""
+import collections
+import contextvars
+import functools
+import inspect
+import json
+import os
+import random
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import Callable, Dict, Optional
+
+from logs import get_logger, log_fields
+from metrics import STAGE_SECONDS
+
+logger = get_logger('tracing')
+
+# The run currently executing in this context (parent for nested runs)
+_current_run = contextvars.ContextVar('current_run', default=None)
+# Request path that started the current trace, set by the HTTP middleware
+current_endpoint = contextvars.ContextVar('current_endpoint', default=None)
+
+# Marker for "this trace was not sampled", so nested runs skip recording too
+_NOT_SAMPLED = {'sampled': False}
+
+# Time @traceable adds to each call (recording and enqueueing runs)
+_overhead = STAGE_SECONDS.labels('tracing')
+
+
+def add_run_metadata(**metadata):
+    """Attach metadata (token counts, ...) to the innermost traced run, if it is sampled"""
+    run = _current_run.get()
+    if run is not None and run.get('sampled'):
+        run.setdefault('extra', {}).setdefault('metadata', {}).update(metadata)
+
+
+def parse_sample_rates(spec: str) -> Dict[str, float]:
+    """Parse '/process_event=0.1,/log_calendar_save=1' into a dict"""
+    rates = {}
+    for part in (spec or '').split(','):
+        if '=' in part:
+            endpoint, rate = part.split('=', 1)
+            rates[endpoint.strip()] = float(rate)
+    return rates
+
+
+def to_jsonable(value):
+    """Convert run inputs/outputs (pydantic and OpenAI models included) to plain JSON types"""
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    if isinstance(value, dict):
+        return {str(k): to_jsonable(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [to_jsonable(v) for v in value]
+    if hasattr(value, 'model_dump'):
+        return to_jsonable(value.model_dump())
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return repr(value)
+
+
+class LangSmithExporter:
+    """Send batches with the LangSmith client's batch ingest API"""
+
+    def __init__(self, get_client: Callable):
+        self._get_client = get_client
+
+    def export(self, runs: list):
+        self._get_client().batch_ingest_runs(create=runs)
+
+
+class HTTPExporter:
+    """POST batches as {"runs": [...]} JSON to a collector URL"""
+
+    def __init__(self, url: str, timeout: float = 5.0):
+        self.url = url
+        self.timeout = timeout
+
+    def export(self, runs: list):
+        import httpx
+        body = json.dumps({"runs": runs}, default=str)
+        response = httpx.post(self.url, content=body, headers={"Content-Type": "application/json"}, timeout=self.timeout)
+        response.raise_for_status()
+
+
+class TraceQueue:
+    """Bounded run queue drained in batches by a daemon thread"""
+
+    def __init__(self, exporter, max_size: int = 1000, batch_size: int = 50, flush_interval: float = 1.0,
+                 drop_policy: str = 'drop_newest', anonymizer_factory: Optional[Callable] = None):
+        if drop_policy not in ('drop_newest', 'drop_oldest'):
+            raise ValueError(f"Unknown trace drop policy: {drop_policy}")
+        self.exporter = exporter
+        self.max_size = max_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.drop_policy = drop_policy
+        self._anonymizer_factory = anonymizer_factory
+        self._anonymizer = None
+        self._runs = collections.deque()
+        self._cond = threading.Condition()
+        self._worker = None
+        self._exporting = 0
+        self.counters = {
+            "queued": 0,
+            "sent": 0,
+            "dropped_backpressure": 0,
+            "dropped_export_error": 0,
+            "sampled_out": 0
+        }
+
+    def put(self, run: dict) -> bool:
+        """Enqueue a finished run; never blocks. Returns False if the run was dropped"""
+        with self._cond:
+            if len(self._runs) >= self.max_size:
+                self.counters["dropped_backpressure"] += 1
+                if self.drop_policy == 'drop_newest':
+                    return False
+                self._runs.popleft()
+            self._runs.append(run)
+            self.counters["queued"] += 1
+            if len(self._runs) >= self.batch_size:
+                self._cond.notify()
+        if self._worker is None:
+            self._start_worker()
+        return True
+
+    def _start_worker(self):
+        with self._cond:
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._run_worker, name="trace-export", daemon=True)
+                self._worker.start()
+
+    def _take_batch(self) -> list:
+        batch = []
+        while self._runs and len(batch) < self.batch_size:
+            batch.append(self._runs.popleft())
+        self._exporting += len(batch)
+        return batch
+
+    def _run_worker(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: len(self._runs) >= self.batch_size, timeout=self.flush_interval)
+                batch = self._take_batch()
+            if batch:
+                self._export(batch)
+
+    def _export(self, batch: list):
+        try:
+            runs = [self._prepare(run) for run in batch]
+            self.exporter.export(runs)
+            self.counters["sent"] += len(batch)
+        except Exception as e:
+            self.counters["dropped_export_error"] += len(batch)
+            logger.error("Trace export failed", extra=log_fields(dropped_runs=len(batch), error=str(e)))
+        finally:
+            with self._cond:
+                self._exporting -= len(batch)
+                self._cond.notify_all()
+
+    def _prepare(self, run: dict) -> dict:
+        """Serialize and anonymize a run; runs on the worker thread, off the request path"""
+        if self._anonymizer is None and self._anonymizer_factory is not None:
+            self._anonymizer = self._anonymizer_factory()
+        run = dict(run)
+        for field in ('inputs', 'outputs'):
+            if run.get(field) is not None:
+                run[field] = to_jsonable(run[field])
+                if self._anonymizer:
+                    run[field] = self._anonymizer(run[field])
+        if run.get('error') and self._anonymizer:
+            run['error'] = self._anonymizer({"error": run['error']})["error"]
+        return run
+
+    def flush(self, timeout: float = 5.0):
+        """Export everything queued so far (used at shutdown)"""
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            with self._cond:
+                batch = self._take_batch()
+                if not batch:
+                    if not self._exporting:
+                        return
+                    self._cond.wait(timeout=max(deadline - time.monotonic(), 0))
+                    continue
+            self._export(batch)
+
+    def stats(self) -> dict:
+        with self._cond:
+            depth = len(self._runs)
+        return {
+            **self.counters,
+            "queue_depth": depth,
+            "max_size": self.max_size,
+            "drop_policy": self.drop_policy
+        }
+
+
+class Tracer:
+    """Provides the @traceable decorator that feeds a TraceQueue"""
+
+    def __init__(self, queue: Optional[TraceQueue], sample_rate: float = 1.0,
+                 endpoint_sample_rates: Optional[Dict[str, float]] = None, project_name: Optional[str] = None):
+        self.queue = queue
+        self.sample_rate = sample_rate
+        self.endpoint_sample_rates = endpoint_sample_rates or {}
+        self.project_name = project_name
+
+    def _start_run(self, signature, name: str, run_type: str, args, kwargs):
+        """Return the run dict to record, or None if this trace isn't sampled"""
+        parent = _current_run.get()
+        if parent is None:
+            endpoint = current_endpoint.get()
+            rate = self.endpoint_sample_rates.get(endpoint, self.sample_rate)
+            if rate < 1.0 and random.random() >= rate:
+                self.queue.counters["sampled_out"] += 1
+                return None
+        elif not parent['sampled']:
+            return None
+
+        try:
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            inputs = dict(bound.arguments)
+        except TypeError:
+            inputs = {"args": args, "kwargs": kwargs}
+
+        run_id = str(uuid.uuid4())
+        start_time = datetime.now(timezone.utc)
+        dotted = f"{start_time.strftime('%Y%m%dT%H%M%S%fZ')}{run_id}"
+        run = {
+            "id": run_id,
+            "name": name,
+            "run_type": run_type,
+            "inputs": inputs,
+            "start_time": start_time,
+            "trace_id": parent["trace_id"] if parent else run_id,
+            "dotted_order": f"{parent['dotted_order']}.{dotted}" if parent else dotted,
+            "sampled": True
+        }
+        if parent:
+            run["parent_run_id"] = parent["id"]
+        if self.project_name:
+            run["session_name"] = self.project_name
+        return run
+
+    def _finish_run(self, run: dict, outputs=None, error: Optional[BaseException] = None):
+        run = dict(run)
+        run.pop("sampled")
+        run["end_time"] = datetime.now(timezone.utc)
+        if error is not None:
+            run["error"] = repr(error)
+        else:
+            run["outputs"] = outputs if isinstance(outputs, dict) else {"output": outputs}
+        self.queue.put(run)
+
+    def traceable(self, run_type: str = "chain", name: Optional[str] = None):
+        """Trace an async function or async generator into the export queue"""
+        def decorator(fn):
+            run_name = name or fn.__name__
+            signature = inspect.signature(fn)
+
+            if inspect.isasyncgenfunction(fn):
+                # The current run is set only while the generator body runs, never
+                # across a yield, so it doesn't leak into the consumer's context
+                @functools.wraps(fn)
+                async def generator_wrapper(*args, **kwargs):
+                    run = None
+                    if self.queue is not None:
+                        started = time.perf_counter()
+                        run = self._start_run(signature, run_name, run_type, args, kwargs)
+                        _overhead.observe(time.perf_counter() - started)
+                    items = []
+                    generator = fn(*args, **kwargs)
+                    try:
+                        while True:
+                            token = _current_run.set(run or _NOT_SAMPLED) if self.queue is not None else None
+                            try:
+                                item = await generator.__anext__()
+                            except StopAsyncIteration:
+                                break
+                            finally:
+                                if token is not None:
+                                    _current_run.reset(token)
+                            items.append(item)
+                            yield item
+                    except BaseException as e:
+                        if run:
+                            self._finish_run(run, error=e)
+                        raise
+                    finally:
+                        await generator.aclose()
+                    if run:
+                        started = time.perf_counter()
+                        joined = "".join(items) if all(isinstance(i, str) for i in items) else items
+                        self._finish_run(run, joined)
+                        _overhead.observe(time.perf_counter() - started)
+                return generator_wrapper
+
+            @functools.wraps(fn)
+            async def wrapper(*args, **kwargs):
+                if self.queue is None:
+                    return await fn(*args, **kwargs)
+                started = time.perf_counter()
+                run = self._start_run(signature, run_name, run_type, args, kwargs)
+                token = _current_run.set(run or _NOT_SAMPLED)
+                overhead = time.perf_counter() - started
+                try:
+                    result = await fn(*args, **kwargs)
+                except BaseException as e:
+                    if run:
+                        self._finish_run(run, error=e)
+                    raise
+                finally:
+                    _current_run.reset(token)
+                if run:
+                    started = time.perf_counter()
+                    self._finish_run(run, dict(result) if isinstance(result, dict) else result)
+                    overhead += time.perf_counter() - started
+                _overhead.observe(overhead)
+                return result
+            return wrapper
+        return decorator
+
+    def stats(self) -> dict:
+        if self.queue is None:
+            return {"enabled": False}
+        return {"enabled": True, **self.queue.stats()}
+
+
+def create_tracer_from_env(langsmith_client_factory: Callable, anonymizer_factory: Optional[Callable] = None) -> Tracer:
+    """Build the tracer configured by TRACE_* env vars.
+    
+    TRACE_EXPORTER is 'langsmith' (default when LANGSMITH_TRACING is on),
+    'http' (POST to TRACE_COLLECTOR_URL) or 'off'.
+    """
+    tracing_on = os.getenv('LANGSMITH_TRACING', os.getenv('LANGCHAIN_TRACING_V2', '')).lower() == 'true'
+    exporter_name = os.getenv('TRACE_EXPORTER', 'langsmith' if tracing_on else 'off').lower()
+    sample_rate = float(os.getenv('TRACE_SAMPLE_RATE', '1.0'))
+    endpoint_sample_rates = parse_sample_rates(os.getenv('TRACE_SAMPLE_RATES', ''))
+
+    if exporter_name == 'off':
+        return Tracer(None)
+    if exporter_name == 'langsmith':
+        exporter = LangSmithExporter(langsmith_client_factory)
+    elif exporter_name == 'http':
+        exporter = HTTPExporter(os.getenv('TRACE_COLLECTOR_URL', 'http://127.0.0.1:9300/runs'))
+    else:
+        raise ValueError(f"Unknown TRACE_EXPORTER: {exporter_name}")
+
+    queue = TraceQueue(
+        exporter,
+        max_size=int(os.getenv('TRACE_QUEUE_MAX_SIZE', '1000')),
+        batch_size=int(os.getenv('TRACE_BATCH_SIZE', '50')),
+        flush_interval=float(os.getenv('TRACE_FLUSH_INTERVAL_SECONDS', '1.0')),
+        drop_policy=os.getenv('TRACE_DROP_POLICY', 'drop_newest'),
+        anonymizer_factory=anonymizer_factory
+    )
+    return Tracer(queue, sample_rate, endpoint_sample_rates, os.getenv('LANGSMITH_PROJECT'))
+
+
+class TraceEndpointMiddleware:
+    """ASGI middleware recording the request path so sampling can be set per endpoint"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http":
+            current_endpoint.set(scope["path"])
+        await self.app(scope, receive, send)
@@ -0,0 +1,366 @@
+"""
+Resilience layer for upstream LLM calls.
+
+The OpenAI client is built on an httpx pool sized to the worker's extraction
+concurrency, with the SDK's own retries turned off. Each call goes through
+UpstreamCaller:
+
+- An overall budget (UPSTREAM_BUDGET_SECONDS) starts with the call. Every
+  attempt gets min(UPSTREAM_ATTEMPT_TIMEOUT_SECONDS, time left) as its timeout.
+- Timeouts, connection errors, 429s and 5xx responses are retried with
+  full-jitter exponential backoff (or the server's Retry-After), but only
+  while the budget can still cover the wait plus a minimal attempt.
+- A circuit breaker opens after UPSTREAM_BREAKER_FAILURES consecutive failed
+  calls. While it is open, calls fail immediately with UpstreamUnavailableError
+  and the endpoint serves its fallback. After UPSTREAM_BREAKER_RESET_SECONDS a
+  single probe call is let through.
+
+Optionally (HEDGE_ENABLED=true) a Hedger wraps the call: when it hasn't
+finished within HEDGE_PERCENTILE of recent latency, an identical second call
+is fired, the first to succeed wins and the other is cancelled. A token bucket
+keeps hedges under HEDGE_BUDGET (default 5%) of calls, and each hedge needs a
+free admission slot of its own: under saturation it is skipped rather than
+adding load the admission controller doesn't see.
+"""
+import asyncio
+import collections
+import os
+import random
+import time
+from typing import Awaitable, Callable, Dict, Optional
+
+
+class UpstreamUnavailableError(Exception):
+    """Raised without calling upstream while the circuit breaker is open"""
+
+
+class UpstreamConfig:
+    """Pool, timeout, retry and breaker settings, read from UPSTREAM_* env vars"""
+
+    def __init__(self, max_connections: int = 32, budget_seconds: float = 20.0, attempt_timeout_seconds: float = 10.0,
+                 connect_timeout_seconds: float = 3.0, min_attempt_seconds: float = 0.5, max_retries: int = 2,
+                 backoff_base_seconds: float = 0.25, backoff_max_seconds: float = 2.0,
+                 breaker_failures: int = 5, breaker_reset_seconds: float = 30.0, keepalive_expiry_seconds: float = 30.0):
+        self.max_connections = max_connections
+        self.budget_seconds = budget_seconds
+        self.attempt_timeout_seconds = attempt_timeout_seconds
+        self.connect_timeout_seconds = connect_timeout_seconds
+        self.min_attempt_seconds = min_attempt_seconds
+        self.max_retries = max_retries
+        self.backoff_base_seconds = backoff_base_seconds
+        self.backoff_max_seconds = backoff_max_seconds
+        self.breaker_failures = breaker_failures
+        self.breaker_reset_seconds = breaker_reset_seconds
+        self.keepalive_expiry_seconds = keepalive_expiry_seconds
+
+    @classmethod
+    def from_env(cls, max_connections: int) -> 'UpstreamConfig':
+        return cls(
+            max_connections=int(os.getenv('UPSTREAM_MAX_CONNECTIONS', str(max_connections))),
+            budget_seconds=float(os.getenv('UPSTREAM_BUDGET_SECONDS', '20')),
+            attempt_timeout_seconds=float(os.getenv('UPSTREAM_ATTEMPT_TIMEOUT_SECONDS', '10')),
+            connect_timeout_seconds=float(os.getenv('UPSTREAM_CONNECT_TIMEOUT_SECONDS', '3')),
+            min_attempt_seconds=float(os.getenv('UPSTREAM_MIN_ATTEMPT_SECONDS', '0.5')),
+            max_retries=int(os.getenv('UPSTREAM_MAX_RETRIES', '2')),
+            backoff_base_seconds=float(os.getenv('UPSTREAM_BACKOFF_BASE_SECONDS', '0.25')),
+            backoff_max_seconds=float(os.getenv('UPSTREAM_BACKOFF_MAX_SECONDS', '2')),
+            breaker_failures=int(os.getenv('UPSTREAM_BREAKER_FAILURES', '5')),
+            breaker_reset_seconds=float(os.getenv('UPSTREAM_BREAKER_RESET_SECONDS', '30')),
+            keepalive_expiry_seconds=float(os.getenv('UPSTREAM_KEEPALIVE_EXPIRY_SECONDS', '30'))
+        )
+
+
+def build_http_client(config: UpstreamConfig):
+    """httpx client for the OpenAI SDK: keep-alive pool sized to the worker's concurrency"""
+    import httpx
+    return httpx.AsyncClient(
+        limits=httpx.Limits(
+            max_connections=config.max_connections,
+            max_keepalive_connections=config.max_connections,
+            keepalive_expiry=config.keepalive_expiry_seconds
+        ),
+        timeout=httpx.Timeout(config.attempt_timeout_seconds, connect=config.connect_timeout_seconds)
+    )
+
+
+class CircuitBreaker:
+    """Consecutive-failure breaker: closed -> open -> half_open (one probe) -> closed"""
+
+    def __init__(self, failure_threshold: int = 5, reset_seconds: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.state = 'closed'
+        self.failures = 0
+        self.opened_at = 0.0
+        self.opens = 0
+        self.rejected = 0
+        self._probing = False
+
+    def allow(self) -> bool:
+        if self.state == 'closed':
+            return True
+        if self.state == 'open' and time.monotonic() - self.opened_at >= self.reset_seconds:
+            self.state = 'half_open'
+        if self.state == 'half_open' and not self._probing:
+            self._probing = True
+            return True
+        self.rejected += 1
+        return False
+
+    def record_success(self):
+        self.state = 'closed'
+        self.failures = 0
+        self._probing = False
+
+    def release(self):
+        """Forget a call that was cancelled before it finished, so a new probe can go out"""
+        self._probing = False
+
+    def record_failure(self):
+        self.failures += 1
+        self._probing = False
+        if self.state == 'half_open' or self.failures >= self.failure_threshold:
+            if self.state != 'open':
+                self.opens += 1
+            self.state = 'open'
+            self.opened_at = time.monotonic()
+
+    def stats(self) -> dict:
+        return {
+            "state": self.state,
+            "consecutive_failures": self.failures,
+            "opens": self.opens,
+            "rejected": self.rejected
+        }
+
+
+def is_retryable(e: BaseException) -> bool:
+    """Timeouts, connection errors, 429 and 5xx are worth another attempt"""
+    if isinstance(e, asyncio.TimeoutError):
+        return True
+    import openai
+    if isinstance(e, (openai.APITimeoutError, openai.APIConnectionError)):
+        return True
+    if isinstance(e, openai.APIStatusError):
+        return e.status_code == 429 or e.status_code >= 500
+    return False
+
+
+def retry_after_seconds(e: BaseException) -> Optional[float]:
+    """Server-requested wait from a Retry-After / retry-after-ms header, if any"""
+    response = getattr(e, 'response', None)
+    if response is None:
+        return None
+    try:
+        if 'retry-after-ms' in response.headers:
+            return float(response.headers['retry-after-ms']) / 1000
+        if 'retry-after' in response.headers:
+            return float(response.headers['retry-after'])
+    except ValueError:
+        return None
+    return None
+
+
+class UpstreamCaller:
+    """Run upstream calls under a time budget, with jittered retries and a circuit breaker"""
+
+    def __init__(self, config: UpstreamConfig):
+        self.config = config
+        self.breaker = CircuitBreaker(config.breaker_failures, config.breaker_reset_seconds)
+        self.counters = {
+            "calls": 0,
+            "attempts": 0,
+            "retries": 0,
+            "failures": 0,
+            "budget_exhausted": 0
+        }
+
+    def backoff_seconds(self, retry: int) -> float:
+        """Full jitter: uniform in [0, min(max, base * 2^retry)]"""
+        cap = min(self.config.backoff_max_seconds, self.config.backoff_base_seconds * (2 ** retry))
+        return random.uniform(0, cap)
+
+    async def call(self, attempt: Callable[[float], Awaitable], budget_seconds: Optional[float] = None):
+        """Await attempt(timeout) until it succeeds, fails for good, or the budget runs out.
+
+        attempt receives the timeout (seconds) for that try and must pass it to
+        the SDK call.
+        """
+        if not self.breaker.allow():
+            raise UpstreamUnavailableError("Upstream circuit open, serving fallback")
+        self.counters["calls"] += 1
+        deadline = time.monotonic() + (budget_seconds or self.config.budget_seconds)
+        retry = 0
+        while True:
+            remaining = deadline - time.monotonic()
+            timeout = min(self.config.attempt_timeout_seconds, remaining)
+            self.counters["attempts"] += 1
+            try:
+                # wait_for backs the SDK timeout in case a slow stream or pool wait ignores it
+                result = await asyncio.wait_for(attempt(timeout), timeout + 0.05)
+            except asyncio.CancelledError:
+                # Caller gave up (client disconnect, lost hedge); not an upstream failure
+                self.breaker.release()
+                raise
+            except Exception as e:
+                if not is_retryable(e):
+                    # 4xx other than 429: the request is bad, upstream is fine
+                    self.breaker.record_success()
+                    raise
+                wait = retry_after_seconds(e)
+                if wait is None:
+                    wait = self.backoff_seconds(retry)
+                remaining = deadline - time.monotonic()
+                if retry >= self.config.max_retries or remaining < wait + self.config.min_attempt_seconds:
+                    if retry < self.config.max_retries:
+                        self.counters["budget_exhausted"] += 1
+                    self.counters["failures"] += 1
+                    self.breaker.record_failure()
+                    raise
+                retry += 1
+                self.counters["retries"] += 1
+                await asyncio.sleep(wait)
+                continue
+            self.breaker.record_success()
+            return result
+
+    def stats(self) -> dict:
+        return {
+            **self.counters,
+            "breaker": self.breaker.stats(),
+            "budget_seconds": self.config.budget_seconds,
+            "attempt_timeout_seconds": self.config.attempt_timeout_seconds,
+            "max_retries": self.config.max_retries,
+            "max_connections": self.config.max_connections
+        }
+
+
+class Hedger:
+    """Tail-latency hedging with a bounded budget of extra calls.
+
+    Latencies are kept per key (model and function), since tiers and batch
+    calls have different distributions. Every call earns budget_ratio of a
+    hedge token, up to max_burst; a hedge spends one. Given slots (an
+    AdmissionController), a hedge also holds a slot until it finishes and is
+    skipped when none is free without queueing. Given on_lost, each call of a
+    hedged pair whose result isn't returned is passed to it: its result if it
+    finished, None if it was cancelled in flight.
+    """
+
+    def __init__(self, enabled: bool = False, percentile: float = 95.0, budget_ratio: float = 0.05,
+                 window: int = 200, min_samples: int = 20, min_delay_seconds: float = 0.05, max_burst: float = 10.0):
+        self.enabled = enabled
+        self.percentile = percentile
+        self.budget_ratio = budget_ratio
+        self.window = window
+        self.min_samples = min_samples
+        self.min_delay_seconds = min_delay_seconds
+        self.max_burst = max_burst
+        self.tokens = 0.0
+        self._latencies: Dict[str, collections.deque] = {}
+        self.counters = {
+            "calls": 0,
+            "hedged": 0,
+            "hedge_won": 0,
+            "skipped_budget": 0,
+            "skipped_saturated": 0
+        }
+
+    def delay_seconds(self, key: str) -> Optional[float]:
+        """Wait before hedging a call under key, None until enough latencies are known"""
+        latencies = self._latencies.get(key)
+        if not latencies or len(latencies) < self.min_samples:
+            return None
+        ordered = sorted(latencies)
+        index = min(len(ordered) - 1, int(len(ordered) * self.percentile / 100))
+        return max(self.min_delay_seconds, ordered[index])
+
+    def observe(self, key: str, seconds: float):
+        latencies = self._latencies.get(key)
+        if latencies is None:
+            latencies = self._latencies[key] = collections.deque(maxlen=self.window)
+        latencies.append(seconds)
+
+    async def run(self, key: str, call: Callable[[], Awaitable], slots=None,
+                  on_lost: Optional[Callable[[Optional[object]], None]] = None):
+        """Await call(), hedging it with a second call(); returns the first successful result"""
+        if not self.enabled:
+            return await call()
+        self.counters["calls"] += 1
+        self.tokens = min(self.max_burst, self.tokens + self.budget_ratio)
+        delay = self.delay_seconds(key)
+        started = time.monotonic()
+        primary = asyncio.ensure_future(call())
+        tasks = [primary]
+        returned = None
+        try:
+            if delay is not None:
+                done, _ = await asyncio.wait(tasks, timeout=delay)
+                if not done:
+                    if self.tokens < 1:
+                        self.counters["skipped_budget"] += 1
+                    elif slots is not None and not slots.try_acquire():
+                        self.counters["skipped_saturated"] += 1
+                    else:
+                        self.tokens -= 1
+                        self.counters["hedged"] += 1
+                        tasks.append(asyncio.ensure_future(self._hedge(call, slots)))
+            pending = set(tasks)
+            while True:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                # Prefer a success; a failed call only decides when nothing else is running
+                winner = next((task for task in done if not task.exception()), None)
+                if winner is not None or not pending:
+                    break
+            if winner is None:
+                returned = primary if primary in done else done.pop()
+                return returned.result()
+            if winner is not primary:
+                self.counters["hedge_won"] += 1
+            self.observe(key, time.monotonic() - started)
+            returned = winner
+            return winner.result()
+        finally:
+            for task in tasks:
+                if task is returned:
+                    continue
+                if not task.done():
+                    task.cancel()
+                    lost = None
+                elif task.cancelled() or task.exception():
+                    continue
+                else:
+                    lost = task.result()
+                if on_lost is not None and len(tasks) > 1:
+                    on_lost(lost)
+
+    @staticmethod
+    async def _hedge(call: Callable[[], Awaitable], slots):
+        try:
+            return await call()
+        finally:
+            if slots is not None:
+                slots.release()
+
+    def stats(self) -> dict:
+        calls = self.counters["calls"]
+        return {
+            **self.counters,
+            "enabled": self.enabled,
+            "hedge_rate": round(self.counters["hedged"] / calls, 4) if calls else 0.0,
+            "budget_ratio": self.budget_ratio,
+            "percentile": self.percentile,
+            "tokens": round(self.tokens, 2),
+            "delay_seconds": {key: round(self.delay_seconds(key) or 0.0, 4) for key in self._latencies}
+        }
+
+
+def create_hedger_from_env() -> Hedger:
+    return Hedger(
+        enabled=os.getenv('HEDGE_ENABLED', 'false').lower() == 'true',
+        percentile=float(os.getenv('HEDGE_PERCENTILE', '95')),
+        budget_ratio=float(os.getenv('HEDGE_BUDGET', '0.05')),
+        window=int(os.getenv('HEDGE_WINDOW', '200')),
+        min_samples=int(os.getenv('HEDGE_MIN_SAMPLES', '20')),
+        min_delay_seconds=float(os.getenv('HEDGE_MIN_DELAY_MS', '50')) / 1000
+    )
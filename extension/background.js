@@ -20,7 +20,8 @@ const CONFIG = {
   CONTEXT_MENU_CHECK_INTERVAL: 300000,
   CACHE_MAX_ITEMS: 20,
   CACHE_EXPIRY: 3600000, // 1 hour
-  CACHE_KEY: 'eventCache'
+  CACHE_KEY: 'eventCache',
+  INSTALL_ID_KEY: 'installId'
 };
 
 const ERROR_CODES = {
@@ -226,7 +227,23 @@ async function processSelectedText(selectedText, tab) {
   });
 }
 
+// Random per-install ID; the backend rate limits on it instead of the (often shared) IP address
+function getInstallId() {
+  return new Promise((resolve) => {
+    chrome.storage.local.get(CONFIG.INSTALL_ID_KEY, (data) => {
+      if (data[CONFIG.INSTALL_ID_KEY]) {
+        resolve(data[CONFIG.INSTALL_ID_KEY]);
+        return;
+      }
+      const installId = crypto.randomUUID();
+      chrome.storage.local.set({ [CONFIG.INSTALL_ID_KEY]: installId });
+      resolve(installId);
+    });
+  });
+}
+
 async function fetchEventFromBackend(text) {
+  const installId = await getInstallId();
   const controller = new AbortController();
   const timeoutId = setTimeout(() => controller.abort(), CONFIG.REQUEST_TIMEOUT);
   
@@ -237,7 +254,7 @@ async function fetchEventFromBackend(text) {
   try {
     const response = await fetch(CONFIG.BACKEND_URL, {
       method: 'POST',
-      headers: { 'Content-Type': 'application/json' },
+      headers: { 'Content-Type': 'application/json', 'X-Install-Id': installId },
       body: JSON.stringify({
         text,
         current_time: new Date().toISOString(),